@@ -0,0 +1,384 @@
+from __future__ import annotations
+
+import threading
+import uuid
+from collections import defaultdict
+from functools import lru_cache
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F
+from django.http import HttpRequest
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from django_marketplace.constants import CART_LIFETIME
+from .models import CartItem
+
+
+def get_cart_owner(request: HttpRequest, create: bool = False) -> Optional[str]:
+    """
+    Владелец корзины: пользователь или анонимный покупатель с токеном корзины в сессии.
+    Токен создается только при изменении корзины (create=True), чтобы просмотр страниц не записывал сессию.
+    """
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f'user:{user.id}'
+    token = request.session.get(settings.CART_TOKEN_SESSION_ID)
+    if token is None and create:
+        token = request.session[settings.CART_TOKEN_SESSION_ID] = uuid.uuid4().hex
+    return f'anon:{token}' if token else None
+
+
+def get_summary_key(owner: str) -> str:
+    return f'cart_summary_{owner}'
+
+
+class CartBackend:
+    """
+    Хранилище корзины покупателя. Позиции корзины - словарь
+    id предложения магазина (строка) -> {'quantity': количество, 'price': цена на момент добавления}.
+    Каждый метод изменяет одну позицию, не перезаписывая корзину целиком.
+    """
+
+    def __init__(self, request: HttpRequest):
+        self.request = request
+
+    def load(self) -> dict[str, dict]:
+        raise NotImplementedError
+
+    def add(self, product_shop_id: str, price: float, quantity: int, update_quantity: bool = False) -> None:
+        """Добавляет quantity единиц товара или устанавливает количество (update_quantity)"""
+        raise NotImplementedError
+
+    def minus(self, product_shop_id: str) -> None:
+        """Уменьшает количество товара на единицу, удаляя позицию с нулевым количеством"""
+        raise NotImplementedError
+
+    def remove(self, product_shop_id: str) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def is_empty(self) -> bool:
+        return not self.load()
+
+    def load_summary(self) -> Optional[dict]:
+        """Сохраненные итоги корзины или None, если корзина изменилась после их подсчета"""
+        raise NotImplementedError
+
+    def save_summary(self, summary: dict) -> None:
+        raise NotImplementedError
+
+    @classmethod
+    def merge(cls, request: HttpRequest, user) -> None:
+        """Переносит корзину анонимного покупателя в корзину вошедшего пользователя"""
+
+
+class SessionCartBackend(CartBackend):
+    """
+    Корзина в сессии. При входе пользователя данные сессии сохраняются, поэтому объединять корзины не нужно.
+    """
+
+    def load(self) -> dict[str, dict]:
+        return self.request.session.get(settings.CART_SESSION_ID) or {}
+
+    def add(self, product_shop_id: str, price: float, quantity: int, update_quantity: bool = False) -> None:
+        cart = self.request.session.setdefault(settings.CART_SESSION_ID, {})
+        item = cart.setdefault(product_shop_id, {'quantity': 0, 'price': price})
+        item['quantity'] = quantity if update_quantity else item['quantity'] + quantity
+        self._changed()
+
+    def minus(self, product_shop_id: str) -> None:
+        cart = self.load()
+        if product_shop_id in cart:
+            cart[product_shop_id]['quantity'] -= 1
+            if cart[product_shop_id]['quantity'] < 1:
+                del cart[product_shop_id]
+            self._changed()
+
+    def remove(self, product_shop_id: str) -> None:
+        cart = self.load()
+        if product_shop_id in cart:
+            del cart[product_shop_id]
+            self._changed()
+
+    def clear(self) -> None:
+        self.request.session.pop(settings.CART_SESSION_ID, None)
+        self.request.session.pop(settings.CART_SUMMARY_SESSION_ID, None)
+
+    def load_summary(self) -> Optional[dict]:
+        return self.request.session.get(settings.CART_SUMMARY_SESSION_ID)
+
+    def save_summary(self, summary: dict) -> None:
+        self.request.session[settings.CART_SUMMARY_SESSION_ID] = summary
+
+    def _changed(self) -> None:
+        self.request.session.pop(settings.CART_SUMMARY_SESSION_ID, None)
+        self.request.session.modified = True
+
+
+class OwnerCartBackend(CartBackend):
+    """
+    Корзина, хранящаяся вне сессии по владельцу (get_cart_owner): доступна с любого устройства пользователя.
+    """
+
+    @property
+    def owner(self) -> Optional[str]:
+        return get_cart_owner(self.request)
+
+    def is_empty(self) -> bool:
+        return self.owner is None or super().is_empty()
+
+    def clear(self) -> None:
+        if (owner := self.owner) is not None:
+            self.delete_owner(owner)
+            cache.delete(get_summary_key(owner))
+        self.request.session.pop(settings.CART_TOKEN_SESSION_ID, None)
+
+    def load_summary(self) -> Optional[dict]:
+        if (owner := self.owner) is None:
+            return {'count': 0, 'total': '0'}
+        return cache.get(get_summary_key(owner))
+
+    def save_summary(self, summary: dict) -> None:
+        if (owner := self.owner) is not None:
+            cache.set(get_summary_key(owner), summary, timeout=CART_LIFETIME)
+
+    def _changed(self) -> None:
+        if (owner := self.owner) is not None:
+            cache.delete(get_summary_key(owner))
+
+    @classmethod
+    def merge(cls, request: HttpRequest, user) -> None:
+        if token := request.session.pop(settings.CART_TOKEN_SESSION_ID, None):
+            source, target = f'anon:{token}', f'user:{user.id}'
+            cls.merge_owner(source, target)
+            cache.delete_many([get_summary_key(source), get_summary_key(target)])
+
+    @classmethod
+    def delete_owner(cls, owner: str) -> None:
+        raise NotImplementedError
+
+    @classmethod
+    def merge_owner(cls, source: str, target: str) -> None:
+        """Складывает количества позиций корзины source с корзиной target и удаляет корзину source"""
+        raise NotImplementedError
+
+
+class DatabaseCartBackend(OwnerCartBackend):
+    """
+    Корзина в таблице CartItem. Изменение позиции - один запрос вставки с обновлением при конфликте.
+    """
+
+    def load(self) -> dict[str, dict]:
+        if (owner := self.owner) is None:
+            return {}
+        return {str(product_shop_id): {'quantity': quantity, 'price': float(price)}
+                for product_shop_id, quantity, price in CartItem.objects.filter(owner=owner)
+                .order_by('id').values_list('product_shop_id', 'quantity', 'price')}
+
+    def add(self, product_shop_id: str, price: float, quantity: int, update_quantity: bool = False) -> None:
+        table = CartItem._meta.db_table
+        quantity_update = 'EXCLUDED.quantity' if update_quantity else f'{table}.quantity + EXCLUDED.quantity'
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} (owner, product_shop_id, quantity, price, updated) '
+                f'VALUES (%s, %s, %s, %s, %s) '
+                f'ON CONFLICT (owner, product_shop_id) '
+                f'DO UPDATE SET quantity = {quantity_update}, updated = EXCLUDED.updated',
+                [get_cart_owner(self.request, create=True), int(product_shop_id), quantity, price, timezone.now()])
+        self._changed()
+
+    def minus(self, product_shop_id: str) -> None:
+        items = CartItem.objects.filter(owner=self.owner, product_shop_id=product_shop_id)
+        with transaction.atomic():
+            items.filter(quantity__lte=1).delete()
+            items.update(quantity=F('quantity') - 1, updated=timezone.now())
+        self._changed()
+
+    def remove(self, product_shop_id: str) -> None:
+        CartItem.objects.filter(owner=self.owner, product_shop_id=product_shop_id).delete()
+        self._changed()
+
+    @classmethod
+    def delete_owner(cls, owner: str) -> None:
+        CartItem.objects.filter(owner=owner).delete()
+
+    @classmethod
+    def merge_owner(cls, source: str, target: str) -> None:
+        table = CartItem._meta.db_table
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} (owner, product_shop_id, quantity, price, updated) '
+                f'SELECT %s, product_shop_id, quantity, price, %s FROM {table} WHERE owner = %s '
+                f'ON CONFLICT (owner, product_shop_id) '
+                f'DO UPDATE SET quantity = {table}.quantity + EXCLUDED.quantity, updated = EXCLUDED.updated',
+                [target, timezone.now(), source])
+            cursor.execute(f'DELETE FROM {table} WHERE owner = %s', [source])
+
+
+class HashStore:
+    """
+    Хранилище словарей по ключу (как hash в Redis)
+    """
+
+    def get_all(self, key: str) -> dict[str, str]:
+        raise NotImplementedError
+
+    def incr(self, key: str, field: str, amount: int) -> int:
+        """Увеличивает числовое поле и возвращает новое значение"""
+        raise NotImplementedError
+
+    def set(self, key: str, field: str, value, only_new: bool = False) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str, *fields: str) -> None:
+        """Удаляет поля словаря или, если поля не переданы, весь словарь"""
+        raise NotImplementedError
+
+    def touch(self, key: str, timeout: float) -> None:
+        raise NotImplementedError
+
+
+class LocalHashStore(HashStore):
+    """
+    Хранилище в памяти процесса для разработки и тестов. Срок жизни ключей не учитывается.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = defaultdict(dict)
+
+    def get_all(self, key: str) -> dict[str, str]:
+        with self._lock:
+            return dict(self._data.get(key, {}))
+
+    def incr(self, key: str, field: str, amount: int) -> int:
+        with self._lock:
+            value = self._data[key][field] = str(int(self._data[key].get(field, 0)) + amount)
+            return int(value)
+
+    def set(self, key: str, field: str, value, only_new: bool = False) -> None:
+        with self._lock:
+            if not only_new or field not in self._data[key]:
+                self._data[key][field] = str(value)
+
+    def delete(self, key: str, *fields: str) -> None:
+        with self._lock:
+            if not fields:
+                self._data.pop(key, None)
+                return
+            for field in fields:
+                self._data[key].pop(field, None)
+
+    def touch(self, key: str, timeout: float) -> None:
+        pass
+
+
+class RedisHashStore(HashStore):
+    """
+    Хранилище в Redis, общее для всех процессов
+    """
+
+    def __init__(self):
+        import redis
+        self._redis = redis.Redis.from_url(settings.CART_REDIS_URL)
+
+    def get_all(self, key: str) -> dict[str, str]:
+        return {field.decode(): value.decode() for field, value in self._redis.hgetall(key).items()}
+
+    def incr(self, key: str, field: str, amount: int) -> int:
+        return self._redis.hincrby(key, field, amount)
+
+    def set(self, key: str, field: str, value, only_new: bool = False) -> None:
+        if only_new:
+            self._redis.hsetnx(key, field, value)
+        else:
+            self._redis.hset(key, field, value)
+
+    def delete(self, key: str, *fields: str) -> None:
+        if fields:
+            self._redis.hdel(key, *fields)
+        else:
+            self._redis.delete(key)
+
+    def touch(self, key: str, timeout: float) -> None:
+        self._redis.expire(key, int(timeout))
+
+
+@lru_cache(maxsize=None)
+def _load_store(path: str) -> HashStore:
+    return import_string(path)()
+
+
+def get_store() -> HashStore:
+    return _load_store(settings.CART_STORE)
+
+
+def get_cart_key(owner: str) -> str:
+    return f'cart:{owner}'
+
+
+class KeyValueCartBackend(OwnerCartBackend):
+    """
+    Корзина в хранилище ключ-значение (settings.CART_STORE): словарь на владельца
+    с полями '<id>:quantity' и '<id>:price'. Количество меняется атомарным инкрементом поля.
+    """
+
+    def load(self) -> dict[str, dict]:
+        if (owner := self.owner) is None:
+            return {}
+        cart = defaultdict(dict)
+        for field, value in get_store().get_all(get_cart_key(owner)).items():
+            product_shop_id, name = field.split(':')
+            cart[product_shop_id][name] = int(value) if name == 'quantity' else float(value)
+        return {product_shop_id: item for product_shop_id, item in cart.items() if item.get('quantity', 0) > 0}
+
+    def add(self, product_shop_id: str, price: float, quantity: int, update_quantity: bool = False) -> None:
+        store = get_store()
+        key = get_cart_key(get_cart_owner(self.request, create=True))
+        store.set(key, f'{product_shop_id}:price', price, only_new=True)
+        if update_quantity:
+            store.set(key, f'{product_shop_id}:quantity', quantity)
+        else:
+            store.incr(key, f'{product_shop_id}:quantity', quantity)
+        store.touch(key, CART_LIFETIME)
+        self._changed()
+
+    def minus(self, product_shop_id: str) -> None:
+        if (owner := self.owner) is None:
+            return
+        store = get_store()
+        key = get_cart_key(owner)
+        if store.incr(key, f'{product_shop_id}:quantity', -1) < 1:
+            store.delete(key, f'{product_shop_id}:quantity', f'{product_shop_id}:price')
+        self._changed()
+
+    def remove(self, product_shop_id: str) -> None:
+        if (owner := self.owner) is not None:
+            get_store().delete(get_cart_key(owner), f'{product_shop_id}:quantity', f'{product_shop_id}:price')
+            self._changed()
+
+    @classmethod
+    def delete_owner(cls, owner: str) -> None:
+        get_store().delete(get_cart_key(owner))
+
+    @classmethod
+    def merge_owner(cls, source: str, target: str) -> None:
+        store = get_store()
+        source_key, target_key = get_cart_key(source), get_cart_key(target)
+        for field, value in store.get_all(source_key).items():
+            if field.endswith(':quantity'):
+                store.incr(target_key, field, int(value))
+            else:
+                store.set(target_key, field, value, only_new=True)
+        store.delete(source_key)
+        store.touch(target_key, CART_LIFETIME)
+
+
+def get_cart_backend(request: HttpRequest) -> CartBackend:
+    return import_string(settings.CART_BACKEND)(request)
@@ -1,65 +1,141 @@
-from django.conf import settings
+from decimal import Decimal
+
+from django.http import HttpRequest
+from django.utils.functional import cached_property
 from djmoney.money import Money
 
+from app_orders.services.holds import get_available
 from app_shops.models.shop import ProductShop
 from app_shops.services.functions import conversion_to_dollar
+from .backends import get_cart_backend
+
+
+class CartSummary:
+    """
+    Итоги корзины для шапки сайта: количество товаров и стоимость в рублях.
+    Стоимость в валюте языка запроса считается при первом обращении.
+    """
+
+    def __init__(self, count: int, total_rub: Decimal, language_code: str):
+        self.count = count
+        self.total_rub = total_rub
+        self.language_code = language_code
+
+    @cached_property
+    def total_price(self) -> Money:
+        total_price_rub = Money(self.total_rub, 'RUB')
+        if self.language_code == 'ru':
+            return total_price_rub
+        return conversion_to_dollar(total_price_rub)
 
 
 class Cart:
 
     def __init__(self, request):
-        """Инициализация объекта корзины."""
+        """
+        Инициализация объекта корзины.
+        Позиции корзины загружаются из хранилища (settings.CART_BACKEND) при первом обращении.
+        """
         self.request = request
-        self.session = request.session
-        session_cart = self.session.get(settings.CART_SESSION_ID)
-        if not session_cart:
-            session_cart = self.session[settings.CART_SESSION_ID] = {}
-        self.cart = session_cart
+        self.backend = get_cart_backend(request)
+
+    @cached_property
+    def cart(self) -> dict[str, dict]:
+        return self.backend.load()
+
+    @cached_property
+    def summary(self) -> CartSummary:
+        """
+        Итоги корзины берутся из хранилища корзины,
+        а после изменения корзины считаются по ее позициям и сохраняются.
+        """
+        if (summary := self.backend.load_summary()) is None:
+            summary = {'count': len(self), 'total': str(self.get_total_price_rub().amount)}
+            if summary['count']:
+                self.backend.save_summary(summary)
+        return CartSummary(summary['count'], Decimal(summary['total']), self.request.LANGUAGE_CODE)
+
+    def _reset(self):
+        """Сброс загруженных позиций и итогов после изменения корзины в хранилище"""
+        self.__dict__.pop('cart', None)
+        self.__dict__.pop('summary', None)
 
     def add(self, product_shop, quantity=1, update_quantity=False):
         """
         Добавить продукт в корзину или обновить его количество.
+        Товар, уже лежащий в корзине, сохраняет цену на момент добавления.
         """
-        product_shop_id = str(product_shop.id)
-        if product_shop_id not in self.cart:
-            if product_shop.discount_price:
-                price = float(round(product_shop.discount_price, 2))
-            else:
-                price = float(product_shop.price.amount)
-            self.cart[product_shop_id] = {'quantity': 0, 'price': price}
-        if update_quantity:
-            self.cart[product_shop_id]['quantity'] = quantity
-        else:
-            self.cart[product_shop_id]['quantity'] += quantity
-        self.save()
+        key = str(product_shop.id)
+        price = self.cart[key]['price'] if key in self.cart else self._get_price(product_shop)
+        self.backend.add(key, price, quantity, update_quantity)
+        self._reset()
+
+    @staticmethod
+    def _get_price(product_shop) -> float:
+        if product_shop.discount_price:
+            return float(round(product_shop.discount_price, 2))
+        return float(product_shop.price.amount)
 
     def minus(self, product_shop):
         """
         Удалить один экземпляр продукта из корзины
         """
-        product_shop_id = str(product_shop.id)
-        if product_shop_id in self.cart:
-            self.cart[product_shop_id]['quantity'] -= 1
-            self.save()
-        if self.cart[product_shop_id]['quantity'] < 1:
-            self.remove(product_shop_id)
-
-    def save(self):
-        """Обновление сессии cart"""
-        self.session[settings.CART_SESSION_ID] = self.cart
+        self.backend.minus(str(product_shop.id))
+        self._reset()
 
     def remove(self, product_shop_id):
         """
         Удаление товара из корзины.
         """
+        self.backend.remove(str(product_shop_id))
+        self._reset()
+
+    def set_quantity(self, product_shop_id, quantity):
+        """
+        Установить количество товара, уже лежащего в корзине, по цене на момент добавления.
+        Нулевое количество удаляет товар из корзины.
+        """
         product_shop_id = str(product_shop_id)
-        if product_shop_id in self.cart:
-            del self.cart[product_shop_id]
-            self.save()
+        if quantity < 1:
+            self.remove(product_shop_id)
+        elif product_shop_id in self.cart:
+            self.backend.add(product_shop_id, self.cart[product_shop_id]['price'], quantity, update_quantity=True)
+            self._reset()
+
+    def update_many(self, changes: dict[int, int], product_shops: dict[int, ProductShop]):
+        """
+        Установить количество нескольких товаров: лежащие в корзине товары сохраняют цену на момент добавления,
+        новые товары берутся из product_shops (предложения с аннотацией discount_price).
+        Позиции корзины загружаются один раз на все изменения.
+        """
+        cart = self.cart
+        for product_shop_id, quantity in changes.items():
+            key = str(product_shop_id)
+            if quantity < 1:
+                self.backend.remove(key)
+            elif key in cart:
+                self.backend.add(key, cart[key]['price'], quantity, update_quantity=True)
+            elif product_shop_id in product_shops:
+                self.backend.add(key, self._get_price(product_shops[product_shop_id]), quantity, update_quantity=True)
+        self._reset()
+
+    def get_item(self, product_shop_id) -> dict:
+        """Позиция корзины с ее стоимостью, без обращения к базе данных товаров"""
+        item = self.cart.get(str(product_shop_id))
+        if item is None:
+            return {'id': int(product_shop_id), 'quantity': 0}
+        return {'id': int(product_shop_id), 'quantity': item['quantity'], 'price': item['price'],
+                'total': round(item['price'] * item['quantity'], 2)}
+
+    def is_empty(self) -> bool:
+        if 'cart' in self.__dict__:
+            return not self.cart
+        return self.backend.is_empty()
 
     def __iter__(self):
         """
-        Перебор элементов в корзине и получение продуктов из базы данных.
+        Перебор элементов в корзине и получение продуктов из базы данных
+        вместе с доступным для заказа количеством (остаток за вычетом резервов других заказов).
         """
         product_ids = self.cart.keys()
         # получение объектов product и добавление их в корзину
@@ -74,8 +150,11 @@ class Cart:
             for product_shop_id, cart_item in self.cart.items()
         }
 
+        products = list(products)
+        available = get_available(products)
         for product_shop in products:
             goods[str(product_shop.id)]['product'] = product_shop
+            goods[str(product_shop.id)]['available'] = available[product_shop.id]
         yield from goods.values()
 
     def __len__(self):
@@ -102,8 +181,9 @@ class Cart:
             return conversion_to_dollar(total_price_rub)
 
     def clear(self):
-        """Удаление корзины из сессии"""
-        del self.session[settings.CART_SESSION_ID]
+        """Удаление корзины из хранилища"""
+        self.backend.clear()
+        self._reset()
 
     def validate_goods(self):
         cart_dict_copy = self.cart.copy()
@@ -113,3 +193,10 @@ class Cart:
         for product_shop in goods:
             if product_shop.is_active is False or product_shop.product.is_active is False:
                 self.remove(product_shop.id)
+
+
+def get_request_cart(request: HttpRequest) -> Cart:
+    """Корзина текущего запроса: создается один раз на запрос и переиспользуется всеми шаблонами"""
+    if not hasattr(request, '_cart'):
+        request._cart = Cart(request)
+    return request._cart
@@ -0,0 +1,23 @@
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class CartItem(models.Model):
+    """
+    Позиция корзины, хранящейся в базе данных.
+    owner - владелец корзины: пользователь ('user:<id>') или анонимный покупатель ('anon:<токен>').
+    """
+    owner = models.CharField(max_length=64, verbose_name=_('owner'))
+    product_shop = models.ForeignKey('app_shops.ProductShop', on_delete=models.CASCADE, related_name='+',
+                                     verbose_name=_('product shop'))
+    quantity = models.PositiveIntegerField(default=0, verbose_name=_('quantity'))
+    price = models.DecimalField(max_digits=8, decimal_places=2, verbose_name=_('price'))
+    updated = models.DateTimeField(auto_now=True, verbose_name=_('updated'))
+
+    def __str__(self) -> str:
+        return f'{self.owner}: {self.product_shop_id} x {self.quantity}'
+
+    class Meta:
+        verbose_name_plural = _('cart items')
+        verbose_name = _('cart item')
+        constraints = [models.UniqueConstraint(fields=['owner', 'product_shop'], name='unique_cart_item')]
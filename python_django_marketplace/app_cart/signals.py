@@ -0,0 +1,11 @@
+from django.conf import settings
+from django.contrib.auth.signals import user_logged_in
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+
+@receiver(user_logged_in)
+def merge_cart_on_login(**kwargs) -> None:
+    """Перенос корзины анонимного покупателя в корзину вошедшего пользователя"""
+    if (request := kwargs.get('request')) is not None:
+        import_string(settings.CART_BACKEND).merge(request, kwargs.get('user'))
@@ -0,0 +1,149 @@
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.urls import reverse
+from djmoney.money import Money
+
+from app_cart.backends import get_store
+from app_cart.models import CartItem
+from app_shops.models.shop import ProductShop
+from app_shops.tests.test_models import CustomTestCase, name, password
+
+
+class SessionCartTest(CustomTestCase):
+    def test_add_and_minus(self):
+        """
+        Товар добавляется в корзину в сессии, уменьшение до нуля удаляет позицию
+        """
+        self.client.post(reverse('cart_add', args=[self.product_shop.pk]), data={'quantity': 2})
+        self.assertEqual(self.client.session['cart'][str(self.product_shop.pk)], {'quantity': 2, 'price': 90.0})
+
+        self.client.get(reverse('cart_change', args=[self.product_shop.pk, 'minus']))
+        self.client.get(reverse('cart_change', args=[self.product_shop.pk, 'minus']))
+        self.assertEqual(self.client.session['cart'], {})
+
+    def test_plus_keeps_price(self):
+        """
+        Кнопка "+" увеличивает количество товара в корзине по цене на момент добавления
+        """
+        self.client.post(reverse('cart_add', args=[self.product_shop.pk]), data={'quantity': 2})
+        ProductShop.objects.filter(id=self.product_shop.pk).update(price=Money(200, 'RUB'))
+
+        response = self.client.get(reverse('cart_change', args=[self.product_shop.pk, 'plus']))
+
+        self.assertRedirects(response, reverse('cart_detail'))
+        self.assertEqual(self.client.session['cart'][str(self.product_shop.pk)], {'quantity': 3, 'price': 90.0})
+
+    def test_summary_persisted_until_cart_changes(self):
+        """
+        Итоги корзины сохраняются после первого подсчета и сбрасываются при изменении корзины
+        """
+        self.client.post(reverse('cart_add', args=[self.product_shop.pk]), data={'quantity': 2})
+        self.assertNotIn('cart_summary', self.client.session)
+
+        response = self.client.get(reverse('home'))
+        self.assertEqual(response.context['cart_summary'].count, 2)
+        self.assertEqual(self.client.session['cart_summary']['count'], 2)
+
+        self.client.get(reverse('cart_change', args=[self.product_shop.pk, 'minus']))
+        self.assertNotIn('cart_summary', self.client.session)
+        self.assertEqual(self.client.get(reverse('home')).context['cart_summary'].count, 1)
+
+    def test_browsing_does_not_create_cart(self):
+        """
+        Просмотр страниц не записывает пустую корзину в сессию
+        """
+        self.client.get(reverse('home'))
+        self.assertNotIn('cart', self.client.session)
+
+
+@override_settings(CART_BACKEND='app_cart.backends.DatabaseCartBackend')
+class DatabaseCartTest(CustomTestCase):
+    def test_items_stored_per_owner(self):
+        """
+        Корзина хранится в таблице позиций, повторное добавление увеличивает количество
+        """
+        self.client.post(reverse('cart_add', args=[self.product_shop.pk]))
+        self.client.post(reverse('cart_add', args=[self.product_shop.pk]), data={'quantity': 2})
+
+        item = CartItem.objects.get(product_shop=self.product_shop)
+        self.assertTrue(item.owner.startswith('anon:'))
+        self.assertEqual(item.quantity, 3)
+        self.assertNotIn('cart', self.client.session)
+
+    def test_anonymous_cart_merged_on_login(self):
+        """
+        При входе корзина анонимного покупателя объединяется с корзиной пользователя
+        """
+        user = get_user_model().objects.get(username=name)
+        CartItem.objects.create(owner=f'user:{user.id}', product_shop=self.product_shop, quantity=1, price=90)
+        self.client.post(reverse('cart_add', args=[self.product_shop.pk]), data={'quantity': 2})
+
+        self.client.login(username=name, password=password)
+
+        item = CartItem.objects.get(product_shop=self.product_shop)
+        self.assertEqual(item.owner, f'user:{user.id}')
+        self.assertEqual(item.quantity, 3)
+
+
+@override_settings(CART_BACKEND='app_cart.backends.KeyValueCartBackend',
+                   CART_STORE='app_cart.backends.LocalHashStore')
+class KeyValueCartTest(CustomTestCase):
+    def test_cart_follows_user_after_login(self):
+        """
+        Корзина в хранилище ключ-значение переносится к пользователю при входе
+        """
+        user = get_user_model().objects.get(username=name)
+        get_store().delete(f'cart:user:{user.id}')
+        self.client.post(reverse('cart_add', args=[self.product_shop.pk]), data={'quantity': 2})
+
+        self.client.login(username=name, password=password)
+
+        self.assertEqual(get_store().get_all(f'cart:user:{user.id}'),
+                         {f'{self.product_shop.pk}:price': '90.0', f'{self.product_shop.pk}:quantity': '2'})
+        self.client.get(reverse('cart_change', args=[self.product_shop.pk, 'minus']))
+        self.client.get(reverse('cart_change', args=[self.product_shop.pk, 'minus']))
+        self.assertEqual(get_store().get_all(f'cart:user:{user.id}'), {})
+
+
+class CartApiTest(CustomTestCase):
+    def test_add_and_change(self):
+        """
+        JSON-запросы изменяют корзину и возвращают позицию и итоги корзины
+        """
+        response = self.client.post(reverse('cart_api_add', args=[self.product_shop.pk]), data={'quantity': 2})
+        self.assertEqual(response.json()['items'], [{'id': self.product_shop.pk, 'quantity': 2, 'price': 90.0,
+                                                     'total': 180.0}])
+        self.assertEqual(response.json()['count'], 2)
+
+        response = self.client.post(reverse('cart_api_change', args=[self.product_shop.pk]), data={'quantity': 5})
+        self.assertEqual(response.json()['items'][0]['quantity'], 5)
+        self.assertEqual(response.json()['count'], 5)
+
+        response = self.client.post(reverse('cart_api_remove', args=[self.product_shop.pk]))
+        self.assertEqual(response.json()['items'], [{'id': self.product_shop.pk, 'quantity': 0}])
+        self.assertEqual(response.json()['count'], 0)
+
+    def test_batch(self):
+        """
+        Пакетный запрос добавляет новые товары и изменяет количество уже добавленных
+        """
+        response = self.client.post(reverse('cart_api_batch'),
+                                    data={'items': [{'id': self.product_shop.pk, 'quantity': 3}]},
+                                    content_type='application/json')
+        self.assertEqual(response.json()['count'], 3)
+
+        response = self.client.post(reverse('cart_api_batch'),
+                                    data={'items': [{'id': self.product_shop.pk, 'quantity': 1}]},
+                                    content_type='application/json')
+        self.assertEqual(response.json()['items'][0]['quantity'], 1)
+
+    def test_invalid_requests(self):
+        """
+        Некорректное количество и товар не из корзины возвращают ошибку
+        """
+        response = self.client.post(reverse('cart_api_add', args=[self.product_shop.pk]), data={'quantity': 'x'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(reverse('cart_api_change', args=[self.product_shop.pk]), data={'quantity': 1})
+        self.assertEqual(response.status_code, 404)
+        response = self.client.post(reverse('cart_api_batch'), data='{}', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
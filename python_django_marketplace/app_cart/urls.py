@@ -7,4 +7,8 @@ urlpatterns = [
     path('add/<int:product_shop_id>/', views.cart_add, name='cart_add'),
     path('remove/<int:product_shop_id>/', views.cart_remove, name='cart_remove'),
     path('change/<int:product_shop_id>/<str:type>', views.cart_change_quantity, name='cart_change'),
+    path('api/add/<int:product_shop_id>/', views.cart_api_add, name='cart_api_add'),
+    path('api/change/<int:product_shop_id>/', views.cart_api_change, name='cart_api_change'),
+    path('api/remove/<int:product_shop_id>/', views.cart_api_remove, name='cart_api_remove'),
+    path('api/batch/', views.cart_api_batch, name='cart_api_batch'),
 ]
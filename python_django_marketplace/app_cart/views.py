@@ -1,25 +1,31 @@
-from django.http import HttpResponseRedirect
+import json
+from typing import Iterable, Optional
+
+from django.http import HttpRequest, HttpResponseRedirect, JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
+from django.utils.translation import gettext_lazy as _
+from django.views.decorators.http import require_POST
 
 from app_shops.models.shop import ProductShop
-from .cart import Cart
+from django_marketplace.constants import CART_ITEM_MAX_QUANTITY
+from .cart import Cart, get_request_cart
 
 
 def cart_add(request, product_shop_id):
     quantity = request.POST.get('quantity')
     if isinstance(quantity, str) and quantity.isdigit():
-        quantity = min(int(quantity), 10000)
+        quantity = min(int(quantity), CART_ITEM_MAX_QUANTITY)
     else:
         quantity = 1
-    cart = Cart(request)
+    cart = get_request_cart(request)
     product_shop = get_object_or_404(ProductShop.objects.with_discount_price(), id=product_shop_id)
     cart.add(product_shop=product_shop, quantity=quantity)
     return HttpResponseRedirect(request.META.get('HTTP_REFERER'))
 
 
 def cart_change_quantity(request, product_shop_id, type):
-    cart = Cart(request)
-    product_shop = get_object_or_404(ProductShop, id=product_shop_id)
+    cart = get_request_cart(request)
+    product_shop = get_object_or_404(ProductShop.objects.with_discount_price(), id=product_shop_id)
     if type == 'plus':
         cart.add(product_shop=product_shop)
     elif type == 'minus':
@@ -28,13 +34,94 @@ def cart_change_quantity(request, product_shop_id, type):
 
 
 def cart_remove(request, product_shop_id):
-    cart = Cart(request)
+    cart = get_request_cart(request)
     cart.remove(product_shop_id)
     return redirect('cart_detail')
 
 
 def cart_detail(request):
-    cart = Cart(request)
+    cart = get_request_cart(request)
     cart.validate_goods()
 
     return render(request, 'pages/cart.html', {'cart': cart})
+
+
+def _parse_quantity(value) -> Optional[int]:
+    """Количество товара из запроса: целое неотрицательное число, не больше CART_ITEM_MAX_QUANTITY"""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return min(value, CART_ITEM_MAX_QUANTITY) if value >= 0 else None
+    if isinstance(value, str) and value.isdigit():
+        return min(int(value), CART_ITEM_MAX_QUANTITY)
+    return None
+
+
+def _cart_response(cart: Cart, product_shop_ids: Iterable[int]) -> JsonResponse:
+    """Измененные позиции корзины и новые итоги корзины"""
+    summary = cart.summary
+    return JsonResponse({'items': [cart.get_item(product_shop_id) for product_shop_id in product_shop_ids],
+                         'count': summary.count,
+                         'total_price_rub': summary.total_rub,
+                         'total_price': str(summary.total_price)})
+
+
+def _error_response(message, status: int = 400) -> JsonResponse:
+    return JsonResponse({'error': message}, status=status)
+
+
+@require_POST
+def cart_api_add(request: HttpRequest, product_shop_id: int) -> JsonResponse:
+    """Добавление товара в корзину: одна выборка предложения магазина с ценой со скидкой"""
+    quantity = _parse_quantity(request.POST.get('quantity', '1'))
+    if not quantity:
+        return _error_response(_('Quantity must be a positive integer'))
+    product_shop = ProductShop.objects.with_discount_price().filter(id=product_shop_id, is_active=True).first()
+    if product_shop is None:
+        return _error_response(_('Product not found'), status=404)
+
+    cart = get_request_cart(request)
+    cart.add(product_shop=product_shop, quantity=quantity)
+    return _cart_response(cart, [product_shop_id])
+
+
+@require_POST
+def cart_api_change(request: HttpRequest, product_shop_id: int) -> JsonResponse:
+    """Изменение количества товара в корзине, нулевое количество удаляет товар"""
+    quantity = _parse_quantity(request.POST.get('quantity'))
+    if quantity is None:
+        return _error_response(_('Quantity must be a non-negative integer'))
+    cart = get_request_cart(request)
+    if str(product_shop_id) not in cart.cart:
+        return _error_response(_('Product is not in the cart'), status=404)
+
+    cart.set_quantity(product_shop_id, quantity)
+    return _cart_response(cart, [product_shop_id])
+
+
+@require_POST
+def cart_api_remove(request: HttpRequest, product_shop_id: int) -> JsonResponse:
+    cart = get_request_cart(request)
+    cart.remove(product_shop_id)
+    return _cart_response(cart, [product_shop_id])
+
+
+@require_POST
+def cart_api_batch(request: HttpRequest) -> JsonResponse:
+    """
+    Применение нескольких изменений корзины за один запрос.
+    Тело запроса - JSON {"items": [{"id": <id предложения магазина>, "quantity": <количество>}, ...]}.
+    Товары, которых еще нет в корзине, выбираются из базы данных одним запросом.
+    """
+    try:
+        items = json.loads(request.body)['items']
+        changes = {int(item['id']): _parse_quantity(item['quantity']) for item in items}
+    except (ValueError, KeyError, TypeError):
+        return _error_response(_('Invalid request body'))
+    if None in changes.values():
+        return _error_response(_('Quantity must be a non-negative integer'))
+
+    cart = get_request_cart(request)
+    new_ids = [product_shop_id for product_shop_id, quantity in changes.items()
+               if quantity and str(product_shop_id) not in cart.cart]
+    product_shops = ProductShop.objects.with_discount_price().filter(id__in=new_ids, is_active=True).in_bulk()
+    cart.update_many(changes, product_shops)
+    return _cart_response(cart, changes)
@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+import django_filters as filters
+
+from .models import Order
+
+
+class OrderFilter(filters.FilterSet):
+    """
+    Отбор заказов истории покупателя по статусу и дате оформления.
+    Границы дат сравниваются с полем created напрямую, чтобы выборка шла по индексу (buyer, -created).
+    """
+    status = filters.ChoiceFilter(choices=Order.ORDER_STATUS)
+    date_from = filters.DateFilter(field_name='created', lookup_expr='gte')
+    date_to = filters.DateFilter(method='filter_date_to')
+
+    class Meta:
+        model = Order
+        fields = ('status',)
+
+    @staticmethod
+    def filter_date_to(queryset, name, value):
+        return queryset.filter(created__lt=value + timedelta(days=1))
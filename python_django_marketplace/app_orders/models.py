@@ -1,7 +1,9 @@
 from autoslug import AutoSlugField
 from django.contrib.auth.models import User
 from django.db import models
+from django.db.models import Sum
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from djmoney.models.fields import MoneyField
 from phonenumber_field.modelfields import PhoneNumberField
@@ -43,6 +45,7 @@ class Order(models.Model):
     class Meta:
         verbose_name_plural = _('orders')
         verbose_name = _('order')
+        indexes = [models.Index(fields=['buyer', '-created'])]
 
     def get_absolute_url(self) -> str:
         return reverse('order_detail', kwargs={'pk': self.pk})
@@ -64,11 +67,45 @@ class OrderItem(models.Model):
         verbose_name = _('order item')
 
 
+class PaymentItemManager(models.Manager):
+    """
+    Менеджер для PaymentItem, переводящий платежи между состояниями условным обновлением
+    """
+
+    def transition(self, order_id: int, status: str, **fields) -> bool:
+        """
+        Переводит платеж заказа в состояние status, только если текущее состояние допускает такой переход.
+        Возвращает False, если платеж уже в другом состоянии (например, его обработал параллельный запрос).
+        """
+        return bool(self.filter(order_id=order_id, status__in=PaymentItem.TRANSITIONS[status])
+                    .update(status=status, is_passed=status == PaymentItem.STATUS_PAID,
+                            status_changed=timezone.now(), **fields))
+
+
 class PaymentItem(models.Model):
     """
     Экземпляр оплаты
     """
 
+    STATUS_NEW = 'new'
+    STATUS_PROCESSING = 'processing'
+    STATUS_PAID = 'paid'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = (
+        (STATUS_NEW, _('Awaiting payment')),
+        (STATUS_PROCESSING, _('Processing')),
+        (STATUS_PAID, _('Passed')),
+        (STATUS_FAILED, _('Payment failed')),
+    )
+
+    # Из каких состояний допустим переход в ключевое; неудачную оплату можно повторить
+    TRANSITIONS = {
+        STATUS_PROCESSING: (STATUS_NEW, STATUS_FAILED),
+        STATUS_PAID: (STATUS_PROCESSING,),
+        STATUS_FAILED: (STATUS_PROCESSING,),
+    }
+
     PAYMENT_CATEGORY = (
         ('bank-card', _('Bank card')),
         ('some-one', _('Some other way')),
@@ -86,11 +123,64 @@ class PaymentItem(models.Model):
                              default_currency='RUB', verbose_name=_('total price'))
     from_account = models.CharField(max_length=50, null=True, blank=True, verbose_name=_('from account'))
     is_passed = models.BooleanField(default=False, choices=IS_PASSED_CHOICES, verbose_name=_('is passed'))
+    status = models.CharField(max_length=10, default=STATUS_NEW, choices=STATUS_CHOICES,
+                              verbose_name=_('payment status'))
+    status_changed = models.DateTimeField(null=True, blank=True, verbose_name=_('status changed'))
+
+    objects = PaymentItemManager()
 
     class Meta:
         verbose_name_plural = _('payment items')
         verbose_name = _('payment item')
 
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (self.STATUS_PAID, self.STATUS_FAILED)
+
+
+class StockHoldManager(models.Manager):
+    """
+    Менеджер для StockHold, добавляющий выборку действующих резервов и подсчет зарезервированного количества
+    """
+    def active(self):
+        return self.filter(expires_at__gt=timezone.now())
+
+    def held_quantities(self, exclude_order_id: int = None, **filters) -> dict[int, int]:
+        """
+        Количество товара в действующих резервах по предложениям магазинов: id предложения -> количество.
+        Резервы заказа exclude_order_id не учитываются.
+        """
+        holds = self.active().filter(**filters)
+        if exclude_order_id is not None:
+            holds = holds.exclude(order_id=exclude_order_id)
+        return dict(holds
+                    .values('product_shop_id')
+                    .annotate(total=Sum('quantity'))
+                    .order_by()
+                    .values_list('product_shop_id', 'total'))
+
+
+class StockHold(models.Model):
+    """
+    Резерв товара под оформленный заказ. До истечения срока резерва товар недоступен другим покупателям,
+    доступное количество предложения - count_left за вычетом действующих резервов.
+    """
+    order = models.ForeignKey('Order', on_delete=models.CASCADE, related_name='holds', verbose_name=_('order'))
+    product_shop = models.ForeignKey(ProductShop, on_delete=models.CASCADE, related_name='holds',
+                                     verbose_name=_('product'))
+    quantity = models.PositiveIntegerField(verbose_name=_('quantity'))
+    expires_at = models.DateTimeField(db_index=True, verbose_name=_('expires at'))
+
+    objects = StockHoldManager()
+
+    def __str__(self):
+        return f'Hold of product shop {self.product_shop_id}: {self.quantity}'
+
+    class Meta:
+        verbose_name_plural = _('stock holds')
+        verbose_name = _('stock hold')
+        indexes = [models.Index(fields=['product_shop', 'expires_at'])]
+
 
 class DeliveryCategory(models.Model):
     """
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from datetime import timedelta
+from typing import Iterable
+
+from django.utils import timezone
+
+from app_orders.models import Order, OrderItem, StockHold
+from app_shops.models.shop import ProductShop
+from app_shops.services.summary import refresh_product_summaries
+from django_marketplace.constants import STOCK_HOLD_LIFETIME
+
+
+def get_available(product_shops: Iterable[ProductShop], exclude_order_id: int = None) -> dict[int, int]:
+    """
+    Доступное количество товара по предложениям магазинов: остаток за вычетом действующих резервов,
+    кроме резервов заказа exclude_order_id
+    """
+    product_shops = list(product_shops)
+    held = StockHold.objects.held_quantities(exclude_order_id=exclude_order_id,
+                                             product_shop_id__in=[product_shop.id for product_shop in product_shops])
+    return {product_shop.id: product_shop.count_left - held.get(product_shop.id, 0)
+            for product_shop in product_shops}
+
+
+def hold_stock(order: Order, goods: Iterable[OrderItem]) -> None:
+    """Резервирует товары заказа на STOCK_HOLD_LIFETIME"""
+    expires_at = timezone.now() + timedelta(seconds=STOCK_HOLD_LIFETIME)
+    StockHold.objects.bulk_create([StockHold(order=order, product_shop_id=item.product_shop_id,
+                                             quantity=item.quantity, expires_at=expires_at)
+                                   for item in goods])
+
+
+def release_order_holds(order_id: int) -> None:
+    """Снимает резервы заказа, например после списания товаров при оплате"""
+    StockHold.objects.filter(order_id=order_id).delete()
+
+
+def release_expired_holds() -> int:
+    """Удаляет истекшие резервы и пересчитывает наличие затронутых товаров. Возвращает количество резервов"""
+    expired = list(StockHold.objects.filter(expires_at__lte=timezone.now())
+                   .values_list('id', 'product_shop__product_id'))
+    if not expired:
+        return 0
+    StockHold.objects.filter(id__in=[hold_id for hold_id, _product_id in expired]).delete()
+    refresh_product_summaries({product_id for _hold_id, product_id in expired})
+    return len(expired)
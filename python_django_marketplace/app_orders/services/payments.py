@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+from collections import Counter
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from app_orders.models import Order, OrderItem, PaymentItem, StockHold
+from app_orders.signals import order_paid
+from app_shops.models.shop import ProductShop
+from django_marketplace.constants import PAYMENT_PROCESSING_TIMEOUT
+from .holds import release_order_holds
+
+
+class NotEnoughStock(Exception):
+    """Остатка предложения магазина не хватает для списания товаров заказа"""
+
+
+def _quantity_case(quantities: dict[int, int]) -> Case:
+    return Case(*[When(id=product_shop_id, then=Value(quantity)) for product_shop_id, quantity in quantities.items()],
+                default=Value(0), output_field=IntegerField())
+
+
+def settle_order(order_id: int) -> bool:
+    """
+    Списывает товары оплаченного заказа и отмечает заказ и платеж оплаченными в одной транзакции.
+    Платеж переводится из обработки в оплаченные условным обновлением, поэтому повторный вызов
+    для того же заказа ничего не делает и возвращает False.
+    Остатки и продажи меняются одним UPDATE с F-выражениями, который не трогает предложения, остатка которых
+    за вычетом действующих резервов других заказов не хватает: в этом случае транзакция откатывается
+    с исключением NotEnoughStock. Предложения блокируются так же, как при оформлении заказа,
+    поэтому новые резервы не появляются между подсчетом резервов и списанием.
+    После списания отправляется сигнал order_paid.
+    """
+    with transaction.atomic():
+        if not PaymentItem.objects.transition(order_id, PaymentItem.STATUS_PAID):
+            return False
+        Order.objects.filter(id=order_id).update(status='p')
+
+        quantities = Counter()
+        for product_shop_id, quantity in OrderItem.objects.filter(order_id=order_id) \
+                .values_list('product_shop_id', 'quantity'):
+            quantities[product_shop_id] += quantity
+        list(ProductShop.objects.select_for_update().filter(id__in=quantities).order_by('id').values_list('id'))
+        held = StockHold.objects.held_quantities(exclude_order_id=order_id, product_shop_id__in=quantities)
+        required = _quantity_case({product_shop_id: quantity + held.get(product_shop_id, 0)
+                                   for product_shop_id, quantity in quantities.items()})
+        quantity = _quantity_case(quantities)
+        updated = ProductShop.objects \
+            .filter(id__in=quantities, count_left__gte=required) \
+            .update(count_left=F('count_left') - quantity, count_sold=F('count_sold') + quantity)
+        if updated != len(quantities):
+            raise NotEnoughStock(order_id)
+        release_order_holds(order_id)
+
+    product_shops = ProductShop.objects.filter(id__in=quantities).only('id', 'product_id', 'shop_id')
+    order_paid.send(sender=Order, order_id=order_id,
+                    sales=[(product_shop, quantities[product_shop.id]) for product_shop in product_shops])
+    return True
+
+
+def start_payment(order_id: int, account: str) -> bool:
+    """
+    Переводит платеж заказа в обработку и запоминает счет плательщика.
+    Возвращает False, если платеж уже обрабатывается или оплачен: повторная отправка формы игнорируется.
+    """
+    return PaymentItem.objects.transition(order_id, PaymentItem.STATUS_PROCESSING, from_account=account)
+
+
+def is_payment_approved(account: str) -> bool:
+    """Ответ платежной системы: оплата проходит со счетов, оканчивающихся на четную цифру"""
+    last_sym = account[-1:]
+    return last_sym.isdigit() and int(last_sym) % 2 == 0
+
+
+def process_payment(order_id: int) -> str:
+    """
+    Обрабатывает платеж, переведенный в обработку: запрашивает ответ платежной системы
+    и либо списывает товары заказа, либо отмечает платеж неудачным. Возвращает итоговое состояние платежа.
+    """
+    account = PaymentItem.objects.filter(order_id=order_id, status=PaymentItem.STATUS_PROCESSING) \
+        .values_list('from_account', flat=True).first()
+    if account is None:
+        return PaymentItem.objects.filter(order_id=order_id).values_list('status', flat=True).first()
+
+    if is_payment_approved(account):
+        try:
+            settle_order(order_id)
+        except NotEnoughStock:
+            PaymentItem.objects.transition(order_id, PaymentItem.STATUS_FAILED)
+    else:
+        PaymentItem.objects.transition(order_id, PaymentItem.STATUS_FAILED)
+    return PaymentItem.objects.filter(order_id=order_id).values_list('status', flat=True).first()
+
+
+def fail_stale_payments() -> int:
+    """
+    Отмечает неудачными платежи, которые находятся в обработке дольше PAYMENT_PROCESSING_TIMEOUT
+    (задача обработки потеряна или воркер остановлен), чтобы покупатель мог оплатить заказ повторно.
+    Возвращает количество таких платежей.
+    """
+    now = timezone.now()
+    return PaymentItem.objects \
+        .filter(status=PaymentItem.STATUS_PROCESSING,
+                status_changed__lte=now - timedelta(seconds=PAYMENT_PROCESSING_TIMEOUT)) \
+        .update(status=PaymentItem.STATUS_FAILED, is_passed=False, status_changed=now)
+
+
+def backfill_payment_statuses() -> int:
+    """
+    Заполняет состояние платежей, созданных до появления поля status: прошедшие платежи - оплачены,
+    платежи с указанным счетом, но не прошедшие - неудачны. Повторный запуск ничего не меняет.
+    """
+    paid = PaymentItem.objects.filter(is_passed=True).exclude(status=PaymentItem.STATUS_PAID) \
+        .update(status=PaymentItem.STATUS_PAID)
+    failed = PaymentItem.objects.filter(is_passed=False, status=PaymentItem.STATUS_NEW, from_account__isnull=False) \
+        .exclude(from_account='') \
+        .update(status=PaymentItem.STATUS_FAILED)
+    return paid + failed
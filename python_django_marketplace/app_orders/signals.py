@@ -0,0 +1,4 @@
+from django.dispatch import Signal
+
+# Заказ оплачен и товары списаны. Аргументы: order_id, sales - список пар (предложение магазина, количество)
+order_paid = Signal()
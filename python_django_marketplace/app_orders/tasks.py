@@ -0,0 +1,25 @@
+from celery import shared_task
+
+from .services.holds import release_expired_holds
+from .services.payments import fail_stale_payments, process_payment
+
+
+@shared_task(name='release_expired_holds')
+def release_stock_holds():
+    """Снятие резервов товаров, срок которых истек"""
+    release_expired_holds()
+
+
+@shared_task(name='process_payment', acks_late=True, reject_on_worker_lost=True)
+def process_order_payment(order_id: int) -> str:
+    """
+    Обработка платежа заказа вне веб-запроса. Сообщение подтверждается после выполнения,
+    поэтому при остановке воркера задача будет доставлена повторно; повторная обработка безопасна.
+    """
+    return process_payment(order_id)
+
+
+@shared_task(name='fail_stale_payments')
+def fail_stale_order_payments():
+    """Завершение зависших в обработке платежей"""
+    fail_stale_payments()
@@ -0,0 +1,68 @@
+from datetime import timedelta
+
+from django.urls import reverse
+from django.utils import timezone
+
+from app_orders.models import Order, StockHold
+from app_orders.services.holds import get_available, release_expired_holds
+from app_orders.tests.test_views import CustomTestCase, name, password
+from app_shops.models.summary import ProductSummary
+
+
+class StockHoldTest(CustomTestCase):
+
+    def setUp(self):
+        self.client.login(username=name, password=password)
+
+    def _make_order(self, quantity: int):
+        self.client.post(reverse('cart_add', args=[self.product_shop.pk]), data={'quantity': quantity})
+        return self.client.post(reverse('order'), data=self.order_data)
+
+    def test_order_holds_stock(self):
+        """Проверка, что оформленный заказ резервирует товар и уменьшает доступное количество"""
+        self._make_order(60)
+
+        hold = StockHold.objects.get(product_shop=self.product_shop)
+        self.assertEqual(hold.quantity, 60)
+        self.assertEqual(get_available([self.product_shop]), {self.product_shop.id: 40})
+
+    def test_held_stock_not_available_for_other_orders(self):
+        """Проверка, что зарезервированный товар нельзя заказать повторно"""
+        self._make_order(60)
+        session = self.client.session
+        session.pop('cart')
+        session.pop('order')
+        session.save()
+
+        response = self._make_order(60)
+        self.assertIn('not_enough_goods', response.context['form'].errors)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_resubmitted_checkout_replaces_own_holds(self):
+        """Проверка, что повторное оформление заказа не блокируется резервом своего неоплаченного заказа"""
+        self._make_order(60)
+        previous_order = Order.objects.get()
+
+        response = self.client.post(reverse('order'), data=self.order_data)
+        self.assertRedirects(response, reverse('payment-bank-card'), fetch_redirect_response=False)
+        self.assertEqual(Order.objects.count(), 2)
+        self.assertFalse(StockHold.objects.filter(order=previous_order).exists())
+        self.assertEqual(StockHold.objects.get().quantity, 60)
+
+    def test_hold_of_all_stock_removes_product_from_stock(self):
+        """Проверка, что резерв всего остатка снимает товар с наличия, а истечение резерва возвращает"""
+        self._make_order(100)
+        self.assertFalse(ProductSummary.objects.get(product=self.product).in_stock)
+
+        StockHold.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(release_expired_holds(), 1)
+        self.assertTrue(ProductSummary.objects.get(product=self.product).in_stock)
+
+    def test_payment_releases_holds(self):
+        """Проверка, что оплата списывает товар и снимает резерв заказа"""
+        self._make_order(10)
+        self.client.post(reverse('payment-bank-card'), data={'account_number': '1234 3456'})
+
+        self.assertFalse(StockHold.objects.exists())
+        self.product_shop.refresh_from_db()
+        self.assertEqual(get_available([self.product_shop]), {self.product_shop.id: 90})
@@ -0,0 +1,166 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from app_orders.models import Order, PaymentItem, StockHold
+from app_orders.services.payments import NotEnoughStock, backfill_payment_statuses, fail_stale_payments, \
+    settle_order, start_payment
+from app_orders.signals import order_paid
+from app_orders.tests.test_views import CustomTestCase, name, name2, password
+from app_shops.models.shop import ProductShop
+
+
+class SettleOrderTest(CustomTestCase):
+
+    def setUp(self):
+        self.client.login(username=name, password=password)
+        self.client.post(reverse('cart_add', args=[self.product_shop.pk]), data={'quantity': 10})
+        self.client.post(reverse('order'), data=self.order_data)
+        self.order = Order.objects.get(buyer=self.user)
+
+    def test_settle_order_once(self):
+        """Проверка, что повторная оплата заказа не списывает товары второй раз"""
+        events = []
+        order_paid.connect(lambda **kwargs: events.append(kwargs['sales']), weak=False, dispatch_uid='test_events')
+        self.addCleanup(order_paid.disconnect, dispatch_uid='test_events')
+
+        start_payment(self.order.id, '1234 3456')
+        self.assertTrue(settle_order(self.order.id))
+        self.assertFalse(settle_order(self.order.id))
+
+        product_shop = ProductShop.objects.get(id=self.product_shop.id)
+        self.assertEqual((product_shop.count_left, product_shop.count_sold), (90, 110))
+        self.assertEqual(Order.objects.get(id=self.order.id).status, 'p')
+        self.assertEqual(len(events), 1)
+        self.assertEqual([(item.id, quantity) for item, quantity in events[0]], [(self.product_shop.id, 10)])
+
+    def test_settle_order_without_stock_rolls_back(self):
+        """Проверка, что при нехватке остатка заказ не оплачивается и остатки не меняются"""
+        ProductShop.objects.filter(id=self.product_shop.id).update(count_left=5)
+        start_payment(self.order.id, '1234 3456')
+
+        with self.assertRaises(NotEnoughStock):
+            settle_order(self.order.id)
+
+        self.assertEqual(ProductShop.objects.get(id=self.product_shop.id).count_left, 5)
+        self.assertFalse(PaymentItem.objects.get(order=self.order).is_passed)
+        self.assertEqual(PaymentItem.objects.get(order=self.order).status, PaymentItem.STATUS_PROCESSING)
+        self.assertEqual(Order.objects.get(id=self.order.id).status, 'np')
+
+    def test_settle_order_respects_other_holds(self):
+        """Проверка, что заказ с истекшим резервом не списывает товар, зарезервированный другим заказом"""
+        StockHold.objects.filter(order=self.order).update(expires_at=timezone.now())
+        ProductShop.objects.filter(id=self.product_shop.id).update(count_left=15)
+        other_order = Order.objects.create(buyer=self.user, delivery_category=self.order.delivery_category,
+                                           name=name, phone=self.order.phone, email=self.order.email,
+                                           city=self.order.city, address=self.order.address)
+        StockHold.objects.create(order=other_order, product_shop=self.product_shop, quantity=10,
+                                 expires_at=timezone.now() + timedelta(minutes=5))
+        start_payment(self.order.id, '1234 3456')
+
+        with self.assertRaises(NotEnoughStock):
+            settle_order(self.order.id)
+        self.assertEqual(ProductShop.objects.get(id=self.product_shop.id).count_left, 15)
+
+    def test_settle_order_requires_processing(self):
+        """Проверка, что платеж, не переданный в обработку, не оплачивается"""
+        self.assertFalse(settle_order(self.order.id))
+        self.assertEqual(ProductShop.objects.get(id=self.product_shop.id).count_left, 100)
+
+    def test_double_post_is_safe(self):
+        """Проверка, что повторная отправка формы оплаты не списывает товары повторно"""
+        self.client.post(reverse('payment-bank-card'), data={'account_number': '1234 3456'})
+        self.client.post(reverse('payment-bank-card'), data={'account_number': '1234 3456'})
+
+        self.assertEqual(ProductShop.objects.get(id=self.product_shop.id).count_left, 90)
+
+
+class PaymentProcessingTest(CustomTestCase):
+
+    def setUp(self):
+        self.client.login(username=name, password=password)
+        self.client.post(reverse('cart_add', args=[self.product_shop.pk]), data={'quantity': 10})
+        self.client.post(reverse('order'), data=self.order_data)
+        self.order = Order.objects.get(buyer=self.user)
+
+    def test_payment_paid(self):
+        """Проверка, что одобренный платеж оплачивает заказ"""
+        self.client.post(reverse('payment-bank-card'), data={'account_number': '1234 3456'})
+
+        payment_item = PaymentItem.objects.get(order=self.order)
+        self.assertEqual(payment_item.status, PaymentItem.STATUS_PAID)
+        self.assertTrue(payment_item.is_passed)
+
+    def test_payment_failed(self):
+        """Проверка, что отклоненный платеж отмечается неудачным и остатки не меняются"""
+        self.client.post(reverse('payment-bank-card'), data={'account_number': '1234 3457'})
+
+        payment_item = PaymentItem.objects.get(order=self.order)
+        self.assertEqual(payment_item.status, PaymentItem.STATUS_FAILED)
+        self.assertFalse(payment_item.is_passed)
+        self.assertEqual(ProductShop.objects.get(id=self.product_shop.id).count_left, 100)
+
+    def test_failed_payment_can_be_retried(self):
+        """Проверка, что после неудачной оплаты заказ можно оплатить повторно"""
+        self.client.post(reverse('payment-bank-card'), data={'account_number': '1234 3457'})
+        self.client.post(reverse('payment-bank-card'), data={'account_number': '1234 3456'})
+
+        self.assertEqual(PaymentItem.objects.get(order=self.order).status, PaymentItem.STATUS_PAID)
+
+    @override_settings(PAYMENT_TASK_EAGER=False)
+    def test_payment_is_enqueued(self):
+        """Проверка, что без режима eager платеж передается в очередь и остается в обработке"""
+        with mock.patch('app_orders.views.process_order_payment.delay') as delay:
+            self.client.post(reverse('payment-bank-card'), data={'account_number': '1234 3456'})
+
+        delay.assert_called_once_with(self.order.id)
+        self.assertEqual(PaymentItem.objects.get(order=self.order).status, PaymentItem.STATUS_PROCESSING)
+
+    @override_settings(PAYMENT_TASK_EAGER=False)
+    def test_stale_processing_payment_can_be_retried(self):
+        """Проверка, что зависший в обработке платеж отмечается неудачным и его можно оплатить повторно"""
+        with mock.patch('app_orders.views.process_order_payment.delay'):
+            self.client.post(reverse('payment-bank-card'), data={'account_number': '1234 3456'})
+        self.assertEqual(fail_stale_payments(), 0)
+
+        PaymentItem.objects.filter(order=self.order).update(status_changed=timezone.now() - timedelta(hours=1))
+        self.assertEqual(fail_stale_payments(), 1)
+        self.assertEqual(PaymentItem.objects.get(order=self.order).status, PaymentItem.STATUS_FAILED)
+
+        with override_settings(PAYMENT_TASK_EAGER=True):
+            self.client.post(reverse('payment-bank-card'), data={'account_number': '1234 3456'})
+        self.assertEqual(PaymentItem.objects.get(order=self.order).status, PaymentItem.STATUS_PAID)
+
+    def test_backfill_payment_statuses(self):
+        """Проверка заполнения состояния платежей, созданных до появления поля status"""
+        PaymentItem.objects.filter(order=self.order).update(is_passed=True, status=PaymentItem.STATUS_NEW)
+
+        self.assertEqual(backfill_payment_statuses(), 1)
+        self.assertEqual(PaymentItem.objects.get(order=self.order).status, PaymentItem.STATUS_PAID)
+        self.assertEqual(backfill_payment_statuses(), 0)
+
+    def test_payment_status(self):
+        """Проверка состояния платежа, которое опрашивает страница ожидания оплаты"""
+        url = reverse('payment_status', args=[self.order.id])
+        self.assertEqual(self.client.get(url).json()['status'], PaymentItem.STATUS_NEW)
+
+        self.client.post(reverse('payment-bank-card'), data={'account_number': '1234 3456'})
+        data = self.client.get(url).json()
+
+        self.assertEqual(data['status'], PaymentItem.STATUS_PAID)
+        self.assertTrue(data['is_finished'])
+        self.assertEqual(data['redirect_to'], reverse('order_detail', args=[self.order.id]))
+
+    def test_payment_status_of_other_user(self):
+        """Проверка, что состояние чужого платежа недоступно"""
+        self.client.logout()
+        url = reverse('payment_status', args=[self.order.id])
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        get_user_model().objects.create_user(username=name2, password=password)
+        self.client.login(username=name2, password=password)
+        self.assertEqual(self.client.get(url).status_code, 404)
@@ -1,9 +1,9 @@
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from djmoney.money import Money
 
-from app_orders.models import DeliveryCategory, Order
+from app_orders.models import DeliveryCategory, Order, PaymentItem
 from app_shops.models.category import Category
 from app_shops.models.product import Product
 from app_shops.models.shop import Shop, ProductShop
@@ -20,6 +20,7 @@ phone = '+79999999999'
 phone2 = '+79999999998'
 
 
+@override_settings(PAYMENT_TASK_EAGER=True)
 class CustomTestCase(TestCase):
 
     @classmethod
@@ -87,6 +88,17 @@ class TestOrderView(CustomTestCase):
         response_text = response.context['form'].errors['not_enough_goods']
         self.assertIn(f'{product_name} is not active product', response_text)
 
+    def test_not_enough_goods_creates_nothing(self):
+        """Проверка, что при нехватке товара заказ, его позиции и платеж не создаются"""
+        self.product_shop.count_left = 5
+        self.product_shop.save()
+
+        response = self.client.post(reverse('order'), data=self.order_data)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('not_enough_goods', response.context['form'].errors)
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(PaymentItem.objects.exists())
+
 
 class TestPaymentView(CustomTestCase):
 
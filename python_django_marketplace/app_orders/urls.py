@@ -1,13 +1,14 @@
 from django.urls import path
 
 from .views import OrderView, PaymentView, ProgressPaymentView, OrderDetailView, get_delivery_category_info, \
-    PaymentSomeOneView
+    PaymentSomeOneView, get_payment_status
 
 urlpatterns = [
     path('checkout/', OrderView.as_view(), name='order'),
     path('payment/bank-card/', PaymentView.as_view(), name='payment-bank-card'),
     path('payment/some-one/', PaymentSomeOneView.as_view(), name='payment-some-one'),
     path('payment/progress/', ProgressPaymentView.as_view(), name='payment_progress'),
+    path('payment/status/<int:pk>/', get_payment_status, name='payment_status'),
     path('<int:pk>/', OrderDetailView.as_view(), name='order_detail'),
     path('delivery_info/<int:pk>/', get_delivery_category_info, name='order_delivery_info'),
 ]
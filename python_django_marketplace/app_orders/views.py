@@ -1,6 +1,8 @@
-from typing import Any
+from typing import Any, Optional
 
+from django.conf import settings
 from django.contrib.auth.mixins import UserPassesTestMixin
+from django.db import transaction
 from django.db.models import Prefetch, QuerySet
 from django.http import JsonResponse, HttpRequest, HttpResponse, Http404
 from django.shortcuts import redirect, get_object_or_404
@@ -9,12 +11,15 @@ from django.utils.translation import gettext_lazy as _
 from django.views.generic import FormView, TemplateView, DetailView
 from djmoney.contrib.exchange.models import convert_money
 
-from app_cart.cart import Cart
+from app_cart.cart import Cart, get_request_cart
 from app_shops.models.shop import ProductShop
-from app_shops.services.functions import get_object_or_none
+from app_shops.services.summary import refresh_product_summaries
 from django_marketplace.constants import ORDER_AMOUNT_WHICH_DELIVERY_FREE
 from .forms import OrderForm
-from .models import DeliveryCategory, Order, OrderItem, PaymentItem
+from .models import DeliveryCategory, Order, OrderItem, PaymentItem, StockHold
+from .services.holds import get_available, hold_stock, release_order_holds
+from .services.payments import start_payment
+from .tasks import process_order_payment
 
 
 class OrderView(UserPassesTestMixin, FormView):
@@ -26,8 +31,7 @@ class OrderView(UserPassesTestMixin, FormView):
 
     def test_func(self) -> bool:
         user = self.request.user
-        session = self.request.session
-        return user.is_authenticated and session.get('cart')
+        return user.is_authenticated and not get_request_cart(self.request).is_empty()
 
     def get_initial(self):
         initial = super().get_initial()
@@ -39,7 +43,7 @@ class OrderView(UserPassesTestMixin, FormView):
 
     def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
         context = super().get_context_data(**kwargs)
-        cart = Cart(self.request)
+        cart = get_request_cart(self.request)
         goods = self._get_goods_in_cart(cart)
 
         total_price = cart.get_total_price_rub()
@@ -57,7 +61,7 @@ class OrderView(UserPassesTestMixin, FormView):
 
     def form_valid(self, form: OrderForm):
         is_free_delivery = form.cleaned_data.get('is_free_delivery', False)
-        cart = Cart(self.request)
+        cart = get_request_cart(self.request)
         total_price = cart.get_total_price_rub()
         delivery_category: DeliveryCategory = form.cleaned_data.get('delivery_category')
 
@@ -66,17 +70,27 @@ class OrderView(UserPassesTestMixin, FormView):
             is_free_delivery = False
 
         order = self._make_order(form)
-
-        goods, error_messages = self._check_count_left_goods(cart, order)
-        if error_messages:
-            form.errors['not_enough_goods'] = error_messages
-            return super().form_invalid(form)
-
-        order.is_free_delivery = is_free_delivery
-        order.save()
-        OrderItem.objects.bulk_create(goods)
         payment_category = form.cleaned_data.get('payment_category')
-        PaymentItem.objects.create(order=order, payment_category=payment_category, total_price=total_price)
+
+        with transaction.atomic():
+            offers = self._lock_goods_in_cart(cart)
+            previous_order_id = self._get_previous_order_id()
+            goods, error_messages = self._check_count_left_goods(cart, order, offers, previous_order_id)
+            if error_messages:
+                form.errors['not_enough_goods'] = error_messages
+                return super().form_invalid(form)
+
+            order.is_free_delivery = is_free_delivery
+            order.save()
+            OrderItem.objects.bulk_create(goods)
+            PaymentItem.objects.create(order=order, payment_category=payment_category, total_price=total_price)
+            hold_stock(order, goods)
+            product_ids = {product_shop.product_id for product_shop in offers.values()}
+            if previous_order_id:
+                product_ids.update(StockHold.objects.filter(order_id=previous_order_id)
+                                   .values_list('product_shop__product_id', flat=True))
+                release_order_holds(previous_order_id)
+        refresh_product_summaries(product_ids)
 
         self.request.session['order'] = order.id
 
@@ -104,23 +118,50 @@ class OrderView(UserPassesTestMixin, FormView):
             self.success_url = reverse_lazy('home')
 
     @staticmethod
-    def _check_count_left_goods(cart: Cart, order: Order) -> tuple[list[OrderItem], list]:
+    def _lock_goods_in_cart(cart: Cart) -> dict[int, ProductShop]:
+        """
+        Выбирает предложения магазинов из корзины одним запросом и блокирует их до конца транзакции
+        оформления заказа, чтобы параллельное оформление не прошло проверку остатков по тем же данным.
+        """
+        return ProductShop.objects.select_for_update(of=('self',)).select_related('product') \
+            .filter(id__in=[int(product_shop_id) for product_shop_id in cart.cart]) \
+            .order_by('id').in_bulk()
+
+    def _get_previous_order_id(self) -> Optional[int]:
+        """
+        Неоплаченный заказ покупателя из сессии, платеж которого не обрабатывается:
+        при повторном оформлении он заменяется новым заказом,
+        поэтому его резервы не учитываются при проверке и снимаются после оформления
+        """
+        if order_id := self.request.session.get('order'):
+            return Order.objects.filter(id=order_id, buyer=self.request.user,
+                                        payment_item__status__in=(PaymentItem.STATUS_NEW, PaymentItem.STATUS_FAILED)) \
+                .values_list('id', flat=True).first()
+        return None
+
+    @staticmethod
+    def _check_count_left_goods(cart: Cart, order: Order, offers: dict[int, ProductShop],
+                                previous_order_id: Optional[int] = None) -> tuple[list[OrderItem], list]:
+        """
+        Проверяет активность всех товаров корзины и их доступное количество с учетом резервов других заказов
+        """
         goods = []
         error_messages = []
+        available = get_available(offers.values(), exclude_order_id=previous_order_id)
         for product_shop_id, values in cart.cart.items():
-            product_shop = get_object_or_none(ProductShop, id=product_shop_id)
+            product_shop = offers.get(int(product_shop_id))
             if not product_shop:
                 continue
 
             name = product_shop.product.name
-            if product_shop.is_active is False:
+            if product_shop.is_active is False or product_shop.product.is_active is False:
                 message = _(f"{name} is not active product")
                 error_messages.append(message)
 
             price = values.get('price')
             quantity = values.get('quantity')
-            if product_shop.count_left - quantity < 0:
-                message = _(f"{name}: in stock - {product_shop.count_left}, in cart - {quantity}")
+            if available[product_shop.id] - quantity < 0:
+                message = _(f"{name}: in stock - {available[product_shop.id]}, in cart - {quantity}")
                 error_messages.append(message)
             else:
                 item = OrderItem(order=order, product_shop_id=product_shop_id,
@@ -162,37 +203,29 @@ class PaymentView(UserPassesTestMixin, TemplateView):
         return context
 
     def post(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
-        request.session.pop('cart', None)
+        get_request_cart(request).clear()
 
         account: str = request.POST.get('account_number')
         if not account or len(account) != 9:
             return redirect(reverse('home'))
-        last_sym = account[-1:]
 
         order_id = self.request.session.get('order', None)
-        payment = PaymentItem.objects.get(order_id=order_id)
-        payment.from_account = account
-        order: Order = Order.objects.get(id=order_id)
+        if start_payment(order_id, account):
+            self._enqueue_payment(order_id)
 
-        if last_sym.isdigit() and int(last_sym) % 2 == 0:
-            payment.is_passed = True
-            order.status = 'p'
-
-            products_to_update = []
-            for order_item in order.items.all():
-                quantity = order_item.quantity
-                product_shop = order_item.product_shop
-
-                product_shop.count_left -= quantity
-                product_shop.count_sold += quantity
-
-                products_to_update.append(product_shop)
-            ProductShop.objects.bulk_update(products_to_update, ['count_left', 'count_sold'])
-
-        payment.save()
-        order.save()
         return redirect(reverse('payment_progress'))
 
+    @staticmethod
+    def _enqueue_payment(order_id: int) -> None:
+        """
+        Передает обработку платежа в очередь Celery, чтобы не держать веб-воркер во время ответа платежной системы.
+        В режиме PAYMENT_TASK_EAGER (тесты, локальный запуск без воркера) платеж обрабатывается сразу.
+        """
+        if settings.PAYMENT_TASK_EAGER:
+            process_order_payment.apply(args=(order_id,))
+        else:
+            process_order_payment.delay(order_id)
+
 
 class PaymentSomeOneView(PaymentView):
     template_name = 'pages/paymentsomeone.html'
@@ -207,7 +240,19 @@ class ProgressPaymentView(UserPassesTestMixin, TemplateView):
     def test_func(self) -> bool:
         user = self.request.user
         session = self.request.session
-        return user.is_authenticated and session.get('order') and session.get('cart') is None
+        return user.is_authenticated and session.get('order') and get_request_cart(self.request).is_empty()
+
+
+def get_payment_status(request: HttpRequest, pk: int) -> JsonResponse:
+    """Состояние платежа заказа для страницы ожидания оплаты"""
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': _('Authentication required')}, status=403)
+    payment_item = get_object_or_404(PaymentItem.objects.only('id', 'status'), order_id=pk, order__buyer=request.user)
+    return JsonResponse({
+        'status': payment_item.status,
+        'is_finished': payment_item.is_finished,
+        'redirect_to': reverse('order_detail', kwargs={'pk': pk}),
+    })
 
 
 class OrderDetailView(UserPassesTestMixin, DetailView):
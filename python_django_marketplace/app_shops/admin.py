@@ -141,7 +141,7 @@ class ProductAdmin(ImportExportMixin, TranslationAdmin):
             cache.delete('tags')
             messages.success(request, _('Cache cleared successfully'))
         elif 'categories_cache' in request.POST:
-            cache.delete('categories')
+            cache.delete('category_menu')
             messages.success(request, _('Cache cleared successfully'))
         elif 'all_cache' in request.POST:
             cache.clear()
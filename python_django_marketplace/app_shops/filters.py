@@ -1,11 +1,15 @@
+from decimal import Decimal
+from typing import Optional
+
 import django_filters as filters
 from django import forms
-from django.db.models import Q
 from djmoney.contrib.exchange.models import convert_money
 from djmoney.money import Money
 
 from django_marketplace.constants import ORDER_AMOUNT_WHICH_DELIVERY_FREE
 from .models.product import Product
+from .services.features import feature_index, parse_feature_values
+from .services.search import search_products
 
 
 class ProductFilter(filters.FilterSet):
@@ -17,17 +21,22 @@ class ProductFilter(filters.FilterSet):
     in_stock = filters.BooleanFilter(method='filter_in_stock', widget=forms.CheckboxInput)
     free_delivery = filters.BooleanFilter(method='filter_free_delivery', widget=forms.CheckboxInput)
     tag = filters.CharFilter(field_name='tags__codename')
+    feature = filters.CharFilter(method='filter_feature')
 
     def __init__(self, data=None, queryset=None, *, request=None, prefix=None):
         if data:
+            features = data.getlist('feature')
             data = data.dict()
+            if features:
+                data['feature'] = ','.join(features)
             if price := data.get('price'):
                 data['price'] = f'{price};{request.LANGUAGE_CODE}'
         super().__init__(data, queryset, request=request, prefix=prefix)
 
     @staticmethod
-    def filter_price(queryset, name, value):
-        if len(value.split(';')) == 3:
+    def parse_price(value: str) -> Optional[tuple[Decimal, Decimal]]:
+        """Возвращает диапазон цен в рублях из значения вида от;до;код_языка"""
+        if value and len(value.split(';')) == 3:
             price_from, price_to, language_code = value.split(';')
             if price_from.isdigit() and price_to.isdigit():
                 if language_code == 'en':
@@ -35,16 +44,27 @@ class ProductFilter(filters.FilterSet):
                         Money(price_from, 'USD'), 'RUB').amount
                     price_to = convert_money(
                         Money(price_to, 'USD'), 'RUB').amount
-                return queryset.filter(avg_price__gte=price_from, avg_price__lte=price_to)
+                return Decimal(price_from), Decimal(price_to)
+        return None
+
+    def filter_price(self, queryset, name, value):
+        if price_range := self.parse_price(value):
+            price_from, price_to = price_range
+            return queryset.filter(avg_price__gte=price_from, avg_price__lte=price_to)
         return queryset
 
+    def filter_name_or_description(self, queryset, name, value):
+        return search_products(queryset, value, getattr(self.request, 'LANGUAGE_CODE', None))
+
     @staticmethod
-    def filter_name_or_description(queryset, name, value):
-        return queryset.filter(Q(name__icontains=value) | Q(description_long__icontains=value))
+    def filter_feature(queryset, name, value):
+        if value_ids := parse_feature_values(value):
+            return queryset.filter(id__in=feature_index.get().match(value_ids))
+        return queryset
 
     @staticmethod
     def filter_in_stock(queryset, name, value):
-        return queryset.filter(in_shops__count_left__gt=0) if value else queryset
+        return queryset.filter(summary__in_stock=True) if value else queryset
 
     @staticmethod
     def filter_free_delivery(queryset, name, value):
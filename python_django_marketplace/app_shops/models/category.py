@@ -30,3 +30,21 @@ class Category(models.Model):
     def get_absolute_url(self) -> str:
         catalog_url = reverse('catalog')
         return f'{catalog_url}?category={self.slug}'
+
+
+class CategoryClosure(models.Model):
+    """
+    Модель связей категории со всеми ее предками (таблица замыкания дерева категорий).
+    Для каждой категории хранится и связь с самой собой с глубиной 0.
+    """
+    ancestor = models.ForeignKey('Category', on_delete=models.CASCADE, related_name='descendant_links',
+                                 verbose_name=_('ancestor'))
+    descendant = models.ForeignKey('Category', on_delete=models.CASCADE, related_name='ancestor_links',
+                                   verbose_name=_('descendant'))
+    depth = models.PositiveSmallIntegerField(verbose_name=_('depth'))
+
+    class Meta:
+        verbose_name_plural = _('category closures')
+        verbose_name = _('category closure')
+        constraints = [models.UniqueConstraint(fields=['ancestor', 'descendant'], name='unique_category_closure')]
+        indexes = [models.Index(fields=['descendant', 'depth'])]
@@ -1,8 +1,11 @@
 from __future__ import annotations
 
 from autoslug import AutoSlugField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from imagekit.models import ProcessedImageField, ImageSpecField
 from smart_selects.db_fields import ChainedManyToManyField
@@ -95,6 +98,8 @@ class Product(models.Model):
     updated = models.DateTimeField(auto_now=True, verbose_name=_('updated'))
     main_image = models.OneToOneField('ProductImage', on_delete=models.SET_NULL, null=True, blank=True,
                                       related_name='main_for_product', verbose_name=_('main image'))
+    search_vector_ru = SearchVectorField(null=True, editable=False)
+    search_vector_en = SearchVectorField(null=True, editable=False)
 
     def __str__(self) -> str:
         return self.name
@@ -102,6 +107,10 @@ class Product(models.Model):
     class Meta:
         verbose_name_plural = _('products')
         verbose_name = _('product')
+        indexes = [
+            GinIndex(fields=['search_vector_ru']),
+            GinIndex(fields=['search_vector_en']),
+        ]
 
     def get_absolute_url(self) -> str:
         return reverse('product-detail', kwargs={'product_slug': self.slug})
@@ -151,7 +160,11 @@ class ViewHistory(models.Model):
     """
     profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='history', verbose_name=_('profile'))
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='history', verbose_name=_('user'))
-    date_viewed = models.DateTimeField(auto_now_add=True)
+    date_viewed = models.DateTimeField(default=timezone.now, db_index=True)
 
     def __str__(self):
         return f'{self.id} - {self.date_viewed}'
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['profile', 'product'], name='unique_view_history_product')]
+        indexes = [models.Index(fields=['profile', '-date_viewed'])]
@@ -0,0 +1,58 @@
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class ProductSummary(models.Model):
+    """
+    Денормализованная сводка по товару: цены, продажи, отзывы, наличие и предложение по умолчанию
+    (самое дешевое активное предложение, которое есть в наличии) для кнопки покупки в карточке товара.
+    Запись существует только для товаров, у которых есть активные предложения магазинов.
+    """
+    product = models.OneToOneField('Product', primary_key=True, on_delete=models.CASCADE,
+                                   related_name='summary', verbose_name=_('product'))
+    avg_price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name=_('average price'))
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name=_('minimum price'))
+    max_price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name=_('maximum price'))
+    count_sold = models.IntegerField(default=0, verbose_name=_('sold'))
+    feedback = models.IntegerField(default=0, verbose_name=_('reviews count'))
+    default_offer = models.ForeignKey('ProductShop', null=True, blank=True, on_delete=models.SET_NULL,
+                                      related_name='+', verbose_name=_('default offer'))
+    in_stock = models.BooleanField(default=False, verbose_name=_('in stock'))
+    updated = models.DateTimeField(auto_now=True, verbose_name=_('updated'))
+
+    def __str__(self) -> str:
+        return f'Summary of product: {self.product_id}'
+
+    class Meta:
+        verbose_name_plural = _('product summaries')
+        verbose_name = _('product summary')
+        indexes = [
+            models.Index(fields=['count_sold']),
+            models.Index(fields=['avg_price']),
+            models.Index(fields=['feedback']),
+            models.Index(fields=['in_stock']),
+        ]
+
+
+class ProductOffer(models.Model):
+    """
+    Денормализованное предложение магазина для блока продавцов на странице товара:
+    цена и цена со скидкой (с учетом минимальной стоимости) посчитаны заранее.
+    """
+    product_shop = models.OneToOneField('ProductShop', primary_key=True, on_delete=models.CASCADE,
+                                        related_name='offer', verbose_name=_('product shop'))
+    product = models.ForeignKey('Product', on_delete=models.CASCADE, related_name='offers', verbose_name=_('product'))
+    shop = models.ForeignKey('Shop', on_delete=models.CASCADE, related_name='+', verbose_name=_('shop'))
+    price = models.DecimalField(max_digits=8, decimal_places=2, verbose_name=_('price'))
+    discount_price = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True,
+                                         verbose_name=_('discount price'))
+    count_left = models.IntegerField(default=0, verbose_name=_('left in shop'))
+    is_active = models.BooleanField(default=False, verbose_name=_('is active'))
+
+    def __str__(self) -> str:
+        return f'Offer of product shop: {self.product_shop_id}'
+
+    class Meta:
+        verbose_name_plural = _('product offers')
+        verbose_name = _('product offer')
+        indexes = [models.Index(fields=['product', 'is_active'])]
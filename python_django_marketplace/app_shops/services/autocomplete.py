@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import heapq
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.urls import reverse
+
+from app_shops.models.category import Category
+from app_shops.models.product import Product
+from app_shops.models.shop import Shop
+from django_marketplace.constants import AUTOCOMPLETE_VERSION_CHECK_INTERVAL
+from .functions import get_cache_version
+
+AUTOCOMPLETE_CACHE_NAME = 'autocomplete'
+
+
+def normalize(text: str) -> str:
+    """Приводит строку к виду, в котором выполняется сравнение"""
+    return ' '.join(text.lower().replace('ё', 'е').split())
+
+
+def get_trigrams(text: str) -> set[str]:
+    """Разбивает строку на триграммы по словам, как это делает pg_trgm"""
+    trigrams = set()
+    for word in text.split():
+        padded = f'  {word} '
+        trigrams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return trigrams
+
+
+class TrigramIndex:
+    """
+    Триграммный индекс названий для подсказок поиска.
+    Хранит для каждой триграммы список записей, в названиях которых она встречается.
+    """
+
+    def __init__(self, entries: list[dict]):
+        self.entries = entries
+        self.names = [normalize(entry['name']) for entry in entries]
+        self.trigram_counts = []
+        self.postings = defaultdict(list)
+        for position, name in enumerate(self.names):
+            trigrams = get_trigrams(name)
+            self.trigram_counts.append(len(trigrams))
+            for trigram in trigrams:
+                self.postings[trigram].append(position)
+
+    def search(self, query: str, limit: int) -> list[dict]:
+        query = normalize(query)
+        query_trigrams = get_trigrams(query)
+        if not query_trigrams:
+            return []
+
+        shared = Counter()
+        for trigram in query_trigrams:
+            shared.update(self.postings.get(trigram, ()))
+
+        scored = []
+        for position, count in shared.items():
+            name = self.names[position]
+            score = count / (len(query_trigrams) + self.trigram_counts[position] - count)
+            if name.startswith(query):
+                score += 1
+            elif f' {query}' in f' {name}':
+                score += 0.5
+            scored.append((-score, len(name), position))
+        return [self.entries[position] for _, _, position in heapq.nsmallest(limit, scored)]
+
+
+def build_entries(language: str) -> list[dict]:
+    """Собирает записи для индекса подсказок: активные товары, категории и магазины"""
+    entries = []
+    for slug, name in Product.objects.filter(is_active=True).values_list('slug', f'name_{language}'):
+        if name:
+            entries.append({'type': 'product', 'name': name,
+                            'url': reverse('product-detail', kwargs={'product_slug': slug})})
+    catalog_url = reverse('catalog')
+    for slug, name in Category.objects.filter(is_active=True).values_list('slug', f'name_{language}'):
+        if name:
+            entries.append({'type': 'category', 'name': name, 'url': f'{catalog_url}?category={slug}'})
+    for slug, name in Shop.objects.filter(is_active=True).values_list('slug', f'name_{language}'):
+        if name:
+            entries.append({'type': 'shop', 'name': name,
+                            'url': reverse('store_detail', kwargs={'store_slug': slug})})
+    return entries
+
+
+class AutocompleteIndexes:
+    """
+    Индексы подсказок по языкам, хранящиеся в памяти процесса.
+    Перестраиваются, когда сигналы об изменении товаров, категорий или магазинов меняют версию в кэше.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._indexes = {}
+        self._version = None
+        self._checked_at = 0.0
+
+    def get(self, language: str) -> TrigramIndex:
+        self._check_version()
+        index = self._indexes.get(language)
+        if index is None:
+            with self._lock:
+                index = self._indexes.get(language)
+                if index is None:
+                    index = self._indexes[language] = TrigramIndex(build_entries(language))
+        return index
+
+    def reset(self) -> None:
+        with self._lock:
+            self._indexes = {}
+            self._version = None
+            self._checked_at = 0.0
+
+    def _check_version(self) -> None:
+        now = time.monotonic()
+        if now - self._checked_at < AUTOCOMPLETE_VERSION_CHECK_INTERVAL:
+            return
+        self._checked_at = now
+        version = get_cache_version(AUTOCOMPLETE_CACHE_NAME)
+        if version != self._version:
+            with self._lock:
+                self._indexes = {}
+                self._version = version
+
+
+autocomplete_indexes = AutocompleteIndexes()
+
+
+def get_suggestions(query: str, language: str, limit: int) -> list[dict]:
+    """Возвращает до limit подсказок для строки поиска"""
+    if language not in dict(settings.LANGUAGES):
+        language = settings.MODELTRANSLATION_DEFAULT_LANGUAGE
+    return autocomplete_indexes.get(language).search(query, limit)
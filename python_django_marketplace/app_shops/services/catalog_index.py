@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import threading
+import time
+from decimal import Decimal
+from pathlib import Path
+from typing import Optional
+
+from django.conf import settings
+
+from app_shops.models.category import CategoryClosure
+from app_shops.models.product import Product, TagProduct
+from django_marketplace.constants import ORDER_AMOUNT_WHICH_DELIVERY_FREE, CATALOG_INDEX_VERSION_CHECK_INTERVAL
+from .functions import CATALOG_CACHE_NAME, get_cache_version
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+COLUMNS = ('ids', 'avg_price', 'min_price', 'count_sold', 'feedback', 'created', 'category_ids', 'in_stock',
+           'tag_bits')
+
+
+class CatalogIndex:
+    """
+    Колоночный индекс каталога в массивах NumPy: по строке на каждый товар, доступный в каталоге.
+    Отвечает на фильтры ProductFilter (кроме поиска по названию) и сортировки каталога,
+    возвращая упорядоченные id товаров.
+    """
+
+    def __init__(self, version: str, columns: dict, categories: dict[str, list[int]], tags: dict[str, int]):
+        self.version = version
+        self.columns = columns
+        self.categories = categories
+        self.tags = tags
+
+    @classmethod
+    def build(cls, version: str) -> CatalogIndex:
+        """Собирает индекс из сводок товаров в базе данных"""
+        rows = list(Product.objects.filter(is_active=True, summary__isnull=False)
+                    .order_by('id')
+                    .values_list('id', 'summary__avg_price', 'summary__min_price', 'summary__count_sold',
+                                 'summary__feedback', 'created', 'category_id', 'summary__in_stock'))
+        tag_ids = dict(TagProduct.objects.order_by('id').values_list('codename', 'id'))
+        tags = {codename: bit for bit, codename in enumerate(tag_ids)}
+        tag_bit_by_id = {tag_id: tags[codename] for codename, tag_id in tag_ids.items()}
+        categories = {}
+        for slug, descendant_id in CategoryClosure.objects.values_list('ancestor__slug', 'descendant_id'):
+            categories.setdefault(slug, []).append(descendant_id)
+
+        ids = np.array([row[0] for row in rows], dtype=np.int64)
+        tag_bits = np.zeros((len(rows), max(1, (len(tags) + 63) // 64)), dtype=np.uint64)
+        for tag_id, product_id in TagProduct.goods.through.objects.values_list('tagproduct_id', 'product_id'):
+            position = np.searchsorted(ids, product_id)
+            if position < len(ids) and ids[position] == product_id and tag_id in tag_bit_by_id:
+                bit = tag_bit_by_id[tag_id]
+                tag_bits[position, bit // 64] |= np.uint64(1 << (bit % 64))
+
+        columns = {
+            'ids': ids,
+            'avg_price': np.array([row[1] for row in rows], dtype=np.float64),
+            'min_price': np.array([row[2] for row in rows], dtype=np.float64),
+            'count_sold': np.array([row[3] for row in rows], dtype=np.int64),
+            'feedback': np.array([row[4] for row in rows], dtype=np.int64),
+            'created': np.array([int(row[5].timestamp() * 1_000_000) for row in rows], dtype=np.int64),
+            'category_ids': np.array([row[6] for row in rows], dtype=np.int64),
+            'in_stock': np.array([row[7] for row in rows], dtype=bool),
+            'tag_bits': tag_bits,
+        }
+        return cls(version, columns, categories, tags)
+
+    def save(self, directory: Path) -> None:
+        """
+        Сохраняет снимок индекса в каталог directory/<версия>.
+        Запись идет во временный каталог, который затем атомарно переименовывается.
+        """
+        target = directory / self.version
+        if target.exists():
+            return
+        directory.mkdir(parents=True, exist_ok=True)
+        tmp = directory / f'{self.version}.tmp-{os.getpid()}-{threading.get_ident()}'
+        tmp.mkdir()
+        for name in COLUMNS:
+            np.save(tmp / f'{name}.npy', self.columns[name])
+        with open(tmp / 'meta.json', 'w') as file:
+            json.dump({'categories': self.categories, 'tags': self.tags}, file)
+        try:
+            os.rename(tmp, target)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+        for path in directory.iterdir():
+            if path.name != self.version and not path.name.startswith(f'{self.version}.tmp'):
+                shutil.rmtree(path, ignore_errors=True)
+
+    @classmethod
+    def load(cls, directory: Path, version: str) -> Optional[CatalogIndex]:
+        """Открывает снимок индекса нужной версии, отображая массивы в память"""
+        target = directory / version
+        if not (target / 'meta.json').exists():
+            return None
+        with open(target / 'meta.json') as file:
+            meta = json.load(file)
+        columns = {name: np.load(target / f'{name}.npy', mmap_mode='r') for name in COLUMNS}
+        return cls(version, columns, meta['categories'], meta['tags'])
+
+    def query(self, category: Optional[str] = None, tag: Optional[str] = None,
+              price_range: Optional[tuple[Decimal, Decimal]] = None, in_stock: bool = False,
+              free_delivery: bool = False, product_ids: Optional[list[int]] = None,
+              ordering: str = 'count_sold') -> np.ndarray:
+        """
+        Возвращает id товаров, подходящих под фильтры, в порядке сортировки ordering.
+        product_ids дополнительно ограничивает выборку заранее отобранными товарами.
+        """
+        columns = self.columns
+        mask = np.ones(len(columns['ids']), dtype=bool)
+        if category:
+            if category not in self.categories:
+                return columns['ids'][:0]
+            mask &= np.isin(columns['category_ids'], self.categories[category])
+        if tag:
+            if tag not in self.tags:
+                return columns['ids'][:0]
+            bit = self.tags[tag]
+            mask &= (columns['tag_bits'][:, bit // 64] & np.uint64(1 << (bit % 64))) != 0
+        if price_range:
+            price_from, price_to = price_range
+            mask &= (columns['avg_price'] >= float(price_from)) & (columns['avg_price'] <= float(price_to))
+        if in_stock:
+            mask &= columns['in_stock']
+        if free_delivery:
+            mask &= columns['min_price'] >= ORDER_AMOUNT_WHICH_DELIVERY_FREE
+        if product_ids is not None:
+            mask &= np.isin(columns['ids'], np.array(product_ids, dtype=np.int64))
+
+        positions = np.flatnonzero(mask)
+        key = columns[ordering.lstrip('-')][positions]
+        ids = columns['ids'][positions]
+        order = np.lexsort((ids, key))
+        if ordering.startswith('-'):
+            order = order[::-1]
+        return ids[order]
+
+
+class CatalogIndexHolder:
+    """
+    Индекс каталога текущего процесса. При смене версии данных каталога индекс
+    открывается из общего для всех процессов снимка или собирается заново.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = None
+        self._checked_at = 0.0
+
+    @staticmethod
+    def is_enabled() -> bool:
+        return np is not None and settings.CATALOG_INDEX_ENABLED
+
+    def get(self) -> Optional[CatalogIndex]:
+        if not self.is_enabled():
+            return None
+        now = time.monotonic()
+        if self._index is not None and now - self._checked_at < CATALOG_INDEX_VERSION_CHECK_INTERVAL:
+            return self._index
+
+        version = get_cache_version(CATALOG_CACHE_NAME)
+        with self._lock:
+            self._checked_at = now
+            if self._index is None or self._index.version != version:
+                directory = Path(settings.CATALOG_INDEX_SNAPSHOT_DIR)
+                index = CatalogIndex.load(directory, version)
+                if index is None:
+                    index = CatalogIndex.build(version)
+                    index.save(directory)
+                self._index = index
+        return self._index
+
+    def reset(self) -> None:
+        with self._lock:
+            self._index = None
+            self._checked_at = 0.0
+
+
+catalog_index = CatalogIndexHolder()
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import translation
+
+from app_shops.models.category import Category, CategoryClosure
+
+
+def rebuild_category_closure() -> None:
+    """
+    Перестраивает таблицу замыкания дерева категорий.
+    Категорий немного, поэтому таблица пересчитывается целиком за один проход по дереву.
+    """
+    parents = dict(Category.objects.values_list('id', 'parent_id'))
+    objects = []
+    for category_id in parents:
+        ancestor_id, depth, visited = category_id, 0, set()
+        while ancestor_id is not None and ancestor_id not in visited:
+            visited.add(ancestor_id)
+            objects.append(CategoryClosure(ancestor_id=ancestor_id, descendant_id=category_id, depth=depth))
+            ancestor_id, depth = parents.get(ancestor_id), depth + 1
+
+    with transaction.atomic():
+        CategoryClosure.objects.all().delete()
+        CategoryClosure.objects.bulk_create(objects)
+
+
+def get_descendant_ids(slug: str) -> list[int]:
+    """Возвращает id категории с переданным slug и всех ее подкатегорий"""
+    return list(CategoryClosure.objects.filter(ancestor__slug=slug).values_list('descendant_id', flat=True))
+
+
+def build_category_menu() -> dict[str, list[dict]]:
+    """
+    Собирает дерево активных категорий для меню шапки сайта на каждом языке сайта.
+    Узел дерева - словарь с названием, ссылкой, иконкой и списком подкатегорий.
+    """
+    categories = list(Category.objects.filter(is_active=True).order_by('name'))
+    active_ids = {category.id for category in categories}
+    menu = {}
+    for language, _name in settings.LANGUAGES:
+        with translation.override(language):
+            nodes = {category.id: {'name': category.name,
+                                   'url': category.get_absolute_url(),
+                                   'icon': category.icon.url if category.icon else '',
+                                   'children': []}
+                     for category in categories}
+        roots = []
+        for category in categories:
+            if category.parent_id is None:
+                roots.append(nodes[category.id])
+            elif category.parent_id in active_ids:
+                nodes[category.parent_id]['children'].append(nodes[category.id])
+        menu[language] = roots
+    return menu
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from django.conf import settings
+from django.core.cache import cache
+
+from app_shops.models.product import FeatureToProduct
+from django_marketplace.constants import COMPARISON_CACHE_LIFETIME
+from .features import FEATURES_CACHE_NAME
+from .functions import get_cache_version
+
+
+def build_feature_matrix(product_ids: list[int], language: str) -> list[dict]:
+    """
+    Загружает характеристики сравниваемых товаров одним запросом и за один проход определяет,
+    какие характеристики есть у всех товаров (common) и у каких из них значения различаются (differs).
+    Строка матрицы - характеристика со значениями по каждому товару.
+    """
+    default_language = settings.MODELTRANSLATION_DEFAULT_LANGUAGE
+    rows = FeatureToProduct.objects.filter(product_id__in=product_ids) \
+        .values_list('product_id', 'feature_name_id',
+                     f'feature_name__name_{language}', f'feature_name__name_{default_language}',
+                     f'values__value_{language}', f'values__value_{default_language}') \
+        .order_by('feature_name_id', f'values__value_{default_language}')
+
+    features = {}
+    for product_id, feature_id, name, default_name, value, default_value in rows:
+        feature = features.setdefault(feature_id, {'id': feature_id, 'name': name or default_name, 'values': {}})
+        values = feature['values'].setdefault(product_id, [])
+        if value or default_value:
+            values.append(value or default_value)
+
+    matrix = []
+    for feature in features.values():
+        values = {product_id: ', '.join(items) for product_id, items in feature['values'].items()}
+        matrix.append({'id': feature['id'],
+                       'name': feature['name'],
+                       'values': values,
+                       'common': len(values) == len(product_ids),
+                       'differs': len(set(values.values())) > 1})
+    return sorted(matrix, key=lambda feature: feature['name'])
+
+
+def get_feature_matrix(product_ids: list[int], language: str) -> list[dict]:
+    """Матрица характеристик из кэша по отсортированному набору товаров или посчитанная заново"""
+    product_ids = sorted(set(product_ids))
+    key = f'comparison_{get_cache_version(FEATURES_CACHE_NAME)}_{language}_{"_".join(map(str, product_ids))}'
+    return cache.get_or_set(key, lambda: build_feature_matrix(product_ids, language),
+                            timeout=COMPARISON_CACHE_LIFETIME)
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import hashlib
+from collections import Counter
+from decimal import Decimal
+from typing import Optional
+
+from django.core.cache import cache
+from django.db.models import Count, QuerySet
+from django.http import QueryDict
+
+from app_shops.models.category import Category
+from app_shops.models.product import TagProduct
+from django_marketplace.constants import FACETS_CACHE_LIFETIME, PRICE_HISTOGRAM_BUCKETS, TAGS_CACHE_LIFETIME
+from .features import get_feature_facets
+from .functions import CATALOG_CACHE_NAME, get_cache_version
+
+FINGERPRINT_IGNORED_PARAMS = ('page', 'cursor', 'order_by')
+
+
+def get_filter_fingerprint(query_params: QueryDict, language: str) -> str:
+    """
+    Нормализованный отпечаток состояния фильтров каталога: параметры сортируются,
+    пустые значения и параметры, не влияющие на выборку, отбрасываются.
+    """
+    params = sorted(
+        (key, value.strip())
+        for key, values in query_params.lists() if key not in FINGERPRINT_IGNORED_PARAMS
+        for value in values if value.strip()
+    )
+    raw = f'{language}|' + '&'.join(f'{key}={value}' for key, value in params)
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def get_price_histogram(prices: list[Decimal], buckets: int = PRICE_HISTOGRAM_BUCKETS) -> list[dict]:
+    """Разбивает цены на равные интервалы и считает количество товаров в каждом"""
+    if not prices:
+        return []
+    low, high = min(prices), max(prices)
+    width = (high - low) / buckets or Decimal(1)
+    counts = [0] * buckets
+    for price in prices:
+        counts[min(int((price - low) / width), buckets - 1)] += 1
+    return [{'from': round(low + width * i, 2), 'to': round(low + width * (i + 1), 2), 'count': count}
+            for i, count in enumerate(counts)]
+
+
+def build_facets(queryset: QuerySet, price_range: Optional[tuple[Decimal, Decimal]] = None) -> dict:
+    """
+    Считает фасеты каталога за один проход по выборке товаров.
+    queryset - выборка с примененными фильтрами, кроме фильтра цены: гистограмма и границы цен
+    строятся по ней, остальные счетчики - по товарам, попадающим в price_range.
+    """
+    rows = list(queryset.order_by().values_list('id', 'category_id', 'avg_price', 'min_price', 'max_price',
+                                                'summary__in_stock'))
+    if price_range:
+        price_from, price_to = price_range
+        matched = [row for row in rows if price_from <= row[2] <= price_to]
+    else:
+        matched = rows
+
+    category_counts = Counter(row[1] for row in matched)
+    in_stock_count = sum(1 for row in matched if row[5])
+
+    tag_counts = {}
+    if matched:
+        tag_counts = dict(TagProduct.goods.through.objects
+                          .filter(product_id__in=[row[0] for row in matched])
+                          .values('tagproduct_id')
+                          .annotate(count=Count('product_id'))
+                          .order_by()
+                          .values_list('tagproduct_id', 'count'))
+    tags = cache.get_or_set('tags', TagProduct.objects.all(), timeout=TAGS_CACHE_LIFETIME)
+    categories = Category.objects.filter(id__in=category_counts.keys()).only('id', 'name', 'slug')
+
+    return {
+        'total': len(matched),
+        'min_price': min((row[3] for row in rows), default=None),
+        'max_price': max((row[4] for row in rows), default=None),
+        'price_histogram': get_price_histogram([row[2] for row in rows]),
+        'in_stock': in_stock_count,
+        'out_of_stock': len(matched) - in_stock_count,
+        'categories': [{'slug': category.slug, 'name': category.name, 'count': category_counts[category.id]}
+                       for category in categories],
+        'tags': [{'codename': tag.codename, 'name': tag.name, 'count': tag_counts.get(tag.id, 0)}
+                 for tag in tags],
+        'features': get_feature_facets([row[0] for row in matched]),
+    }
+
+
+def get_facets(queryset: QuerySet, query_params: QueryDict, language: str,
+               price_range: Optional[tuple[Decimal, Decimal]] = None) -> dict:
+    """Возвращает фасеты каталога из кэша по отпечатку фильтров или считает их заново"""
+    fingerprint = get_filter_fingerprint(query_params, language)
+    key = f'catalog_facets_{get_cache_version(CATALOG_CACHE_NAME)}_{fingerprint}'
+    return cache.get_or_set(key, lambda: build_facets(queryset, price_range), timeout=FACETS_CACHE_LIFETIME)
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import defaultdict
+from typing import Iterable, Optional
+
+from app_shops.models.product import FeatureToProduct, FeatureValue
+from django_marketplace.constants import FEATURE_INDEX_VERSION_CHECK_INTERVAL
+from .functions import get_cache_version
+
+FEATURES_CACHE_NAME = 'features'
+
+
+class FeatureIndex:
+    """
+    Инвертированный индекс характеристик: для каждого значения характеристики хранится
+    битовая карта товаров (целое число, i-й бит которого соответствует i-му товару в product_ids).
+    """
+
+    def __init__(self, product_ids: list[int], bitmaps: dict[int, int], value_names: dict[int, int]):
+        self.product_ids = product_ids
+        self.bitmaps = bitmaps
+        self.value_names = value_names
+        self.positions = {product_id: position for position, product_id in enumerate(product_ids)}
+
+    @classmethod
+    def build(cls) -> FeatureIndex:
+        """Собирает индекс одним запросом к связям значений характеристик с товарами"""
+        links = list(FeatureToProduct.values.through.objects
+                     .values_list('featurevalue_id', 'featuretoproduct__product_id'))
+        product_ids = sorted({product_id for _, product_id in links})
+        positions = {product_id: position for position, product_id in enumerate(product_ids)}
+        bitmaps = defaultdict(int)
+        for value_id, product_id in links:
+            bitmaps[value_id] |= 1 << positions[product_id]
+        value_names = dict(FeatureValue.objects.values_list('id', 'name_id'))
+        return cls(product_ids, dict(bitmaps), value_names)
+
+    def match(self, value_ids: Iterable[int]) -> list[int]:
+        """
+        Возвращает id товаров, подходящих под выбранные значения характеристик:
+        значения одной характеристики объединяются по ИЛИ, разные характеристики - по И.
+        """
+        groups = defaultdict(int)
+        for value_id in value_ids:
+            if value_id in self.value_names:
+                groups[self.value_names[value_id]] |= self.bitmaps.get(value_id, 0)
+            else:
+                return []
+        if not groups:
+            return []
+        bitmap = -1
+        for group in groups.values():
+            bitmap &= group
+        return self._to_ids(bitmap)
+
+    def count_values(self, product_ids: Iterable[int]) -> dict[int, int]:
+        """Считает, у скольких из переданных товаров есть каждое значение характеристики"""
+        bitmap = self._to_bitmap(product_ids)
+        counts = {}
+        for value_id, value_bitmap in self.bitmaps.items():
+            if count := bin(value_bitmap & bitmap).count('1'):
+                counts[value_id] = count
+        return counts
+
+    def _to_bitmap(self, product_ids: Iterable[int]) -> int:
+        bitmap = 0
+        for product_id in product_ids:
+            if (position := self.positions.get(product_id)) is not None:
+                bitmap |= 1 << position
+        return bitmap
+
+    def _to_ids(self, bitmap: int) -> list[int]:
+        ids = []
+        while bitmap:
+            lowest = bitmap & -bitmap
+            ids.append(self.product_ids[lowest.bit_length() - 1])
+            bitmap ^= lowest
+        return ids
+
+
+class FeatureIndexHolder:
+    """
+    Индекс характеристик, хранящийся в памяти процесса.
+    Перестраивается, когда сигналы об изменении характеристик товаров меняют версию в кэше.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = None
+        self._version = None
+        self._checked_at = 0.0
+
+    def get(self) -> FeatureIndex:
+        now = time.monotonic()
+        if self._index is None or now - self._checked_at >= FEATURE_INDEX_VERSION_CHECK_INTERVAL:
+            version = get_cache_version(FEATURES_CACHE_NAME)
+            with self._lock:
+                self._checked_at = now
+                if self._index is None or version != self._version:
+                    self._index = FeatureIndex.build()
+                    self._version = version
+        return self._index
+
+    def reset(self) -> None:
+        with self._lock:
+            self._index = None
+            self._version = None
+            self._checked_at = 0.0
+
+
+feature_index = FeatureIndexHolder()
+
+
+def parse_feature_values(value: Optional[str]) -> list[int]:
+    """Разбирает значение фильтра характеристик вида id,id,... в список id значений"""
+    if not value:
+        return []
+    return [int(item) for item in value.split(',') if item.strip().isdigit()]
+
+
+def get_feature_facets(product_ids: list[int]) -> list[dict]:
+    """
+    Фасеты характеристик для переданных товаров: характеристики со значениями,
+    которые есть хотя бы у одного товара, и количеством таких товаров.
+    """
+    counts = feature_index.get().count_values(product_ids)
+    if not counts:
+        return []
+    facets = {}
+    for value in FeatureValue.objects.filter(id__in=counts.keys()).select_related('name').order_by('name_id', 'value'):
+        facet = facets.setdefault(value.name_id, {'name': value.name.name, 'values': []})
+        facet['values'].append({'id': value.id, 'value': value.value, 'count': counts[value.id]})
+    return list(facets.values())
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
+import uuid
 from decimal import Decimal
 
 import requests
+from django.core.cache import cache
 from django.db.models import Case, When, F
 from django.db.models.fields import DecimalField
 from django.utils.translation import gettext_lazy as _
@@ -29,41 +31,25 @@ class CBRExchangeBackend(BaseExchangeBackend):
             return {'USD': 0.0115}
 
 
-def get_prices(discounts_query):
+def get_price_expression(prefix: str = '') -> Case:
     """
-    Обрабатывает QuerySet товаров со скидками, а также считает среднюю цену товара.
+    Возвращает выражение цены предложения магазина с учетом активной скидки.
+    prefix - путь от модели запроса до ProductShop (например, 'in_shops__').
     """
-    shop_prices = {product_shop: {'price_old': product_shop.price.amount}
-    if not product_shop.discount_price
-    else {'price_old': product_shop.price.amount, 'price_new': product_shop.discount_price}
-                   for product_shop in discounts_query}
+    return Case(
+        When(**{f'{prefix}discount__is_active': False}, then=f'{prefix}price'),
+        When(**{f'{prefix}discount__discount_percentage__isnull': False},
+             then=F(f'{prefix}price') - F(f'{prefix}price') *
+                  F(f'{prefix}discount__discount_percentage') / 100),
 
-    return shop_prices
+        When(**{f'{prefix}discount__discount_amount__isnull': False},
+             then=F(f'{prefix}price') - F(f'{prefix}discount__discount_amount')),
+        default=f'{prefix}price',
+        output_field=DecimalField()
+    )
 
 
-price_exp = Case(
-    When(in_shops__discount__is_active=False, then='in_shops__price'),
-    When(in_shops__discount__discount_percentage__isnull=False,
-         then=F('in_shops__price') - F('in_shops__price') *
-              F('in_shops__discount__discount_percentage') / 100),
-
-    When(in_shops__discount__discount_amount__isnull=False,
-         then=F('in_shops__price') - F('in_shops__discount__discount_amount')),
-    default='in_shops__price',
-    output_field=DecimalField()
-)
-
-price_exp_banners = Case(
-    When(product__in_shops__discount__is_active=False, then='product__in_shops__price'),
-    When(product__in_shops__discount__discount_percentage__isnull=False,
-         then=F('product__in_shops__price') - F('product__in_shops__price') *
-              F('product__in_shops__discount__discount_percentage') / 100),
-
-    When(product__in_shops__discount__discount_amount__isnull=False,
-         then=F('product__in_shops__price') - F('product__in_shops__discount__discount_amount')),
-    default='product__in_shops__price',
-    output_field=DecimalField()
-)
+offer_price_exp = get_price_expression()
 
 
 def get_object_or_none(model, *args, **kwargs):
@@ -82,3 +68,16 @@ def conversion_to_dollar(value) -> Money:
     else:
         value_type = type(value)
         raise ValueError(_(f'Number expected, received {value_type}'))
+
+
+CATALOG_CACHE_NAME = 'catalog'
+
+
+def get_cache_version(name: str) -> str:
+    """Возвращает текущую версию группы кэшируемых данных"""
+    return cache.get_or_set(f'version_{name}', lambda: uuid.uuid4().hex, timeout=None)
+
+
+def bump_cache_version(name: str) -> None:
+    """Инвалидирует группу кэшируемых данных, меняя ее версию"""
+    cache.set(f'version_{name}', uuid.uuid4().hex, timeout=None)
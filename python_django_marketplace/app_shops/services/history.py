@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import os
+from contextlib import contextmanager
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files import locks
+from django.db import connection, transaction
+from django.utils import timezone
+
+from app_shops.models.product import Product, ViewHistory
+from app_users.models import Profile
+from django_marketplace.constants import VIEW_HISTORY_LIMIT, VIEW_HISTORY_BUFFER_LIFETIME, \
+    RECENTLY_VIEWED_CACHE_LIFETIME
+
+SEQUENCE_KEY = 'view_history_sequence'
+FLUSHED_KEY = 'view_history_flushed'
+
+
+def get_event_key(number: int) -> str:
+    return f'view_history_event_{number}'
+
+
+@contextmanager
+def _buffer_lock():
+    """
+    Межпроцессная блокировка буфера просмотров. Инкремент в файловом кэше не атомарен,
+    поэтому номер события выделяется и событие записывается под блокировкой файла.
+    """
+    os.makedirs(settings.CACHE_ROOT, exist_ok=True)
+    with open(os.path.join(settings.CACHE_ROOT, 'view_history.lock'), 'a') as lock_file:
+        locks.lock(lock_file, locks.LOCK_EX)
+        try:
+            yield
+        finally:
+            locks.unlock(lock_file)
+
+
+def _push_event(event: tuple) -> None:
+    """
+    Записывает событие под следующим номером. Номер и событие появляются в кэше вместе,
+    поэтому сброс буфера не увидит номер, событие которого еще не записано.
+    """
+    with _buffer_lock():
+        number = cache.get(SEQUENCE_KEY, 0) + 1
+        cache.set(get_event_key(number), event, timeout=VIEW_HISTORY_BUFFER_LIFETIME)
+        cache.set(SEQUENCE_KEY, number, timeout=None)
+
+
+def get_recently_viewed_key(profile_id: int) -> str:
+    return f'recently_viewed_{profile_id}'
+
+
+def record_view(profile_id: int, product_id: int) -> None:
+    """
+    Добавляет просмотр товара в буфер в кэше и в начало списка недавно просмотренных товаров профиля.
+    В базу данных просмотры записываются пачками задачей flush_view_history.
+    """
+    _push_event((profile_id, product_id, timezone.now()))
+    product_ids = [item for item in get_recently_viewed_ids(profile_id) if item != product_id]
+    cache.set(get_recently_viewed_key(profile_id), [product_id, *product_ids][:VIEW_HISTORY_LIMIT],
+              timeout=RECENTLY_VIEWED_CACHE_LIFETIME)
+
+
+def get_recently_viewed_ids(profile_id: int) -> list[int]:
+    """
+    Id недавно просмотренных товаров профиля, начиная с последнего: список берется из кэша,
+    а при его отсутствии - из сохраненной истории просмотров.
+    """
+    key = get_recently_viewed_key(profile_id)
+    if (product_ids := cache.get(key)) is None:
+        product_ids = list(ViewHistory.objects.filter(profile_id=profile_id)
+                           .order_by('-date_viewed')
+                           .values_list('product_id', flat=True)[:VIEW_HISTORY_LIMIT])
+        cache.set(key, product_ids, timeout=RECENTLY_VIEWED_CACHE_LIFETIME)
+    return product_ids
+
+
+def get_recently_viewed(profile_id: int, count: int = VIEW_HISTORY_LIMIT) -> list[Product]:
+    """Недавно просмотренные товары профиля в порядке просмотра"""
+    product_ids = get_recently_viewed_ids(profile_id)[:count]
+    products = Product.objects.filter(id__in=product_ids).select_related('main_image').in_bulk()
+    return [products[product_id] for product_id in product_ids if product_id in products]
+
+
+def flush_view_history(batch_size: Optional[int] = None) -> int:
+    """
+    Переносит накопленные просмотры из буфера в базу данных: одна вставка с обновлением даты
+    для уже просмотренных товаров и одно удаление записей сверх VIEW_HISTORY_LIMIT для каждого профиля.
+    Возвращает количество обработанных событий.
+    """
+    with _buffer_lock():
+        last = cache.get(SEQUENCE_KEY, 0)
+    flushed = cache.get(FLUSHED_KEY, 0)
+    if flushed > last:
+        flushed = 0
+    if batch_size:
+        last = min(last, flushed + batch_size)
+    if last <= flushed:
+        return 0
+
+    keys = [get_event_key(number) for number in range(flushed + 1, last + 1)]
+    views = {}
+    for profile_id, product_id, date_viewed in cache.get_many(keys).values():
+        if views.get((profile_id, product_id), date_viewed) <= date_viewed:
+            views[(profile_id, product_id)] = date_viewed
+
+    if views:
+        save_views(views)
+    cache.delete_many(keys)
+    cache.set(FLUSHED_KEY, last, timeout=None)
+    return len(keys)
+
+
+def save_views(views: dict[tuple[int, int], object]) -> None:
+    """Записывает просмотры (профиль, товар) -> дата и обрезает историю затронутых профилей"""
+    table = ViewHistory._meta.db_table
+    product_table = Product._meta.db_table
+    profile_table = Profile._meta.db_table
+    values = ', '.join(['(%s, %s, %s)'] * len(views))
+    params = [item for (profile_id, product_id), date_viewed in views.items()
+              for item in (profile_id, product_id, date_viewed)]
+    profile_ids = list({profile_id for profile_id, _product_id in views})
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} (profile_id, product_id, date_viewed) '
+            f'SELECT v.profile_id, v.product_id, v.date_viewed '
+            f'FROM (VALUES {values}) AS v (profile_id, product_id, date_viewed) '
+            f'JOIN {product_table} ON {product_table}.id = v.product_id '
+            f'JOIN {profile_table} ON {profile_table}.id = v.profile_id '
+            f'ON CONFLICT (profile_id, product_id) '
+            f'DO UPDATE SET date_viewed = GREATEST({table}.date_viewed, EXCLUDED.date_viewed)',
+            params)
+        cursor.execute(
+            f'DELETE FROM {table} WHERE id IN ('
+            f'SELECT id FROM ('
+            f'SELECT id, ROW_NUMBER() OVER (PARTITION BY profile_id ORDER BY date_viewed DESC, id DESC) AS position '
+            f'FROM {table} WHERE profile_id = ANY(%s)) AS ranked '
+            f'WHERE position > %s)',
+            [profile_ids, VIEW_HISTORY_LIMIT])
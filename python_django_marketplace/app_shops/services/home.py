@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+from typing import Any, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import translation
+
+from app_shops.models.banner import Banner, SpecialOffer, SmallBanner, SliderBanner
+from app_shops.models.product import Product
+from app_shops.models.shop import ProductShop
+from django_marketplace.constants import HOME_SNAPSHOT_CACHE_LIFETIME
+from .leaderboard import get_top_product_ids
+
+TOP_GOODS_COUNT = 8
+
+
+def get_home_snapshot_key(language: str) -> str:
+    """
+    Ключ снимка не зависит от версии данных каталога, которая меняется при каждой продаже и изменении остатков:
+    снимок обновляется периодической задачей и удаляется при изменении баннеров.
+    """
+    return f'home_snapshot_{language}'
+
+
+def _serialize_image(image) -> Optional[dict]:
+    return {'url': image.url} if image else None
+
+
+def _serialize_product(product: Product) -> dict:
+    """Данные товара, которые выводятся в карточках главной страницы"""
+    main_image = product.main_image
+    return {'id': product.id,
+            'name': product.name,
+            'slug': product.slug,
+            'description_short': product.description_short,
+            'description_long': product.description_long,
+            'get_absolute_url': product.get_absolute_url(),
+            'main_image': {'middle': {'url': main_image.middle.url}} if main_image else None,
+            'category': {'name': product.category.name}}
+
+
+def build_home_snapshot() -> dict[str, Any]:
+    """
+    Собирает данные главной страницы на текущем языке в виде словарей и списков,
+    повторяющих структуру объектов, к которым обращается шаблон.
+    """
+    top_ids = get_top_product_ids(TOP_GOODS_COUNT * 2)
+    goods = Product.objects \
+        .filter(id__in=top_ids, is_active=True, summary__isnull=False) \
+        .select_related('category', 'main_image') \
+        .annotate(avg_price=F('summary__avg_price'),
+                  default_offer_id=F('summary__default_offer_id')) \
+        .in_bulk()
+    goods = [goods[product_id] for product_id in top_ids if product_id in goods][:TOP_GOODS_COUNT]
+
+    banners = Banner.objects \
+                  .filter(is_active=True) \
+                  .select_related('product')[:3]
+
+    small_banners = SmallBanner.objects \
+                        .select_related('product') \
+                        .annotate(price_from=F('product__summary__min_price'))[:3]
+
+    slider_items = SliderBanner.objects.filter(product__summary__isnull=False) \
+        .select_related('product', 'product__category', 'product__main_image') \
+        .annotate(avg_price=F('product__summary__avg_price'),
+                  default_offer_id=F('product__summary__default_offer_id'))
+
+    snapshot = {
+        'top_goods': [dict(_serialize_product(item), avg_price=item.avg_price,
+                           default_offer_id=item.default_offer_id)
+                      for item in goods],
+        'banners': [{'product': _serialize_product(banner.product), 'image': _serialize_image(banner.image)}
+                    for banner in banners],
+        'small_banners': [{'product': _serialize_product(item.product) if item.product else None,
+                           'image': _serialize_image(item.image),
+                           'price_from': item.price_from}
+                          for item in small_banners],
+        'slider_items': [{'id': item.product_id,
+                          'product': _serialize_product(item.product),
+                          'avg_price': item.avg_price,
+                          'default_offer_id': item.default_offer_id}
+                         for item in slider_items],
+    }
+
+    if special_offer := SpecialOffer.objects.first():
+        product_shop = ProductShop.objects.with_discount_price() \
+            .select_related('product', 'product__category', 'product__main_image') \
+            .get(id=special_offer.product_shop_id)
+        snapshot['product_with_timer'] = {'product': _serialize_product(product_shop.product),
+                                          'price': product_shop.price.amount,
+                                          'discount_price': product_shop.discount_price}
+        snapshot['date_end'] = special_offer.date_end.strftime('%d.%m.%Y %H:%M') if special_offer.date_end else ''
+    return snapshot
+
+
+def rebuild_home_snapshots() -> None:
+    """Пересобирает снимки главной страницы для всех языков сайта"""
+    for language, _name in settings.LANGUAGES:
+        with translation.override(language):
+            cache.set(get_home_snapshot_key(language), build_home_snapshot(), timeout=HOME_SNAPSHOT_CACHE_LIFETIME)
+
+
+def invalidate_home_snapshots() -> None:
+    cache.delete_many([get_home_snapshot_key(language) for language, _name in settings.LANGUAGES])
+
+
+def get_home_snapshot(language: str) -> dict[str, Any]:
+    """
+    Данные главной страницы из снимка в кэше. Если снимка нет, он собирается
+    запросами к базе данных и сохраняется до следующей пересборки задачей.
+    """
+    snapshot = cache.get(get_home_snapshot_key(language))
+    if snapshot is None:
+        snapshot = build_home_snapshot()
+        cache.set(get_home_snapshot_key(language), snapshot, timeout=HOME_SNAPSHOT_CACHE_LIFETIME)
+    return snapshot
+
+
+def to_namespace(value: Any) -> Any:
+    """Оборачивает словари снимка в SimpleNamespace для доступа к данным через атрибуты"""
+    if isinstance(value, dict):
+        return SimpleNamespace(**{key: to_namespace(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return [to_namespace(item) for item in value]
+    return value
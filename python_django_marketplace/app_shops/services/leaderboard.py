@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import abc
+import bisect
+import threading
+from collections import defaultdict
+from functools import lru_cache
+from typing import Iterable
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from app_shops.models.product import Product
+from app_shops.models.shop import ProductShop
+from app_shops.models.summary import ProductSummary
+from .functions import bump_cache_version, get_cache_version
+
+BUILT_KEY = 'leaderboard:built'
+PRODUCTS_KEY = 'leaderboard:products'
+LEADERBOARD_CACHE_NAME = 'leaderboard'
+
+
+def get_category_key(category_id: int) -> str:
+    return f'leaderboard:category:{category_id}'
+
+
+def get_shop_key(shop_id: int) -> str:
+    return f'leaderboard:shop:{shop_id}'
+
+
+class SortedSetStore(abc.ABC):
+    """
+    Хранилище упорядоченных по счету множеств (как sorted set в Redis).
+    Данные хранилища, не общего для всех процессов (is_shared = False), перечитываются из базы данных
+    при смене версии рейтингов, которую меняет пересборка rebuild_leaderboards.
+    """
+    is_shared = True
+
+    @abc.abstractmethod
+    def incr(self, key: str, member: int, amount: int) -> None:
+        pass
+
+    @abc.abstractmethod
+    def top(self, key: str, count: int) -> list[int]:
+        """Возвращает до count элементов с наибольшим счетом"""
+
+    @abc.abstractmethod
+    def replace(self, sets: dict[str, dict[int, int]]) -> None:
+        """Заменяет содержимое переданных множеств и удаляет остальные"""
+
+    @abc.abstractmethod
+    def exists(self, key: str) -> bool:
+        pass
+
+
+class LocalSortedSetStore(SortedSetStore):
+    """
+    Хранилище в памяти процесса. Каждое множество - отсортированный список пар (-счет, элемент)
+    и словарь счетов, поэтому чтение первых N элементов - это срез списка.
+    Хранилище рассчитано на один процесс (разработка, тесты): продажи, записанные в другом процессе,
+    появляются в нем только после периодической пересборки рейтингов, которая меняет их версию.
+    """
+    is_shared = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._scores = defaultdict(dict)
+        self._ranks = defaultdict(list)
+        self.version = None
+
+    def incr(self, key: str, member: int, amount: int) -> None:
+        with self._lock:
+            scores, ranks = self._scores[key], self._ranks[key]
+            if (score := scores.get(member)) is not None:
+                del ranks[bisect.bisect_left(ranks, (-score, member))]
+            else:
+                score = 0
+            scores[member] = score + amount
+            bisect.insort(ranks, (-scores[member], member))
+
+    def top(self, key: str, count: int) -> list[int]:
+        with self._lock:
+            return [member for _, member in self._ranks.get(key, [])[:count]]
+
+    def replace(self, sets: dict[str, dict[int, int]]) -> None:
+        with self._lock:
+            self._scores = defaultdict(dict, {key: dict(scores) for key, scores in sets.items()})
+            self._ranks = defaultdict(list, {key: sorted((-score, member) for member, score in scores.items())
+                                             for key, scores in sets.items()})
+
+    def exists(self, key: str) -> bool:
+        return key in self._scores
+
+
+class RedisSortedSetStore(SortedSetStore):
+    """
+    Хранилище в Redis, общее для всех процессов
+    """
+
+    def __init__(self):
+        import redis
+        self._redis = redis.Redis.from_url(settings.LEADERBOARD_REDIS_URL)
+
+    def incr(self, key: str, member: int, amount: int) -> None:
+        self._redis.zincrby(key, amount, member)
+
+    def top(self, key: str, count: int) -> list[int]:
+        return [int(member) for member in self._redis.zrevrange(key, 0, count - 1)]
+
+    def replace(self, sets: dict[str, dict[int, int]]) -> None:
+        stale = {key.decode() for key in self._redis.scan_iter('leaderboard:*')} - sets.keys()
+        with self._redis.pipeline() as pipeline:
+            for key in stale:
+                pipeline.delete(key)
+            for key, scores in sets.items():
+                pipeline.delete(key)
+                if scores:
+                    pipeline.zadd(key, scores)
+            pipeline.execute()
+
+    def exists(self, key: str) -> bool:
+        return bool(self._redis.exists(key))
+
+
+@lru_cache(maxsize=None)
+def get_store() -> SortedSetStore:
+    return import_string(settings.LEADERBOARD_BACKEND)()
+
+
+def _build_sets() -> dict[str, dict[int, int]]:
+    sets = defaultdict(dict)
+    sets[BUILT_KEY] = {0: 0}
+    for product_id, category_id, count_sold in ProductSummary.objects \
+            .filter(product__is_active=True) \
+            .values_list('product_id', 'product__category_id', 'count_sold'):
+        sets[PRODUCTS_KEY][product_id] = count_sold
+        sets[get_category_key(category_id)][product_id] = count_sold
+    for offer_id, shop_id, count_sold in ProductShop.objects.filter(is_active=True) \
+            .values_list('id', 'shop_id', 'count_sold'):
+        sets[get_shop_key(shop_id)][offer_id] = count_sold
+    return sets
+
+
+def _publish_version(store: SortedSetStore) -> None:
+    """Меняет версию рейтингов после пересборки, чтобы хранилища других процессов перечитали данные из базы"""
+    if not store.is_shared:
+        bump_cache_version(LEADERBOARD_CACHE_NAME)
+        store.version = get_cache_version(LEADERBOARD_CACHE_NAME)
+
+
+def rebuild_leaderboards() -> None:
+    """Пересобирает рейтинги продаж: общий и по категориям - по товарам, по магазинам - по предложениям"""
+    store = get_store()
+    store.replace(_build_sets())
+    _publish_version(store)
+
+
+def _load_store() -> tuple[SortedSetStore, bool]:
+    """Хранилище рейтингов и признак того, что оно только что построено по данным базы"""
+    store = get_store()
+    if store.is_shared:
+        if not store.exists(BUILT_KEY):
+            rebuild_leaderboards()
+            return store, True
+    elif store.version != (version := get_cache_version(LEADERBOARD_CACHE_NAME)):
+        store.replace(_build_sets())
+        store.version = version
+        return store, True
+    return store, False
+
+
+def _get_store() -> SortedSetStore:
+    return _load_store()[0]
+
+
+def record_sales(sales: Iterable[tuple[ProductShop, int]]) -> None:
+    """
+    Увеличивает счет товаров и предложений магазинов на количество проданных единиц.
+    Продажи уже записаны в базу, поэтому если хранилище пришлось построить заново, они в нем уже учтены.
+    """
+    store, rebuilt = _load_store()
+    if rebuilt:
+        return
+    products = defaultdict(int)
+    for product_shop, quantity in sales:
+        store.incr(get_shop_key(product_shop.shop_id), product_shop.id, quantity)
+        products[product_shop.product_id] += quantity
+    categories = dict(Product.objects.filter(id__in=products).values_list('id', 'category_id'))
+    for product_id, quantity in products.items():
+        store.incr(PRODUCTS_KEY, product_id, quantity)
+        store.incr(get_category_key(categories[product_id]), product_id, quantity)
+
+
+def get_top_product_ids(count: int, category_id: int = None) -> list[int]:
+    key = get_category_key(category_id) if category_id else PRODUCTS_KEY
+    return _get_store().top(key, count)
+
+
+def get_top_offer_ids(shop_id: int, count: int) -> list[int]:
+    return _get_store().top(get_shop_key(shop_id), count)
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import hashlib
+import re
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.http import HttpRequest, QueryDict
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+
+from app_cart.cart import get_request_cart
+from app_shops.models.product import Product
+from .functions import CATALOG_CACHE_NAME, get_cache_version, bump_cache_version
+
+CSRF_PLACEHOLDER = '__csrf_token_placeholder__'
+CSRF_INPUT_RE = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+HOLES_AS_PLACEHOLDERS = 'holes_as_placeholders'
+HOLE_RE = re.compile(r'<!--hole:([\w/.-]+)-->')
+
+
+def get_device_class(request: HttpRequest) -> str:
+    """Класс устройства пользователя, от которого зависит разметка и размер страницы каталога"""
+    if request.user_agent.is_mobile:
+        return 'mobile'
+    if request.user_agent.is_tablet:
+        return 'tablet'
+    return 'desktop'
+
+
+def get_canonical_query(query_params: QueryDict) -> str:
+    """Строка запроса с отсортированными параметрами и без пустых значений"""
+    params = sorted((key, value.strip()) for key, values in query_params.lists()
+                    for value in values if value.strip())
+    query = QueryDict(mutable=True)
+    for key, value in params:
+        query.appendlist(key, value)
+    return query.urlencode()
+
+
+def is_page_cacheable(request: HttpRequest) -> bool:
+    """
+    Страница берется из кэша только для анонимного пользователя с пустой корзиной
+    и без ожидающих показа сообщений: в остальных случаях шапка страницы индивидуальна.
+    """
+    return settings.PAGE_CACHE_ENABLED and request.method == 'GET' \
+        and not request.user.is_authenticated \
+        and get_request_cart(request).is_empty() \
+        and not len(get_messages(request))
+
+
+def get_catalog_page_key(request: HttpRequest) -> str:
+    """Ключ кэша страницы каталога: версия данных каталога, запрос, язык и класс устройства"""
+    raw = '|'.join((get_canonical_query(request.GET), request.LANGUAGE_CODE, get_device_class(request)))
+    return f'catalog_page_{get_cache_version(CATALOG_CACHE_NAME)}_{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+def strip_csrf_token(content: str) -> str:
+    """Заменяет CSRF-токен, выданный при отрисовке страницы, на заглушку"""
+    match: Optional[re.Match] = CSRF_INPUT_RE.search(content)
+    return content.replace(match.group(1), CSRF_PLACEHOLDER) if match else content
+
+
+def restore_csrf_token(content: str, request: HttpRequest) -> str:
+    """Подставляет в закэшированную страницу CSRF-токен текущего запроса"""
+    if CSRF_PLACEHOLDER not in content:
+        return content
+    return content.replace(CSRF_PLACEHOLDER, get_token(request))
+
+
+def is_product_page_cacheable(request: HttpRequest) -> bool:
+    """
+    Страница товара кэшируется для всех пользователей: индивидуальные части страницы
+    выводятся через {% hole %}. Запросы с параметрами и с ожидающими показа сообщениями обрабатываются без кэша.
+    """
+    return settings.PAGE_CACHE_ENABLED and request.method == 'GET' and not request.GET \
+        and not len(get_messages(request))
+
+
+def get_product_page_key(slug: str, language: str) -> str:
+    """Ключ кэша страницы товара: slug, язык и версия страницы товара"""
+    return f'product_page_{get_cache_version(f"product_page_{slug}")}_{slug}_{language}'
+
+
+def invalidate_product_pages(product_ids: Iterable[int] = (), slugs: Iterable[str] = ()) -> None:
+    """Инвалидирует кэш страниц переданных товаров"""
+    slugs = set(slugs)
+    if product_ids := set(product_ids):
+        slugs.update(Product.objects.filter(id__in=product_ids).values_list('slug', flat=True))
+    for slug in slugs:
+        bump_cache_version(f'product_page_{slug}')
+
+
+def get_hole_marker(template_name: str) -> str:
+    return f'<!--hole:{template_name}-->'
+
+
+def fill_holes(content: str, request: HttpRequest, context: Optional[dict] = None) -> str:
+    """Заполняет метки индивидуальных фрагментов страницы, отрисовывая их для текущего запроса"""
+    return HOLE_RE.sub(lambda match: render_to_string(match.group(1), context, request=request), content)
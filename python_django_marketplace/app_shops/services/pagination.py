@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from typing import Any, Optional
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.http import QueryDict
+
+
+def encode_cursor(value: Any, pk: int, direction: str, field: str = '') -> str:
+    """Упаковывает позицию строки выборки и поле сортировки, к которому она относится, в непрозрачный токен"""
+    payload = json.dumps({'v': value, 'pk': pk, 'd': direction, 'f': field},
+                         cls=DjangoJSONEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[dict]:
+    """Распаковывает токен позиции. Для поврежденного токена возвращает None"""
+    if not cursor:
+        return None
+    try:
+        payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        data = json.loads(payload)
+    except (binascii.Error, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get('d') not in ('next', 'prev') or 'v' not in data \
+            or not isinstance(data.get('pk'), int) or not isinstance(data.get('f', ''), str):
+        return None
+    return data
+
+
+def estimate_count(queryset: QuerySet) -> Optional[int]:
+    """
+    Оценка количества строк выборки по плану запроса PostgreSQL без выполнения COUNT(*).
+    Для остальных СУБД возвращает None.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class KeysetPage:
+    """
+    Страница выборки, полученная курсорной пагинацией
+    """
+    is_keyset = True
+
+    def __init__(self, object_list: list, next_cursor: Optional[str], previous_cursor: Optional[str],
+                 estimated_total: Optional[int] = None, query_params: Optional[QueryDict] = None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.estimated_total = estimated_total
+        self.query_params = query_params if query_params is not None else QueryDict()
+
+    def __repr__(self) -> str:
+        return f'<KeysetPage of {len(self.object_list)} items>'
+
+    def __len__(self) -> int:
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    def has_previous(self) -> bool:
+        return self.previous_cursor is not None
+
+    def has_other_pages(self) -> bool:
+        return self.has_next() or self.has_previous()
+
+    @property
+    def next_query(self) -> str:
+        return self._get_query(self.next_cursor)
+
+    @property
+    def previous_query(self) -> str:
+        return self._get_query(self.previous_cursor)
+
+    def _get_query(self, cursor: Optional[str]) -> str:
+        query_params = self.query_params.copy()
+        query_params.pop('page', None)
+        query_params['cursor'] = cursor or ''
+        return query_params.urlencode()
+
+
+class KeysetPaginator:
+    """
+    Курсорная (seek) пагинация: страница выбирается условием по ключу сортировки и id,
+    поэтому стоимость N-й страницы совпадает со стоимостью первой.
+    """
+
+    def __init__(self, queryset: QuerySet, per_page: int, ordering: str, estimate_total: bool = False):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.descending = ordering.startswith('-')
+        self.field = ordering.lstrip('-')
+        self.estimate_total = estimate_total
+
+    def get_page(self, cursor: Optional[str] = None, query_params: Optional[QueryDict] = None) -> KeysetPage:
+        position = decode_cursor(cursor)
+        if position is not None and position.get('f') != self.field:
+            position = None
+        backwards = position is not None and position['d'] == 'prev'
+
+        queryset = self.queryset
+        if position is not None:
+            try:
+                queryset = queryset.filter(self._get_seek_condition(position['v'], position['pk'], backwards))
+            except (ValidationError, ValueError, TypeError):
+                # Значение из курсора не приводится к типу поля сортировки: страница выдается с начала
+                position, backwards = None, False
+        queryset = queryset.order_by(*self._get_ordering(backwards))
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+
+        has_next = position is not None if backwards else has_more
+        has_previous = has_more if backwards else position is not None
+        next_cursor = self._make_cursor(rows[-1], 'next') if has_next and rows else None
+        previous_cursor = self._make_cursor(rows[0], 'prev') if has_previous and rows else None
+
+        estimated_total = estimate_count(self.queryset) if self.estimate_total else None
+        return KeysetPage(rows, next_cursor, previous_cursor, estimated_total, query_params)
+
+    def _get_ordering(self, backwards: bool) -> tuple[str, str]:
+        descending = self.descending != backwards
+        prefix = '-' if descending else ''
+        return f'{prefix}{self.field}', f'{prefix}pk'
+
+    def _get_seek_condition(self, value: Any, pk: int, backwards: bool) -> Q:
+        lookup = 'lt' if self.descending != backwards else 'gt'
+        return Q(**{f'{self.field}__{lookup}': value}) | Q(**{self.field: value, f'pk__{lookup}': pk})
+
+    def _make_cursor(self, obj, direction: str) -> str:
+        value = obj
+        for attr in self.field.split('__'):
+            value = getattr(value, attr)
+        return encode_cursor(value, obj.pk, direction, self.field)
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector, SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import F, Q, QuerySet, FloatField
+from django.db.models.functions import Cast
+
+from app_shops.models.product import Product
+
+SEARCH_CONFIGS = {
+    'ru': 'russian',
+    'en': 'english',
+}
+
+
+def get_search_vector(language: str) -> SearchVector:
+    """Возвращает взвешенный поисковый вектор по названию и описаниям товара на заданном языке"""
+    config = SEARCH_CONFIGS[language]
+    return SearchVector(f'name_{language}', weight='A', config=config) \
+        + SearchVector(f'description_short_{language}', weight='B', config=config) \
+        + SearchVector(f'description_long_{language}', weight='C', config=config)
+
+
+def update_search_vectors(product_ids: Optional[Iterable[int]] = None) -> None:
+    """Обновляет поисковые векторы переданных товаров (или всех товаров, если товары не переданы)"""
+    products = Product.objects.all()
+    if connections[products.db].vendor != 'postgresql':
+        return
+    if product_ids is not None:
+        products = products.filter(id__in=product_ids)
+    products.update(**{f'search_vector_{language}': get_search_vector(language) for language in SEARCH_CONFIGS})
+
+
+def search_products(queryset: QuerySet, value: str, language: str) -> QuerySet:
+    """
+    Полнотекстовый поиск товаров на языке пользователя.
+    Найденные товары аннотируются релевантностью search_rank.
+    Для СУБД, отличных от PostgreSQL, выполняется поиск по вхождению подстроки.
+    """
+    if language not in SEARCH_CONFIGS:
+        language = settings.MODELTRANSLATION_DEFAULT_LANGUAGE
+
+    if connections[queryset.db].vendor != 'postgresql':
+        return queryset.filter(Q(**{f'name_{language}__icontains': value})
+                               | Q(**{f'description_short_{language}__icontains': value})
+                               | Q(**{f'description_long_{language}__icontains': value}))
+
+    vector_field = f'search_vector_{language}'
+    query = SearchQuery(value, config=SEARCH_CONFIGS[language], search_type='websearch')
+    return queryset.filter(**{vector_field: query}) \
+        .annotate(search_rank=Cast(SearchRank(F(vector_field), query), FloatField()))
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from typing import Iterable, Optional
+
+from django.db import transaction
+from django.db.models import Avg, Min, Max, Sum, Count
+from djmoney.money import Money
+
+from app_orders.models import StockHold
+from app_shops.models.product import Review
+from app_shops.models.shop import ProductShop
+from app_shops.models.summary import ProductSummary, ProductOffer
+from .functions import offer_price_exp, bump_cache_version, CATALOG_CACHE_NAME
+
+
+def refresh_product_summaries(product_ids: Optional[Iterable[int]] = None) -> None:
+    """
+    Пересчитывает сводки ProductSummary и предложения ProductOffer для переданных товаров
+    (или для всех, если товары не переданы).
+    Товары без активных предложений магазинов лишаются сводки и не попадают в каталог.
+    Наличие и предложение по умолчанию учитывают действующие резервы товаров под заказы.
+    """
+    offers = ProductShop.objects.filter(is_active=True)
+    reviews = Review.objects.all()
+    summaries = ProductSummary.objects.all()
+    all_offers = ProductShop.objects.with_discount_price()
+    product_offers = ProductOffer.objects.all()
+
+    if product_ids is not None:
+        product_ids = set(product_ids)
+        if not product_ids:
+            return
+        offers = offers.filter(product_id__in=product_ids)
+        reviews = reviews.filter(product_id__in=product_ids)
+        summaries = summaries.filter(product_id__in=product_ids)
+        all_offers = all_offers.filter(product_id__in=product_ids)
+        product_offers = product_offers.filter(product_id__in=product_ids)
+
+    offers_stats = offers.values('product_id') \
+        .annotate(avg_price=Avg(offer_price_exp),
+                  min_price=Min(offer_price_exp),
+                  max_price=Max(offer_price_exp),
+                  count_sold=Sum('count_sold')) \
+        .order_by()
+    held = StockHold.objects.held_quantities(product_shop__in=offers)
+    availability = offers.annotate(offer_price=offer_price_exp) \
+        .order_by('offer_price', 'id') \
+        .values_list('id', 'product_id', 'count_left')
+    default_offers = {}
+    for offer_id, product_id, count_left in availability:
+        if count_left - held.get(offer_id, 0) > 0:
+            default_offers.setdefault(product_id, offer_id)
+    reviews_count = dict(reviews.values('product_id')
+                         .annotate(count=Count('id'))
+                         .order_by()
+                         .values_list('product_id', 'count'))
+
+    objects = [
+        ProductSummary(product_id=stats['product_id'],
+                       avg_price=round(stats['avg_price'], 2),
+                       min_price=round(stats['min_price'], 2),
+                       max_price=round(stats['max_price'], 2),
+                       count_sold=stats['count_sold'] or 0,
+                       feedback=reviews_count.get(stats['product_id'], 0),
+                       default_offer_id=default_offers.get(stats['product_id']),
+                       in_stock=stats['product_id'] in default_offers)
+        for stats in offers_stats
+    ]
+
+    offer_objects = [
+        ProductOffer(product_shop_id=offer.id,
+                     product_id=offer.product_id,
+                     shop_id=offer.shop_id,
+                     price=offer.price.amount,
+                     discount_price=offer.discount_price.amount
+                     if isinstance(offer.discount_price, Money) else offer.discount_price,
+                     count_left=offer.count_left,
+                     is_active=offer.is_active)
+        for offer in all_offers
+    ]
+
+    with transaction.atomic():
+        summaries.delete()
+        ProductSummary.objects.bulk_create(objects, ignore_conflicts=True)
+        product_offers.delete()
+        ProductOffer.objects.bulk_create(offer_objects, ignore_conflicts=True)
+    bump_cache_version(CATALOG_CACHE_NAME)
@@ -2,21 +2,37 @@ import contextlib
 import os
 
 from django.core.cache import cache
-from django.core.exceptions import ObjectDoesNotExist
 from django.db import IntegrityError
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
 from django.dispatch import receiver
 
+from app_orders.signals import order_paid
+from .models.banner import Banner, SpecialOffer, SmallBanner, SliderBanner
 from .models.category import Category
 from .models.discount import Discount
-from .models.product import Product, FeatureToProduct
+from .models.product import Product, FeatureToProduct, FeatureName, FeatureValue, Review, TagProduct
 from .models.shop import Shop, ProductShop
+from .services.autocomplete import AUTOCOMPLETE_CACHE_NAME
+from .services.categories import rebuild_category_closure
+from .services.features import FEATURES_CACHE_NAME
+from .services.home import invalidate_home_snapshots
+from .services.leaderboard import record_sales
+from .services.page_cache import invalidate_product_pages
+from .services.functions import bump_cache_version, CATALOG_CACHE_NAME
+from .services.search import update_search_vectors
+from .services.summary import refresh_product_summaries
+
+
+@receiver([post_save, post_delete], sender=Category)
+def refresh_category_closure(**kwargs) -> None:
+    """Пересчет связей категорий с их предками после изменения дерева категорий"""
+    rebuild_category_closure()
 
 
 @receiver([post_save, post_delete], sender=Category)
 def invalidate_cache_category(**kwargs) -> None:
     """Удаление из кэша категории товаров, в случае изменения таблицы Category из админки"""
-    cache.delete('categories')
+    cache.delete('category_menu')
 
 
 @receiver([post_save, post_delete], sender=Discount)
@@ -42,6 +58,12 @@ def add_recommended_features_to_product(**kwargs) -> None:
                 FeatureToProduct.objects.bulk_create(objects)
 
 
+@receiver([post_save], sender=Product)
+def refresh_search_vectors(**kwargs) -> None:
+    """Обновление поисковых векторов товара после его сохранения"""
+    update_search_vectors([kwargs.get('instance').pk])
+
+
 @receiver(post_delete)
 def auto_delete_file_on_delete(sender, instance, **kwargs) -> None:
     """
@@ -68,12 +90,119 @@ def invalidate_cache_shop(**kwargs) -> None:
 
 
 @receiver([post_save, post_delete], sender=ProductShop)
-def invalidate_cache_shop(**kwargs) -> None:
-    """Удаление из кэша информации о товаре, в случае изменения таблицы ProductShop из админки"""
-    instance = kwargs.get('instance')
-    try:
-        slug = instance.shop.slug
-        cache.delete(f'products_top_{slug}')
-    except ObjectDoesNotExist:
-        pass
+def refresh_summary_product_shop(**kwargs) -> None:
+    """Пересчет сводки товара, в случае изменения его предложения в магазине"""
+    refresh_product_summaries([kwargs.get('instance').product_id])
+
+
+@receiver([post_save, post_delete], sender=Review)
+def refresh_summary_review(**kwargs) -> None:
+    """Пересчет сводки товара, в случае добавления или удаления отзыва"""
+    refresh_product_summaries([kwargs.get('instance').product_id])
+
+
+@receiver(pre_delete, sender=Discount)
+def collect_discount_products(**kwargs) -> None:
+    """Запоминание товаров удаляемой скидки, пока связь с предложениями еще существует"""
+    instance: Discount = kwargs.get('instance')
+    instance.summary_product_ids = list(instance.product_in_shop.values_list('product_id', flat=True))
+
+
+@receiver([post_save, post_delete], sender=Discount)
+def refresh_summary_discount(**kwargs) -> None:
+    """Пересчет сводок товаров, к предложениям которых привязана изменившаяся скидка"""
+    instance: Discount = kwargs.get('instance')
+    if kwargs.get('signal') is post_delete:
+        product_ids = getattr(instance, 'summary_product_ids', [])
+    else:
+        product_ids = instance.product_in_shop.values_list('product_id', flat=True)
+    refresh_product_summaries(product_ids)
+    invalidate_product_pages(product_ids)
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Shop)
+def invalidate_autocomplete(**kwargs) -> None:
+    """Перестроение индекса подсказок поиска, в случае изменения товаров, категорий или магазинов"""
+    bump_cache_version(AUTOCOMPLETE_CACHE_NAME)
+
 
+@receiver([post_save, post_delete], sender=TagProduct)
+def invalidate_cache_tags(**kwargs) -> None:
+    """Удаление из кэша тегов товаров, в случае изменения таблицы TagProduct из админки"""
+    cache.delete('tags')
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=TagProduct)
+@receiver(m2m_changed, sender=TagProduct.goods.through)
+def invalidate_catalog(**kwargs) -> None:
+    """Смена версии данных каталога, в случае изменения товаров, категорий или тегов"""
+    bump_cache_version(CATALOG_CACHE_NAME)
+
+
+@receiver([post_save, post_delete], sender=FeatureToProduct)
+@receiver([post_save, post_delete], sender=FeatureValue)
+@receiver([post_save, post_delete], sender=FeatureName)
+@receiver(m2m_changed, sender=FeatureToProduct.values.through)
+def invalidate_feature_index(**kwargs) -> None:
+    """Смена версии индекса характеристик и данных каталога, в случае изменения характеристик товаров"""
+    bump_cache_version(FEATURES_CACHE_NAME)
+    bump_cache_version(CATALOG_CACHE_NAME)
+
+
+@receiver([post_save, post_delete], sender=Banner)
+@receiver([post_save, post_delete], sender=SmallBanner)
+@receiver([post_save, post_delete], sender=SliderBanner)
+@receiver([post_save, post_delete], sender=SpecialOffer)
+def invalidate_home_snapshot(**kwargs) -> None:
+    """Удаление из кэша снимков главной страницы, в случае изменения баннеров из админки"""
+    invalidate_home_snapshots()
+
+
+@receiver(post_save, sender=ProductShop)
+def add_offer_to_leaderboards(**kwargs) -> None:
+    """Добавление нового предложения магазина в рейтинги продаж с нулевым счетом"""
+    if kwargs.get('created'):
+        record_sales([(kwargs.get('instance'), 0)])
+
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_product_page(**kwargs) -> None:
+    """Инвалидация кэша страницы товара, в случае изменения товара"""
+    invalidate_product_pages(slugs=[kwargs.get('instance').slug])
+
+
+@receiver([post_save, post_delete], sender=ProductShop)
+@receiver([post_save, post_delete], sender=Review)
+@receiver([post_save, post_delete], sender=FeatureToProduct)
+def invalidate_product_page_related(**kwargs) -> None:
+    """Инвалидация кэша страницы товара, в случае изменения его предложений, отзывов или характеристик"""
+    invalidate_product_pages([kwargs.get('instance').product_id])
+
+
+@receiver(m2m_changed, sender=TagProduct.goods.through)
+@receiver(m2m_changed, sender=FeatureToProduct.values.through)
+def invalidate_product_page_m2m(**kwargs) -> None:
+    """Инвалидация кэша страниц товаров, в случае изменения их тегов или значений характеристик"""
+    instance = kwargs.get('instance')
+    if isinstance(instance, Product):
+        invalidate_product_pages(slugs=[instance.slug])
+    elif isinstance(instance, TagProduct):
+        invalidate_product_pages(kwargs.get('pk_set') or instance.goods.values_list('id', flat=True))
+    elif isinstance(instance, FeatureToProduct):
+        invalidate_product_pages([instance.product_id])
+    else:
+        invalidate_product_pages(FeatureToProduct.objects.filter(values=instance).values_list('product_id', flat=True))
+
+
+@receiver(order_paid)
+def refresh_sold_products(**kwargs) -> None:
+    """Пересчет сводок, рейтингов продаж и кэша страниц товаров после оплаты заказа"""
+    sales = kwargs.get('sales')
+    product_ids = {product_shop.product_id for product_shop, _quantity in sales}
+    refresh_product_summaries(product_ids)
+    record_sales(sales)
+    invalidate_product_pages(product_ids)
@@ -4,6 +4,15 @@ from django.utils.module_loading import import_string
 from djmoney import settings
 
 from .models.discount import Discount
+from .models.shop import ProductShop
+from .services.categories import rebuild_category_closure
+from .services.history import flush_view_history
+from .services.home import rebuild_home_snapshots
+from .services.page_cache import invalidate_product_pages
+from .services.leaderboard import rebuild_leaderboards
+from .services.search import update_search_vectors
+from .services.summary import refresh_product_summaries
+from django_marketplace.constants import VIEW_HISTORY_FLUSH_BATCH_SIZE
 
 
 @shared_task(name='discount_invalidate')
@@ -11,7 +20,10 @@ def discount_invalidate():
     """Аннулирование скидок, у которых истек строк действия"""
     current_time = timezone.now()
     discounts = Discount.objects.filter(date_end__lte=current_time, is_active=True)
+    product_ids = set(ProductShop.objects.filter(discount__in=discounts).values_list('product_id', flat=True))
     discounts.update(is_active=False)
+    refresh_product_summaries(product_ids)
+    invalidate_product_pages(product_ids)
 
 
 @shared_task(name='update_rates')
@@ -19,3 +31,40 @@ def update_rates(backend=settings.EXCHANGE_BACKEND, **kwargs):
     """Обновление курса валют"""
     backend = import_string(backend)()
     backend.update_rates(**kwargs)
+
+
+@shared_task(name='rebuild_product_summaries')
+def rebuild_product_summaries():
+    """Полный пересчет сводок товаров"""
+    refresh_product_summaries()
+
+
+@shared_task(name='rebuild_search_vectors')
+def rebuild_search_vectors():
+    """Полное обновление поисковых векторов товаров"""
+    update_search_vectors()
+
+
+@shared_task(name='rebuild_category_tree')
+def rebuild_category_tree():
+    """Полный пересчет таблицы замыкания дерева категорий"""
+    rebuild_category_closure()
+
+
+@shared_task(name='rebuild_home_snapshot')
+def rebuild_home_snapshot():
+    """Пересборка снимков главной страницы"""
+    rebuild_home_snapshots()
+
+
+@shared_task(name='rebuild_leaderboards')
+def rebuild_sales_leaderboards():
+    """Пересборка рейтингов продаж по данным базы"""
+    rebuild_leaderboards()
+
+
+@shared_task(name='flush_view_history')
+def flush_viewed_products():
+    """Запись накопленных в буфере просмотров товаров в историю просмотров пачками ограниченного размера"""
+    while flush_view_history(VIEW_HISTORY_FLUSH_BATCH_SIZE):
+        pass
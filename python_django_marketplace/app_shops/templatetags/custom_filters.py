@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import random
 from decimal import Decimal
 from typing import Union
 
@@ -8,7 +7,6 @@ from django import template
 from django.utils.translation import gettext_lazy as _
 from djmoney.money import Money
 
-from app_shops.models.product import Product
 from app_shops.services.functions import conversion_to_dollar
 
 register = template.Library()
@@ -33,11 +31,3 @@ def localize(value, language_code) -> Money:
 def dollar_conversion_range(value, language_code) -> Union[int, None]:
     if value:
         return int(localize(value, language_code).amount)
-
-
-@register.filter
-def random_related_id(value: Product) -> int:
-    if hasattr(value, 'in_shops_id'):
-        return random.choice(value.in_shops_id)
-    else:
-        raise ValueError(_('The received argument does not have the "in_shops_id" attribute'))
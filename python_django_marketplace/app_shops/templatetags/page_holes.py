@@ -0,0 +1,18 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from app_shops.services.page_cache import HOLES_AS_PLACEHOLDERS, get_hole_marker
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, template_name: str) -> str:
+    """
+    Фрагмент страницы, индивидуальный для пользователя. При отрисовке страницы для кэша
+    вместо фрагмента выводится метка, которая заполняется при каждом запросе.
+    """
+    if context.get(HOLES_AS_PLACEHOLDERS):
+        return mark_safe(get_hole_marker(template_name))
+    with context.push():
+        return context.template.engine.get_template(template_name).render(context)
@@ -0,0 +1,49 @@
+import tempfile
+from pathlib import Path
+from unittest import skipIf
+
+from django.test import override_settings
+from django.urls import reverse
+
+from app_shops.services import catalog_index as catalog_index_module
+from app_shops.services.catalog_index import CatalogIndex, catalog_index
+from app_shops.services.functions import CATALOG_CACHE_NAME, get_cache_version
+from app_shops.tests.test_models import CustomTestCase
+
+
+@skipIf(catalog_index_module.np is None, 'numpy is not installed')
+class CatalogIndexTest(CustomTestCase):
+    def setUp(self):
+        self.snapshot_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.snapshot_dir.cleanup)
+
+    def test_query_filters_products(self):
+        """
+        Индекс отбирает товары по категории, цене и наличию
+        """
+        index = CatalogIndex.build(get_cache_version(CATALOG_CACHE_NAME))
+        self.assertEqual(index.query(category=self.category.slug).tolist(), [self.product.id])
+        self.assertEqual(index.query(price_range=(200, 300)).tolist(), [])
+        self.assertEqual(index.query(category='missing').tolist(), [])
+        self.assertEqual(index.query(in_stock=True, ordering='-avg_price').tolist(), [self.product.id])
+
+    def test_snapshot_round_trip(self):
+        """
+        Снимок индекса открывается с теми же данными
+        """
+        index = CatalogIndex.build(get_cache_version(CATALOG_CACHE_NAME))
+        index.save(Path(self.snapshot_dir.name))
+        loaded = CatalogIndex.load(Path(self.snapshot_dir.name), index.version)
+        self.assertEqual(loaded.query().tolist(), index.query().tolist())
+        self.assertEqual(loaded.categories, index.categories)
+
+    def test_catalog_view_uses_index(self):
+        """
+        Каталог для анонимного пользователя отдает товары, найденные индексом
+        """
+        with override_settings(CATALOG_INDEX_ENABLED=True, CATALOG_INDEX_SNAPSHOT_DIR=self.snapshot_dir.name):
+            catalog_index.reset()
+            response = self.client.get(reverse('catalog'), {'category': self.category.slug})
+        catalog_index.reset()
+        self.assertFalse(getattr(response.context['page_obj'], 'is_keyset', False))
+        self.assertEqual(list(response.context['goods']), [self.product])
@@ -0,0 +1,37 @@
+from django.urls import reverse
+
+from app_shops.models.category import Category, CategoryClosure
+from app_shops.services.categories import build_category_menu, get_descendant_ids
+from app_shops.tests.test_models import CustomTestCase
+
+
+class CategoryClosureTest(CustomTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.parent = Category.objects.create(name='parent', slug='parent', is_active=True)
+        cls.category.parent = cls.parent
+        cls.category.save()
+
+    def test_closure_contains_ancestors(self):
+        """
+        Для категории хранятся связи с ней самой и с родительской категорией
+        """
+        links = set(CategoryClosure.objects.filter(descendant=self.category).values_list('ancestor_id', 'depth'))
+        self.assertEqual(links, {(self.category.id, 0), (self.parent.id, 1)})
+        self.assertEqual(set(get_descendant_ids(self.parent.slug)), {self.parent.id, self.category.id})
+
+    def test_catalog_filter_includes_subcategories(self):
+        """
+        Фильтр каталога по родительской категории показывает товары подкатегорий
+        """
+        response = self.client.get(reverse('catalog'), {'category': self.parent.slug})
+        self.assertEqual(list(response.context['goods']), [self.product])
+
+    def test_menu_tree(self):
+        """
+        Меню категорий строится деревом от корневых категорий
+        """
+        menu = build_category_menu()['ru']
+        self.assertEqual([node['name'] for node in menu], [self.parent.name])
+        self.assertEqual([node['name'] for node in menu[0]['children']], [self.category.name])
@@ -0,0 +1,45 @@
+from django.urls import reverse
+
+from app_shops.models.product import FeatureName, FeatureValue, FeatureToProduct, Product
+from app_shops.services.comparison import build_feature_matrix
+from app_shops.tests.test_models import CustomTestCase
+
+
+class ComparisonMatrixTest(CustomTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other_product = Product.objects.create(name='other', slug='other', category=cls.category, is_active=True)
+        ram = FeatureName.objects.create(name='RAM')
+        color = FeatureName.objects.create(name='color')
+        weight = FeatureName.objects.create(name='weight')
+        ram_8 = FeatureValue.objects.create(name=ram, value='8GB')
+        black = FeatureValue.objects.create(name=color, value='black')
+        white = FeatureValue.objects.create(name=color, value='white')
+
+        FeatureToProduct.objects.create(product=cls.product, feature_name=ram).values.add(ram_8)
+        FeatureToProduct.objects.create(product=cls.other_product, feature_name=ram).values.add(ram_8)
+        FeatureToProduct.objects.create(product=cls.product, feature_name=color).values.add(black)
+        FeatureToProduct.objects.create(product=cls.other_product, feature_name=color).values.add(white)
+        FeatureToProduct.objects.create(product=cls.product, feature_name=weight)
+
+    def test_matrix_marks_common_and_differing_features(self):
+        """
+        Матрица отмечает общие характеристики и характеристики с различающимися значениями
+        """
+        matrix = {feature['name']: feature
+                  for feature in build_feature_matrix([self.product.id, self.other_product.id], 'ru')}
+        self.assertEqual((matrix['RAM']['common'], matrix['RAM']['differs']), (True, False))
+        self.assertEqual((matrix['color']['common'], matrix['color']['differs']), (True, True))
+        self.assertFalse(matrix['weight']['common'])
+        self.assertEqual(matrix['color']['values'], {self.product.id: 'black', self.other_product.id: 'white'})
+
+    def test_comparison_view_shows_only_differences(self):
+        """
+        В режиме различий выводятся только характеристики с разными значениями
+        """
+        for product in (self.product, self.other_product):
+            self.client.post(reverse('comparison'), {'add_product': product.id})
+        response = self.client.get(reverse('comparison'), {'is_difference': 'True'})
+        for item in response.context['comparison_list']:
+            self.assertEqual([feature['name'] for feature in item.comparison_features], ['color'])
@@ -0,0 +1,39 @@
+from django.http import QueryDict
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from app_shops.models.product import TagProduct
+from app_shops.services.facets import get_filter_fingerprint
+from app_shops.tests.test_models import CustomTestCase
+
+
+class FilterFingerprintTest(SimpleTestCase):
+    def test_fingerprint_ignores_order_and_pagination(self):
+        """
+        Отпечаток фильтров не зависит от порядка параметров, сортировки и страницы
+        """
+        first = get_filter_fingerprint(QueryDict('tag=a&in_stock=on&page=2'), 'ru')
+        second = get_filter_fingerprint(QueryDict('in_stock=on&order_by=-avg_price&tag=a&name='), 'ru')
+        self.assertEqual(first, second)
+
+    def test_fingerprint_depends_on_language(self):
+        """
+        Отпечаток фильтров различается для разных языков
+        """
+        self.assertNotEqual(get_filter_fingerprint(QueryDict('tag=a'), 'ru'),
+                            get_filter_fingerprint(QueryDict('tag=a'), 'en'))
+
+
+class CatalogFacetsTest(CustomTestCase):
+    def test_catalog_facets_counts(self):
+        """
+        Каталог возвращает счетчики тегов, категорий и наличия для текущих фильтров
+        """
+        tag = TagProduct.objects.create(name='tag', codename='tag')
+        tag.goods.add(self.product)
+
+        facets = self.client.get(reverse('catalog')).context['facets']
+        self.assertEqual(facets['total'], 1)
+        self.assertEqual(facets['in_stock'], 1)
+        self.assertEqual(facets['categories'], [{'slug': self.category.slug, 'name': self.category.name, 'count': 1}])
+        self.assertIn({'codename': tag.codename, 'name': tag.name, 'count': 1}, facets['tags'])
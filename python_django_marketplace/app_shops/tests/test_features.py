@@ -0,0 +1,40 @@
+from django.urls import reverse
+
+from app_shops.models.product import FeatureName, FeatureValue, FeatureToProduct, Product
+from app_shops.services.features import FeatureIndex, feature_index
+from app_shops.tests.test_models import CustomTestCase
+
+
+class FeatureFilterTest(CustomTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other_product = Product.objects.create(name='other', slug='other', category=cls.category, is_active=True)
+        ram = FeatureName.objects.create(name='RAM')
+        color = FeatureName.objects.create(name='color')
+        cls.ram_8 = FeatureValue.objects.create(name=ram, value='8GB')
+        cls.black = FeatureValue.objects.create(name=color, value='black')
+        cls.white = FeatureValue.objects.create(name=color, value='white')
+
+        FeatureToProduct.objects.create(product=cls.product, feature_name=ram).values.add(cls.ram_8)
+        FeatureToProduct.objects.create(product=cls.product, feature_name=color).values.add(cls.black)
+        FeatureToProduct.objects.create(product=cls.other_product, feature_name=color).values.add(cls.white)
+
+    def setUp(self):
+        feature_index.reset()
+
+    def test_match_or_within_feature_and_across_features(self):
+        """
+        Значения одной характеристики объединяются по ИЛИ, разных характеристик - по И
+        """
+        index = FeatureIndex.build()
+        self.assertEqual(set(index.match([self.black.id, self.white.id])), {self.product.id, self.other_product.id})
+        self.assertEqual(index.match([self.ram_8.id, self.white.id]), [])
+        self.assertEqual(index.match([self.ram_8.id, self.black.id]), [self.product.id])
+
+    def test_catalog_feature_filter(self):
+        """
+        Каталог фильтруется по нескольким значениям характеристик
+        """
+        response = self.client.get(reverse('catalog'), {'feature': [self.ram_8.id, self.black.id]})
+        self.assertEqual(list(response.context['goods']), [self.product])
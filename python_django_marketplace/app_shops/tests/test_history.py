@@ -0,0 +1,75 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from app_shops.models.product import Product, ViewHistory
+from app_shops.services.history import flush_view_history, record_view, get_recently_viewed, \
+    get_recently_viewed_key
+from app_shops.tests.test_models import CustomTestCase
+from django_marketplace.constants import VIEW_HISTORY_LIMIT
+
+
+class ViewHistoryBufferTest(CustomTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.profile = get_user_model().objects.create_user(username='viewer').profile
+
+    def setUp(self):
+        flush_view_history()
+
+    def test_views_written_on_flush(self):
+        """
+        Просмотры попадают в историю только после сброса буфера, повторный просмотр не дублирует запись
+        """
+        record_view(self.profile.id, self.product.id)
+        record_view(self.profile.id, self.product.id)
+        self.assertFalse(ViewHistory.objects.filter(profile=self.profile).exists())
+
+        flush_view_history()
+        self.assertEqual(ViewHistory.objects.filter(profile=self.profile, product=self.product).count(), 1)
+
+    def test_flush_in_batches(self):
+        """
+        Буфер сбрасывается пачками заданного размера, каждое событие записывается один раз
+        """
+        other_product = Product.objects.create(name='other', slug='other', category=self.category, is_active=True)
+        for product in (self.product, other_product, self.product):
+            record_view(self.profile.id, product.id)
+
+        self.assertEqual(flush_view_history(batch_size=2), 2)
+        self.assertEqual(ViewHistory.objects.filter(profile=self.profile).count(), 2)
+        self.assertEqual(flush_view_history(batch_size=2), 1)
+        self.assertEqual(flush_view_history(batch_size=2), 0)
+
+    def test_history_trimmed_to_limit(self):
+        """
+        В истории остаются только последние VIEW_HISTORY_LIMIT просмотренных товаров
+        """
+        products = [Product.objects.create(name=f'product {number}', slug=f'product-{number}',
+                                           category=self.category, is_active=True)
+                    for number in range(VIEW_HISTORY_LIMIT + 1)]
+        for product in products:
+            record_view(self.profile.id, product.id)
+        flush_view_history()
+
+        history = ViewHistory.objects.filter(profile=self.profile)
+        self.assertEqual(history.count(), VIEW_HISTORY_LIMIT)
+        self.assertFalse(history.filter(product=products[0]).exists())
+
+    def test_recently_viewed_available_before_flush(self):
+        """
+        Недавно просмотренные товары доступны сразу, последний просмотренный - первым
+        """
+        other_product = Product.objects.create(name='other', slug='other', category=self.category, is_active=True)
+        record_view(self.profile.id, self.product.id)
+        record_view(self.profile.id, other_product.id)
+        self.assertEqual(get_recently_viewed(self.profile.id), [other_product, self.product])
+
+    def test_recently_viewed_restored_from_database(self):
+        """
+        При отсутствии списка в кэше он восстанавливается из истории просмотров
+        """
+        record_view(self.profile.id, self.product.id)
+        flush_view_history()
+        cache.delete(get_recently_viewed_key(self.profile.id))
+        self.assertEqual(get_recently_viewed(self.profile.id, 3), [self.product])
@@ -0,0 +1,52 @@
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import translation
+
+from app_shops.models.banner import SliderBanner
+from app_shops.services.functions import CATALOG_CACHE_NAME, bump_cache_version
+from app_shops.services.home import get_home_snapshot_key, rebuild_home_snapshots
+from app_shops.tests.test_models import CustomTestCase
+
+
+class HomeSnapshotTest(CustomTestCase):
+    def test_snapshot_rebuilt_for_every_language(self):
+        """
+        Задача пересборки сохраняет снимок главной страницы для каждого языка
+        """
+        rebuild_home_snapshots()
+        for language in ('ru', 'en'):
+            with self.subTest(language=language):
+                snapshot = cache.get(get_home_snapshot_key(language))
+                self.assertEqual([item['id'] for item in snapshot['top_goods']], [self.product.id])
+
+    def test_home_view_reads_snapshot(self):
+        """
+        Главная страница выводит данные из снимка
+        """
+        with translation.override('ru'):
+            rebuild_home_snapshots()
+            snapshot = cache.get(get_home_snapshot_key('ru'))
+            snapshot['top_goods'][0]['name'] = 'from snapshot'
+            cache.set(get_home_snapshot_key('ru'), snapshot)
+
+        response = self.client.get(reverse('home'))
+        self.assertEqual(response.context['top_goods'][0].name, 'from snapshot')
+
+    def test_snapshot_survives_catalog_changes(self):
+        """
+        Снимок главной страницы не сбрасывается при изменении версии данных каталога
+        """
+        rebuild_home_snapshots()
+        bump_cache_version(CATALOG_CACHE_NAME)
+        self.assertIsNotNone(cache.get(get_home_snapshot_key('ru')))
+
+    def test_snapshot_category_name(self):
+        """
+        Категория товара из снимка выводится названием
+        """
+        SliderBanner.objects.create(product=self.product)
+        rebuild_home_snapshots()
+
+        response = self.client.get(reverse('home'))
+        self.assertNotContains(response, 'namespace(')
+        self.assertContains(response, self.category.name)
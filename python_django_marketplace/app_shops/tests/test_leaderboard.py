@@ -0,0 +1,75 @@
+from django.test import SimpleTestCase
+from django.urls import reverse
+from djmoney.money import Money
+
+from app_shops.models.product import Product
+from app_shops.models.shop import ProductShop
+from app_shops.services.functions import bump_cache_version
+from app_shops.services.leaderboard import LEADERBOARD_CACHE_NAME, LocalSortedSetStore, get_top_offer_ids, \
+    get_top_product_ids, rebuild_leaderboards, record_sales
+from app_shops.services.summary import refresh_product_summaries
+from app_shops.tests.test_models import CustomTestCase
+
+
+class LocalSortedSetStoreTest(SimpleTestCase):
+    def test_top_ordered_by_score(self):
+        """
+        Элементы выдаются по убыванию счета, счет увеличивается инкрементально
+        """
+        store = LocalSortedSetStore()
+        store.replace({'key': {1: 5, 2: 3, 3: 1}})
+        store.incr('key', 3, 10)
+        store.incr('key', 4, 4)
+        self.assertEqual(store.top('key', 3), [3, 1, 4])
+        self.assertEqual(store.top('missing', 3), [])
+
+
+class LeaderboardTest(CustomTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other_product = Product.objects.create(name='other', slug='other', category=cls.category, is_active=True)
+        cls.other_offer = ProductShop.objects.create(product=cls.other_product, shop=cls.shop, count_left=100,
+                                                     count_sold=0, price=Money(100, 'RUB'), is_active=True)
+
+    def setUp(self):
+        rebuild_leaderboards()
+
+    def test_sales_move_product_up(self):
+        """
+        Продажи поднимают товар в общем рейтинге и в рейтинге магазина
+        """
+        self.assertEqual(get_top_product_ids(2), [self.product.id, self.other_product.id])
+        record_sales([(self.other_offer, 500)])
+        self.assertEqual(get_top_product_ids(2), [self.other_product.id, self.product.id])
+        self.assertEqual(get_top_product_ids(1, self.category.id), [self.other_product.id])
+        self.assertEqual(get_top_offer_ids(self.shop.id, 1), [self.other_offer.id])
+
+    def test_local_store_reloads_after_version_change(self):
+        """
+        Хранилище процесса перечитывает рейтинги из базы, когда другой процесс меняет их версию
+        """
+        ProductShop.objects.filter(id=self.other_offer.id).update(count_sold=500)
+        refresh_product_summaries([self.other_product.id])
+        self.assertEqual(get_top_product_ids(1), [self.product.id])
+
+        bump_cache_version(LEADERBOARD_CACHE_NAME)
+        self.assertEqual(get_top_product_ids(1), [self.other_product.id])
+
+    def test_sales_not_counted_twice_after_rebuild(self):
+        """
+        Продажи, уже записанные в базу, не добавляются повторно, если хранилище перестраивается при их записи
+        """
+        ProductShop.objects.filter(id=self.other_offer.id).update(count_sold=60)
+        refresh_product_summaries([self.other_product.id])
+        bump_cache_version(LEADERBOARD_CACHE_NAME)
+
+        record_sales([(self.other_offer, 60)])
+        self.assertEqual(get_top_product_ids(2), [self.product.id, self.other_product.id])
+
+    def test_shop_detail_uses_leaderboard(self):
+        """
+        Топ товаров магазина выводится в порядке рейтинга продаж
+        """
+        response = self.client.get(reverse('store_detail', args=[self.shop.slug]))
+        self.assertEqual(response.context['goods'], [self.product_shop, self.other_offer])
@@ -1,5 +1,5 @@
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.utils import timezone
 from djmoney.money import Money
 
@@ -26,6 +26,7 @@ shops_data = {'name': name,
               }
 
 
+@override_settings(PAGE_CACHE_ENABLED=False)
 class CustomTestCase(TestCase):
 
     @classmethod
@@ -0,0 +1,103 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.http import QueryDict
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from app_shops.services.page_cache import CSRF_PLACEHOLDER, get_canonical_query, strip_csrf_token
+from app_shops.models.discount import Discount
+from app_shops.models.product import Review
+from app_shops.tasks import discount_invalidate
+from app_shops.tests.test_models import CustomTestCase, password
+
+
+class CanonicalQueryTest(SimpleTestCase):
+    def test_query_is_sorted_without_empty_values(self):
+        """
+        Порядок параметров и пустые значения не влияют на ключ кэша
+        """
+        self.assertEqual(get_canonical_query(QueryDict('tag=b&category=a&name=')),
+                         get_canonical_query(QueryDict('category=a&tag=b')))
+
+    def test_csrf_token_replaced_with_placeholder(self):
+        """
+        CSRF-токен в закэшированной странице заменяется заглушкой
+        """
+        content = '<input type="hidden" name="csrfmiddlewaretoken" value="secret">'
+        self.assertEqual(strip_csrf_token(content),
+                         f'<input type="hidden" name="csrfmiddlewaretoken" value="{CSRF_PLACEHOLDER}">')
+
+
+@override_settings(PAGE_CACHE_ENABLED=True)
+class CatalogPageCacheTest(CustomTestCase):
+    def test_catalog_page_served_from_cache(self):
+        """
+        Повторный запрос каталога отдается из кэша со свежим CSRF-токеном
+        """
+        url = reverse('catalog')
+        first = self.client.get(url, {'category': self.category.slug})
+        second = self.client.get(url, {'category': self.category.slug})
+
+        self.assertIsNotNone(first.context)
+        self.assertIsNone(second.context)
+        self.assertContains(second, self.product.name)
+        self.assertNotContains(second, CSRF_PLACEHOLDER)
+
+    def test_catalog_page_cache_invalidated_on_offer_change(self):
+        """
+        Изменение предложения магазина сбрасывает кэш страницы каталога
+        """
+        url = reverse('catalog')
+        self.client.get(url)
+        self.product_shop.count_left = 0
+        self.product_shop.save()
+
+        self.assertIsNotNone(self.client.get(url).context)
+
+
+@override_settings(PAGE_CACHE_ENABLED=True)
+class ProductPageCacheTest(CustomTestCase):
+    def test_holes_filled_for_each_user(self):
+        """
+        Закэшированная страница товара заполняется фрагментами текущего пользователя
+        """
+        url = reverse('product-detail', args=[self.product.slug])
+        anonymous = self.client.get(url)
+        user = get_user_model().objects.create_user(username='buyer', password=password)
+        self.client.force_login(user)
+        authenticated = self.client.get(url)
+
+        self.assertContains(anonymous, reverse('account_login'))
+        self.assertNotContains(authenticated, reverse('account_login'))
+        self.assertContains(authenticated, reverse('account_logout'))
+        for response in (anonymous, authenticated):
+            self.assertNotContains(response, '<!--hole:')
+            self.assertNotContains(response, CSRF_PLACEHOLDER)
+
+    def test_product_page_invalidated_on_review(self):
+        """
+        Новый отзыв сбрасывает кэш страницы товара
+        """
+        url = reverse('product-detail', args=[self.product.slug])
+        self.client.get(url)
+        user = get_user_model().objects.create_user(username='reviewer')
+        Review.objects.create(product=self.product, profile=user.profile, text='fresh review')
+
+        self.assertContains(self.client.get(url), 'fresh review')
+
+    def test_product_page_invalidated_on_discount_expiry(self):
+        """
+        Истечение скидки задачей discount_invalidate сбрасывает кэш страницы товара
+        """
+        url = reverse('product-detail', args=[self.product.slug])
+        self.client.get(url)
+        self.assertIsNone(self.client.get(url).context)
+
+        Discount.objects.filter(id=self.discount.id).update(date_end=timezone.now() - timedelta(minutes=1))
+        discount_invalidate()
+
+        response = self.client.get(url)
+        self.assertIsNotNone(response.context)
+        self.assertEqual([offer.discount_price for offer in response.context['sellers']], [None])
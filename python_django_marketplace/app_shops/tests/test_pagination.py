@@ -0,0 +1,52 @@
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from app_shops.services.pagination import encode_cursor, decode_cursor
+from app_shops.tests.test_models import CustomTestCase
+
+
+class CursorTest(SimpleTestCase):
+    def test_cursor_round_trip(self):
+        """
+        Токен курсора распаковывается в исходную позицию
+        """
+        cursor = encode_cursor('100.00', 5, 'next', 'avg_price')
+        self.assertEqual(decode_cursor(cursor), {'v': '100.00', 'pk': 5, 'd': 'next', 'f': 'avg_price'})
+
+    def test_broken_cursor(self):
+        """
+        Поврежденный токен трактуется как отсутствие курсора
+        """
+        for cursor in ('', 'not-a-cursor', encode_cursor('1', 1, 'sideways')):
+            with self.subTest(cursor=cursor):
+                self.assertIsNone(decode_cursor(cursor))
+
+
+class CatalogKeysetPaginationTest(CustomTestCase):
+    def test_catalog_uses_keyset_page_by_default(self):
+        """
+        Каталог без номера страницы использует курсорную пагинацию
+        """
+        response = self.client.get(reverse('catalog'))
+        page_obj = response.context['page_obj']
+        self.assertTrue(page_obj.is_keyset)
+        self.assertFalse(page_obj.has_previous())
+        self.assertEqual(list(response.context['goods']), [self.product])
+
+    def test_catalog_page_number_uses_offset_pagination(self):
+        """
+        Ссылки с номером страницы продолжают работать
+        """
+        response = self.client.get(reverse('catalog'), {'page': 1})
+        self.assertEqual(response.context['page_obj'].number, 1)
+
+    def test_foreign_or_tampered_cursor(self):
+        """
+        Курсор другой сортировки и курсор со значением неверного типа трактуются как отсутствие курсора
+        """
+        for cursor in (encode_cursor('100.00', self.product.pk, 'next', 'feedback'),
+                       encode_cursor('not-a-number', self.product.pk, 'next', 'avg_price')):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(reverse('catalog'), {'order_by': 'avg_price', 'cursor': cursor})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(list(response.context['goods']), [self.product])
@@ -0,0 +1,105 @@
+from django.contrib.auth import get_user_model
+from djmoney.money import Money
+
+from app_shops.models.product import Review
+from app_shops.models.shop import ProductShop, Shop
+from app_shops.models.summary import ProductSummary, ProductOffer
+from app_shops.tests.test_models import CustomTestCase, text, email, address
+
+
+class ProductSummaryTest(CustomTestCase):
+    def test_summary_created_for_product_with_active_offer(self):
+        """
+        Сводка товара создается вместе с активным предложением магазина
+        """
+        summary = ProductSummary.objects.get(product=self.product)
+        self.assertEqual(summary.avg_price, 90)
+        self.assertEqual(summary.count_sold, 100)
+        self.assertEqual(summary.default_offer_id, self.product_shop.id)
+        self.assertTrue(summary.in_stock)
+
+    def test_summary_updated_on_offer_change(self):
+        """
+        Изменение предложения магазина пересчитывает сводку
+        """
+        self.product_shop.discount = None
+        self.product_shop.price = Money(200, 'RUB')
+        self.product_shop.count_left = 0
+        self.product_shop.save()
+
+        summary = ProductSummary.objects.get(product=self.product)
+        self.assertEqual(summary.avg_price, 200)
+        self.assertFalse(summary.in_stock)
+
+    def test_summary_deleted_without_active_offers(self):
+        """
+        Товар без активных предложений лишается сводки
+        """
+        self.product_shop.is_active = False
+        self.product_shop.save()
+
+        self.assertFalse(ProductSummary.objects.filter(product=self.product).exists())
+
+    def test_summary_counts_reviews(self):
+        """
+        Добавление отзыва увеличивает счетчик отзывов в сводке
+        """
+        user = get_user_model().objects.create_user(username='reviewer')
+        Review.objects.create(product=self.product, profile=user.profile, text=text)
+
+        self.assertEqual(ProductSummary.objects.get(product=self.product).feedback, 1)
+
+
+    def test_default_offer_is_cheapest_in_stock(self):
+        """
+        Предложением по умолчанию становится самое дешевое предложение в наличии
+        """
+        shop = Shop.objects.create(name='other', description=text, mail=email, address=address, slug='other',
+                                   phone='+79990000001', is_active=True)
+        offer = ProductShop.objects.create(product=self.product, shop=shop, count_left=1, count_sold=0,
+                                           price=Money(80, 'RUB'), is_active=True)
+        self.assertEqual(ProductSummary.objects.get(product=self.product).default_offer_id, offer.id)
+
+        offer.count_left = 0
+        offer.save()
+        self.assertEqual(ProductSummary.objects.get(product=self.product).default_offer_id, self.product_shop.id)
+
+    def test_no_default_offer_without_stock(self):
+        """
+        Товар без остатков остается в каталоге без предложения по умолчанию
+        """
+        self.product_shop.count_left = 0
+        self.product_shop.save()
+
+        self.assertIsNone(ProductSummary.objects.get(product=self.product).default_offer_id)
+
+
+class ProductOfferTest(CustomTestCase):
+    def test_offer_created_with_discount_price(self):
+        """
+        Предложение магазина хранит цену и цену со скидкой
+        """
+        offer = ProductOffer.objects.get(product_shop=self.product_shop)
+        self.assertEqual(offer.shop_id, self.shop.id)
+        self.assertEqual(offer.price, 100)
+        self.assertEqual(offer.discount_price, 90)
+        self.assertEqual(offer.count_left, 100)
+        self.assertTrue(offer.is_active)
+
+    def test_offer_discount_price_respects_min_cost(self):
+        """
+        Цена со скидкой не опускается ниже минимальной стоимости скидки
+        """
+        self.discount.min_cost = Money(95, 'RUB')
+        self.discount.save()
+
+        self.assertEqual(ProductOffer.objects.get(product_shop=self.product_shop).discount_price, 95)
+
+    def test_inactive_offer_kept_with_flag(self):
+        """
+        Неактивное предложение остается в таблице со снятым флагом активности
+        """
+        self.product_shop.is_active = False
+        self.product_shop.save()
+
+        self.assertFalse(ProductOffer.objects.get(product_shop=self.product_shop).is_active)
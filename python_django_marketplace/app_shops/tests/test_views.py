@@ -1,5 +1,6 @@
 from django.urls import reverse
 
+from app_shops.services.autocomplete import autocomplete_indexes
 from app_shops.tests.test_models import CustomTestCase
 
 
@@ -24,6 +25,26 @@ class AppShopsViewsTest(CustomTestCase):
         for key, value in catalog_view_text.items():
             self.assertEqual(catalog_view_text[key], value)
 
+    def test_catalog_view_search_by_name(self):
+        """
+        Поиск в каталоге находит товар по названию и не находит по постороннему слову.
+        """
+        response = self.client.get(reverse('catalog'), {'name': self.product.name})
+        self.assertIn(self.product, response.context['goods'])
+
+        response = self.client.get(reverse('catalog'), {'name': 'smartphone'})
+        self.assertNotIn(self.product, response.context['goods'])
+
+    def test_autocomplete_returns_matching_product(self):
+        """
+        Подсказки поиска находят товар по началу названия.
+        """
+        autocomplete_indexes.reset()
+        response = self.client.get(reverse('autocomplete'), {'q': self.product.name[:3]})
+        results = response.json()['results']
+        self.assertIn({'type': 'product', 'name': self.product.name, 'url': self.product.get_absolute_url()},
+                      results)
+
     def test_sales_view_page_show_correct_context(self):
         """
         Шаблон в sale.html сформирован с правильным контекстом.
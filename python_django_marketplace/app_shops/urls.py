@@ -1,7 +1,7 @@
 from django.urls import path
 
 from .views import HomeView, CatalogView, SaleView, DiscountDetailView, ProductDetailView, ComparisonView, \
-    AboutUsView, ShopDetailView
+    AboutUsView, ShopDetailView, autocomplete
 
 urlpatterns = [
     path('', HomeView.as_view(), name='home'),
@@ -10,6 +10,7 @@ urlpatterns = [
     path('promo/<slug:promo_slug>/', DiscountDetailView.as_view(), name='discount'),
     path('product/<slug:product_slug>/', ProductDetailView.as_view(), name='product-detail'),
     path('catalog/compare/', ComparisonView.as_view(), name='comparison'),
+    path('catalog/autocomplete/', autocomplete, name='autocomplete'),
     path('about/', AboutUsView.as_view(), name='about'),
     path('store/<slug:store_slug>/', ShopDetailView.as_view(), name='store_detail')
 ]
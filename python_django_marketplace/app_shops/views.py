@@ -1,14 +1,15 @@
 from collections import defaultdict
 from decimal import Decimal
-from typing import Any, Sequence
+from typing import Any, Sequence, Optional
 
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.contrib.postgres.aggregates import ArrayAgg
 from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
 from django.core.paginator import Paginator
-from django.db.models import QuerySet, Avg, Min, Max, Sum, Prefetch, Count
-from django.http import HttpRequest, HttpResponse, Http404
+from django.db.models import QuerySet, Prefetch, F
+from django.db.models.functions import Coalesce
+from django.http import HttpRequest, HttpResponse, Http404, JsonResponse
 from django.shortcuts import redirect
 from django.utils import timezone
 from django.utils.decorators import method_decorator
@@ -17,18 +18,29 @@ from django.views.generic import TemplateView, ListView, DetailView
 from django_filters.views import FilterView
 from djmoney.contrib.exchange.models import convert_money
 from djmoney.money import Money
+from modeltranslation.utils import build_localized_fieldname, get_language
 
 from app_cart.forms import CartAddProductForm
-from django_marketplace.constants import TAGS_CACHE_LIFETIME, SALES_CACHE_LIFETIME, SHOPS_CACHE_LIFETIME, \
-    PRODUCTS_TOP_CACHE_LIFETIME
+from django_marketplace.constants import SALES_CACHE_LIFETIME, SHOPS_CACHE_LIFETIME, \
+    AUTOCOMPLETE_LIMIT, CATALOG_PAGE_CACHE_LIFETIME, COMPARISON_LIMIT, \
+    PRODUCT_PAGE_CACHE_LIFETIME
 from .filters import ProductFilter
 from .forms import ReviewForm
-from .models.banner import Banner, SpecialOffer, SmallBanner, SliderBanner
 from .models.discount import Discount
-from .models.product import Product, TagProduct, FeatureToProduct, Review, ViewHistory
+from .models.product import Product, FeatureToProduct, Review
 from .models.shop import ProductShop, Shop
-from .services.functions import get_prices, price_exp, price_exp_banners
-from .templatetags.custom_filters import random_related_id
+from .models.summary import ProductOffer
+from .services.autocomplete import get_suggestions
+from .services.catalog_index import catalog_index
+from .services.comparison import get_feature_matrix
+from .services.facets import get_facets
+from .services.features import feature_index, parse_feature_values
+from .services.history import record_view
+from .services.home import get_home_snapshot, to_namespace
+from .services.leaderboard import get_top_offer_ids
+from .services.page_cache import is_page_cacheable, get_catalog_page_key, get_device_class, strip_csrf_token, \
+    restore_csrf_token, is_product_page_cacheable, get_product_page_key, fill_holes, HOLES_AS_PLACEHOLDERS
+from .services.pagination import KeysetPaginator
 from django.urls import reverse
 
 
@@ -40,36 +52,7 @@ class HomeView(TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        goods = Product.objects \
-                    .filter(is_active=True, in_shops__is_active=True) \
-                    .select_related('category', 'main_image') \
-                    .annotate(sum_count_sold=Sum('in_shops__count_sold'),
-                              avg_price=Avg(price_exp),
-                              in_shops_id=ArrayAgg('in_shops')) \
-                    .order_by('-sum_count_sold')[:8]
-
-        banners = Banner.objects \
-                      .filter(is_active=True) \
-                      .select_related('product')[:3]
-
-        small_banners = SmallBanner.objects \
-                            .select_related('product') \
-                            .annotate(price_from=Min(price_exp_banners))[:3]
-
-        if product_with_timer := SpecialOffer.objects.all().first():
-            context['product_with_timer'] = ProductShop.objects.with_discount_price() \
-                .get(id=product_with_timer.product_shop_id)
-            context['date_end'] = product_with_timer.date_end.strftime('%d.%m.%Y %H:%M')
-
-        slider_items = SliderBanner.objects.select_related('product', 'product__category', 'product__main_image') \
-            .annotate(avg_price=Avg(price_exp_banners),
-                      in_shops_id=ArrayAgg('product__in_shops'))
-
-        context['top_goods'] = goods
-        context['banners'] = banners
-        context['small_banners'] = small_banners
-        context['slider_items'] = slider_items
-
+        context.update(to_namespace(get_home_snapshot(self.request.LANGUAGE_CODE)).__dict__)
         return context
 
 
@@ -83,28 +66,101 @@ class CatalogView(FilterView):
 
     PRODUCT_SORTED = (('count_sold', _('Popularity')), ('avg_price', _('Cost')),
                       ('created', _('Novelty')), ('feedback', _('Feedback')))
+    INDEX_QUERY_PARAMS = {'category', 'tag', 'price', 'in_stock', 'free_delivery', 'feature', 'order_by', 'page'}
+
+    PAGE_SIZES = {'mobile': 4, 'tablet': 6, 'desktop': 8}
+
+    def get(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        """
+        Страница каталога для анонимного пользователя целиком берется из кэша,
+        ключ которого меняется вместе с версией данных каталога.
+        """
+        if not is_page_cacheable(request):
+            return super().get(request, *args, **kwargs)
+
+        key = get_catalog_page_key(request)
+        if (content := cache.get(key)) is not None:
+            return HttpResponse(restore_csrf_token(content, request))
+
+        response = super().get(request, *args, **kwargs)
+        response.render()
+        if response.status_code == 200:
+            cache.set(key, strip_csrf_token(response.content.decode()), timeout=CATALOG_PAGE_CACHE_LIFETIME)
+        return response
 
     def get_paginate_by(self, queryset):
-        self.paginate_by = 8
-        if self.request.user_agent.is_mobile:
-            self.paginate_by = 4
-        elif self.request.user_agent.is_tablet:
-            self.paginate_by = 6
+        self.paginate_by = self.PAGE_SIZES[get_device_class(self.request)]
         return self.paginate_by
 
+    def paginate_queryset(self, queryset, page_size):
+        """
+        Номер страницы (?page=) обрабатывается обычной пагинацией, во всех остальных случаях
+        используется курсорная пагинация по активной сортировке.
+        """
+        ordering = self._get_ordering(queryset)
+        if (result := self._paginate_by_index(ordering, page_size)) is not None:
+            return result
+        if self.request.GET.get('page'):
+            return super().paginate_queryset(queryset.order_by(ordering, 'pk'), page_size)
+
+        paginator = KeysetPaginator(queryset, page_size, ordering=ordering, estimate_total=True)
+        page = paginator.get_page(self.request.GET.get('cursor'), self.request.GET)
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def _paginate_by_index(self, ordering: str, page_size: int) -> Optional[tuple]:
+        """
+        Для анонимных пользователей отбор и сортировка товаров выполняются по индексу каталога в памяти,
+        из базы данных выбираются только товары текущей страницы.
+        Возвращает None, если индекс отключен или запрос содержит параметры, которые индекс не обрабатывает.
+        """
+        if self.request.user.is_authenticated or not set(self.request.GET) <= self.INDEX_QUERY_PARAMS \
+                or not self.filterset.is_valid():
+            return None
+        if (index := catalog_index.get()) is None:
+            return None
+
+        data = self.filterset.form.cleaned_data
+        value_ids = parse_feature_values(data.get('feature'))
+        ids = index.query(category=self.request.GET.get('category'),
+                          tag=data.get('tag'),
+                          price_range=ProductFilter.parse_price(data.get('price')),
+                          in_stock=bool(data.get('in_stock')),
+                          free_delivery=bool(data.get('free_delivery')),
+                          product_ids=feature_index.get().match(value_ids) if value_ids else None,
+                          ordering=ordering)
+
+        paginator = self.get_paginator(ids, page_size)
+        page = paginator.get_page(self.request.GET.get('page'))
+        page_ids = page.object_list.tolist()
+        products = self.queryset.filter(id__in=page_ids).in_bulk()
+        page.object_list = [products[product_id] for product_id in page_ids if product_id in products]
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def _get_ordering(self, queryset: QuerySet) -> str:
+        """
+        Сортировка, выбранная пользователем. Без явного выбора результаты поиска
+        упорядочиваются по релевантности, остальные товары - по популярности.
+        """
+        ordering = self.request.GET.get('order_by')
+        if ordering and ordering.lstrip('-') in dict(self.PRODUCT_SORTED):
+            return ordering
+        if 'search_rank' in queryset.query.annotations:
+            return '-search_rank'
+        return 'count_sold'
+
     def get_queryset(self):
-        filter_options = {'is_active': True, 'in_shops__is_active': True}
+        filter_options = {'is_active': True, 'summary__isnull': False}
         if category := self.request.GET.get('category'):
-            filter_options['category__slug'] = category
+            filter_options['category__ancestor_links__ancestor__slug'] = category
 
         self.queryset = Product.objects.filter(**filter_options) \
             .select_related('category', 'main_image') \
-            .annotate(avg_price=Avg(price_exp),
-                      min_price=Min(price_exp),
-                      max_price=Max(price_exp),
-                      count_sold=Sum('in_shops__count_sold'),
-                      feedback=Count('reviews'),
-                      in_shops_id=ArrayAgg('in_shops')).order_by('count_sold')
+            .annotate(avg_price=F('summary__avg_price'),
+                      min_price=F('summary__min_price'),
+                      max_price=F('summary__max_price'),
+                      count_sold=F('summary__count_sold'),
+                      feedback=F('summary__feedback'),
+                      default_offer_id=F('summary__default_offer_id')).order_by('count_sold')
 
         return self.queryset
 
@@ -113,12 +169,14 @@ class CatalogView(FilterView):
 
         self.ordering = self.filterset.data.get('order_by', 'count_sold')
         category = self.request.GET.get('category', default='')
-        tags = cache.get_or_set('tags', TagProduct.objects.all(), timeout=TAGS_CACHE_LIFETIME)
+        facets = self._get_facets()
 
-        min_price, max_price, price_from, price_to = self._get_price_range()
+        min_price, max_price, price_from, price_to = self._get_price_range(facets)
 
         context['sort'] = self.PRODUCT_SORTED
-        context['tags'] = tags
+        context['facets'] = facets
+        context['tags'] = facets['tags']
+        context['selected_features'] = self.request.GET.getlist('feature')
         context['order_by'] = self.ordering
         context['category'] = category
         context['price_from'] = price_from
@@ -129,11 +187,21 @@ class CatalogView(FilterView):
 
         return context
 
-    def _get_price_range(self) -> tuple[Decimal, Decimal, str, str]:
+    def _get_facets(self) -> dict:
+        """
+        Фасеты для текущего состояния фильтров. Границы и гистограмма цен считаются
+        без учета фильтра по цене, чтобы слайдер цены не сужался после фильтрации.
+        """
+        query_params = self.request.GET.copy()
+        query_params.pop('price', None)
+        queryset = ProductFilter(query_params, queryset=self.queryset, request=self.request).qs
+        price_range = ProductFilter.parse_price(self.filterset.data.get('price'))
+        return get_facets(queryset, self.request.GET, self.request.LANGUAGE_CODE, price_range)
+
+    def _get_price_range(self, facets: dict) -> tuple[Decimal, Decimal, str, str]:
         price = self.filterset.data.get('price')
-        aggregate: dict = self.queryset.aggregate(min=Min('min_price'), max=Max('max_price'))
-        min_price = aggregate.get('min')
-        max_price = aggregate.get('max')
+        min_price = facets.get('min_price')
+        max_price = facets.get('max_price')
 
         if price and len(price.split(';')) == 3 and all(item.isdigit() for item in price.split(';')[:2]):
             price_from, price_to, language_code = price.split(';')
@@ -190,7 +258,8 @@ class DiscountDetailView(DetailView):
             .with_discount_price() \
             .filter(discount=obj, is_active=True) \
             .select_related('product__main_image', 'product__category') \
-            .order_by('product__name')
+            .annotate(sort_name=self._get_sort_name()) \
+            .order_by('sort_name', 'pk')
         if date_end := obj.date_end:
             context['date_end'] = date_end.strftime('%d.%m.%Y %H:%M')
 
@@ -200,12 +269,23 @@ class DiscountDetailView(DetailView):
         elif self.request.user_agent.is_tablet:
             paginate_by = 6
 
-        paginator = Paginator(goods, paginate_by)
-        page_number = self.request.GET.get('page')
-        page_obj = paginator.get_page(page_number)
+        if page_number := self.request.GET.get('page'):
+            page_obj = Paginator(goods, paginate_by).get_page(page_number)
+        else:
+            page_obj = KeysetPaginator(goods, paginate_by, ordering='sort_name') \
+                .get_page(self.request.GET.get('cursor'), self.request.GET)
         context['page_obj'] = page_obj
         return context
 
+    @staticmethod
+    def _get_sort_name() -> Coalesce:
+        """
+        Название товара на текущем языке с подстановкой названия на языке по умолчанию.
+        Сортировка и курсор используют одно и то же значение, поэтому страницы не пропускают и не повторяют товары.
+        """
+        return Coalesce(f'product__{build_localized_fieldname("name", get_language())}',
+                        f'product__{build_localized_fieldname("name", settings.MODELTRANSLATION_DEFAULT_LANGUAGE)}')
+
 
 class ProductDetailView(DetailView):
     """
@@ -224,25 +304,44 @@ class ProductDetailView(DetailView):
                                        .prefetch_related('values')),
                               Prefetch('in_shops', queryset=ProductShop.objects.select_related('shop')),
                               Prefetch('reviews', queryset=Review.objects.select_related('profile'))) \
-            .annotate(avg_price=Avg(price_exp), in_shops_id=ArrayAgg('in_shops'))
+            .annotate(avg_price=F('summary__avg_price'), default_offer_id=F('summary__default_offer_id'))
 
         return queryset
 
+    def get(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        """
+        Страница товара берется из кэша, индивидуальные для пользователя фрагменты
+        (шапка с корзиной, форма отзыва) отрисовываются при каждом запросе.
+        """
+        if not is_product_page_cacheable(request):
+            response = super().get(request, *args, **kwargs)
+            self._add_product_to_viewed(self.object.id)
+            return response
+
+        key = get_product_page_key(kwargs.get(self.slug_url_kwarg), request.LANGUAGE_CODE)
+        if (page := cache.get(key)) is None:
+            self.object = self.get_object()
+            context = self.get_context_data(object=self.object, **{HOLES_AS_PLACEHOLDERS: True})
+            content = self.render_to_response(context).rendered_content
+            page = {'product_id': self.object.id, 'content': strip_csrf_token(content)}
+            cache.set(key, page, timeout=PRODUCT_PAGE_CACHE_LIFETIME)
+
+        self._add_product_to_viewed(page['product_id'])
+        content = fill_holes(page['content'], request, {'review_form': ReviewForm})
+        return HttpResponse(restore_csrf_token(content, request))
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         product: Product = context['product']
-        discounts_query = ProductShop.objects.with_discount_price().select_related('shop') \
-            .filter(product=product, is_active=True)
-        reviews_count = product.reviews.count()
-        shop_prices = get_prices(discounts_query)
+        sellers = ProductOffer.objects.select_related('shop').filter(product=product, is_active=True)
+        reviews_count = len(product.reviews.all())
         cart_product_form = CartAddProductForm()
-        self._add_product_to_viewed(product)
 
         context['review_form'] = ReviewForm
-        context['sellers'] = shop_prices
+        context['sellers'] = sellers
         context['reviews_count'] = reviews_count
         context['cart_product_form'] = cart_product_form
-        context['random_product_id'] = random_related_id(product)
+        context['default_offer_id'] = product.default_offer_id
         return context
 
     @method_decorator(login_required)
@@ -255,24 +354,9 @@ class ProductDetailView(DetailView):
             review.save()
         return redirect('product-detail', product_slug=product.slug)
 
-    def _add_product_to_viewed(self, product):
+    def _add_product_to_viewed(self, product_id: int):
         if self.request.user.is_authenticated:
-            profile = self.request.user.profile
-            self._delete_product_from_history(product, profile)
-            ViewHistory(profile=profile, product=product).save()
-
-    @staticmethod
-    def _delete_product_from_history(product, profile):
-        history = ViewHistory.objects.select_related('product', 'profile') \
-            .filter(profile=profile).order_by('-date_viewed')
-        product_in_history = [obj.product for obj in history]
-        if product in product_in_history:
-            ViewHistory.objects.filter(profile=profile, product=product).delete()
-
-        history_list = list(history)
-        while len(history_list) >= 20:
-            record_to_delete = history_list.pop(-1)
-            ViewHistory.objects.filter(id=record_to_delete.id).delete()
+            record_view(self.request.user.profile.id, product_id)
 
 
 class ComparisonView(TemplateView):
@@ -281,77 +365,39 @@ class ComparisonView(TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         comparison_products = self.request.session.get(
-            'comparison_products', default=[])[:3]
+            'comparison_products', default=[])[:COMPARISON_LIMIT]
         if comparison_products and isinstance(comparison_products, list):
-            goods: QuerySet[Product] = Product.objects.filter(id__in=comparison_products) \
-                .annotate(avg_price=Avg(price_exp),
-                          in_shops_id=ArrayAgg('in_shops')) \
-                .select_related('category', 'main_image')
+            goods: list[Product] = list(Product.objects.filter(id__in=comparison_products)
+                                        .annotate(avg_price=F('summary__avg_price'),
+                                                  default_offer_id=F('summary__default_offer_id'))
+                                        .select_related('category', 'main_image'))
 
             if len({item.category_id for item in goods}) == 1:
-                allowable_feature_names = self._get_allowable_feature_names(
-                    context, comparison_products)
-
-                comparison_list: QuerySet[Product] = goods.prefetch_related(
-                    Prefetch('features', queryset=FeatureToProduct.objects.order_by('feature_name')
-                             .select_related('feature_name')
-                             .prefetch_related('values')
-                             .filter(feature_name_id__in=allowable_feature_names)))
-
-                context['comparison_list'] = comparison_list
+                self._add_comparison_features(context, goods)
                 context['one_category'] = True
-            else:
-                context['comparison_list'] = goods
-            context['count_item'] = goods.count()
+            context['comparison_list'] = goods
+            context['count_item'] = len(goods)
         return context
 
-    def _get_allowable_feature_names(self, context: dict[str, Any], goods: Sequence) -> Sequence:
+    def _add_comparison_features(self, context: dict[str, Any], goods: Sequence[Product]) -> None:
         """
-        Метод, в котором происходит получение допустимых характеристик.
-        Допустимыми являются те, которые встречаются у всех товаров из QuerySet.
-        Также если is_difference = True, то исключается такое название характеристики,
-        у которого идентичные значения у всех товаров из QuerySet.
+        Добавляет каждому товару список характеристик для сравнения.
+        По умолчанию выводятся характеристики, которые есть у всех товаров,
+        а при is_difference = True - только характеристики с различающимися значениями.
         """
-        is_difference = self.request.GET.get('is_difference')
-        if is_difference == 'True':
-            name_btn = _('Show all characteristics')
-            is_difference_value = 'False'
-            values = FeatureToProduct.objects.filter(product_id__in=goods) \
-                .values('product_id', 'feature_name') \
-                .annotate(values=ArrayAgg('values')) \
-                .order_by('product_id', 'feature_name')
-
-            result = {}
-            for item in values:
-                product_id = item['product_id']
-                feature_name = item['feature_name']
-                value = item['values']
-                if product_id in result:
-                    result[product_id][feature_name] = value
-                else:
-                    result[product_id] = {feature_name: value}
-            result_list = list(result.values())
-            difference_features = {}
-
-            for a in range(len(result_list)):
-                for key, value in result_list[0].items():
-                    if key in result_list[a] and value != result_list[a][key]:
-                        difference_features[key] = value
-
-            allowable_feature_names = difference_features.keys()
+        is_difference = self.request.GET.get('is_difference') == 'True'
+        if is_difference:
+            context['name_btn'] = _('Show all characteristics')
+            context['is_difference_value'] = 'False'
         else:
-            name_btn = _('Only differing characteristics')
-            is_difference_value = 'True'
+            context['name_btn'] = _('Only differing characteristics')
+            context['is_difference_value'] = 'True'
 
-            allowable_feature_names = FeatureToProduct.objects.filter(product_id__in=goods) \
-                .values('feature_name') \
-                .annotate(count=Count('product_id')) \
-                .filter(count=len(goods)) \
-                .values_list('feature_name_id', flat=True, named=False)
-
-        context['name_btn'] = name_btn
-        context['is_difference_value'] = is_difference_value
-        return allowable_feature_names
+        matrix = get_feature_matrix([item.id for item in goods], self.request.LANGUAGE_CODE)
+        features = [feature for feature in matrix if (feature['differs'] if is_difference else feature['common'])]
+        for item in goods:
+            item.comparison_features = [{'name': feature['name'], 'value': feature['values'].get(item.id, '-')}
+                                        for feature in features]
 
     def post(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
         current_page = request.META.get('HTTP_REFERER', reverse('catalog'))
@@ -388,24 +434,33 @@ class ShopDetailView(DetailView):
     def get_object(self, queryset=None):
         slug = self.kwargs.get(self.slug_url_kwarg)
         try:
-            shop = cache.set(f'shop_{slug}',
-                             Shop.objects.select_related('main_image')
-                             .get(slug=slug),
-                             timeout=SHOPS_CACHE_LIFETIME)
+            shop = cache.get_or_set(f'shop_{slug}',
+                                    lambda: Shop.objects.select_related('main_image').get(slug=slug),
+                                    timeout=SHOPS_CACHE_LIFETIME)
             return shop
         except ObjectDoesNotExist as e:
             raise Http404(_('No shop found matching the query')) from e
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        slug = self.kwargs.get(self.slug_url_kwarg)
-        products_top = cache.get_or_set(f'products_top_{slug}',
-                                        ProductShop.objects
-                                        .with_discount_price()
-                                        .filter(shop__slug=slug)
-                                        .select_related('product__category', 'product__main_image')
-                                        .order_by('-count_sold')[:10],
-                                        timeout=PRODUCTS_TOP_CACHE_LIFETIME)
+        top_ids = get_top_offer_ids(self.object.id, 10)
+        offers = ProductShop.objects \
+            .with_discount_price() \
+            .filter(id__in=top_ids) \
+            .select_related('product__category', 'product__main_image') \
+            .in_bulk()
+        products_top = [offers[offer_id] for offer_id in top_ids if offer_id in offers]
         context['goods'] = products_top
 
         return context
+
+
+def autocomplete(request: HttpRequest) -> JsonResponse:
+    """
+    Подсказки для строки поиска по названиям товаров, категорий и магазинов
+    """
+    query = request.GET.get('q', '').strip()
+    limit = request.GET.get('limit', '')
+    limit = min(int(limit), AUTOCOMPLETE_LIMIT) if limit.isdigit() and int(limit) > 0 else AUTOCOMPLETE_LIMIT
+    results = get_suggestions(query, request.LANGUAGE_CODE, limit) if query else []
+    return JsonResponse({'results': results})
@@ -1,11 +1,13 @@
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 import tempfile
 
 from djmoney.money import Money
 
-from app_orders.models import DeliveryCategory, Order
+from app_orders.models import DeliveryCategory, Order, OrderItem, PaymentItem
 from app_shops.models.category import Category
 from app_shops.models.product import Product
 from app_shops.models.shop import Shop, ProductShop
@@ -110,6 +112,78 @@ class OrderListViewTest(BaseTestCase):
         response = self.client.get(reverse('orders'))
         self.assertEqual(len(response.context['order_list']), 10)
 
+    def test_orders_pagination(self):
+
+        """Проверка курсорной пагинации истории заказов: новые заказы выводятся первыми"""
+
+        orders = [Order.objects.create(**self.order_data) for _ in range(15)]
+        response = self.client.get(reverse('orders'))
+        page = response.context['page_obj']
+        self.assertEqual([order.id for order in page], [order.id for order in reversed(orders)][:10])
+        self.assertTrue(page.has_next())
+
+        response = self.client.get(reverse('orders') + '?' + page.next_query)
+        self.assertEqual([order.id for order in response.context['order_list']],
+                         [order.id for order in reversed(orders)][10:])
+
+    def test_orders_of_other_users_hidden(self):
+
+        """Проверка, что в истории выводятся только заказы пользователя"""
+
+        other_user = get_user_model().objects.create_user(username='other', email=email2, password=password)
+        Order.objects.create(**dict(self.order_data, buyer=other_user))
+        order = Order.objects.create(**self.order_data)
+        response = self.client.get(reverse('orders'))
+        self.assertEqual([item.id for item in response.context['order_list']], [order.id])
+
+    def test_orders_filter_by_status(self):
+
+        """Проверка отбора заказов по статусу"""
+
+        paid = Order.objects.create(status='p', **self.order_data)
+        Order.objects.create(**self.order_data)
+        response = self.client.get(reverse('orders'), {'status': 'p'})
+        self.assertEqual([order.id for order in response.context['order_list']], [paid.id])
+
+    def test_orders_filter_by_date(self):
+
+        """Проверка отбора заказов по дате оформления"""
+
+        order = Order.objects.create(**self.order_data)
+        today = order.created.date().isoformat()
+        response = self.client.get(reverse('orders'), {'date_from': today, 'date_to': today})
+        self.assertEqual(len(response.context['order_list']), 1)
+        response = self.client.get(reverse('orders'), {'date_from': '2000-01-01', 'date_to': '2000-01-02'})
+        self.assertEqual(len(response.context['order_list']), 0)
+
+    def test_orders_items_count(self):
+
+        """Проверка количества позиций заказа в списке"""
+
+        order = Order.objects.create(**self.order_data)
+        OrderItem.objects.create(order=order, product_shop=self.product_shop,
+                                 price_on_add_moment=Money(100, 'RUB'), quantity=2)
+        Order.objects.create(**self.order_data)
+        response = self.client.get(reverse('orders'))
+        self.assertEqual([item.items_count for item in response.context['order_list']], [0, 1])
+
+    def test_orders_queries_do_not_grow(self):
+
+        """Проверка, что число запросов к базе не зависит от количества заказов на странице"""
+
+        def count_queries():
+            with CaptureQueriesContext(connection) as context:
+                self.client.get(reverse('orders'))
+            return len(context.captured_queries)
+
+        order = Order.objects.create(**self.order_data)
+        PaymentItem.objects.create(order=order, payment_category='bank-card', total_price=Money(100, 'RUB'))
+        queries = count_queries()
+        for _ in range(5):
+            order = Order.objects.create(**self.order_data)
+            PaymentItem.objects.create(order=order, payment_category='bank-card', total_price=Money(100, 'RUB'))
+        self.assertEqual(count_queries(), queries)
+
 
 
 
@@ -2,13 +2,18 @@ from allauth.account.views import RedirectAuthenticatedUserMixin
 from django.contrib.auth import login, authenticate
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.auth.models import User
-from app_shops.models.product import Product
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from app_shops.services.history import get_recently_viewed
 from .forms import ResetPassStage1Form, ResetPassStage2Form, UserEditForm
 from django.urls import reverse_lazy
 from django.views.generic import FormView, DetailView, UpdateView, ListView
 from django.core.mail import send_mail
 from .models import Profile
-from app_orders.models import Order
+from app_orders.filters import OrderFilter
+from app_orders.models import Order, OrderItem
+from app_shops.services.pagination import KeysetPaginator
+from django_marketplace.constants import ORDERS_PAGE_SIZE
 
 
 class ResetPassStage1(RedirectAuthenticatedUserMixin, FormView):
@@ -113,7 +118,7 @@ class AccountView(LoginRequiredMixin, DetailView):
             context['image'] = profile.avatar
         if Order.objects.filter(buyer__username=self.request.user).count() > 0:
             context['order'] = Order.objects.filter(buyer__username=self.request.user).latest('updated')
-        context['products'] = Product.objects.filter(history__profile__user__username=self.request.user).order_by('-history__date_viewed')[:3]
+        context['products'] = get_recently_viewed(profile.id, 3)
         return context
 
 
@@ -122,9 +127,30 @@ class OrderListView(LoginRequiredMixin, ListView):
     template_name = 'pages/historyorder.html'
     model = Order
     context_object_name = 'order_list'
+    paginate_by = ORDERS_PAGE_SIZE
 
     def get_queryset(self):
-        return Order.objects.filter(buyer__username=self.request.user).order_by('-updated')
+        """
+        Заказы покупателя выбираются по индексу (buyer, -created) вместе с оплатой и способом доставки,
+        количество позиций считается подзапросом только для заказов текущей страницы.
+        """
+        items_count = OrderItem.objects.filter(order=OuterRef('pk')) \
+            .order_by().values('order').annotate(count=Count('id')).values('count')
+        queryset = Order.objects.filter(buyer_id=self.request.user.id) \
+            .select_related('delivery_category', 'payment_item') \
+            .annotate(items_count=Coalesce(Subquery(items_count), 0))
+        self.filterset = OrderFilter(self.request.GET, queryset=queryset)
+        return self.filterset.qs
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, page_size, ordering='-created')
+        page = paginator.get_page(self.request.GET.get('cursor'), self.request.GET)
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['filter'] = self.filterset
+        return context
 
 
 
@@ -9,6 +9,30 @@ app.conf.beat_schedule = {
     'auto_discount_invalidate': {
         'task': 'discount_invalidate',
         'schedule': crontab(minute='00')
+    },
+    'rebuild_product_summaries': {
+        'task': 'rebuild_product_summaries',
+        'schedule': crontab(minute='30', hour='3')
+    },
+    'rebuild_leaderboards': {
+        'task': 'rebuild_leaderboards',
+        'schedule': crontab(minute='45', hour='3')
+    },
+    'flush_view_history': {
+        'task': 'flush_view_history',
+        'schedule': crontab(minute='*')
+    },
+    'rebuild_home_snapshot': {
+        'task': 'rebuild_home_snapshot',
+        'schedule': crontab(minute='*/10')
+    },
+    'release_expired_holds': {
+        'task': 'release_expired_holds',
+        'schedule': crontab(minute='*')
+    },
+    'fail_stale_payments': {
+        'task': 'fail_stale_payments',
+        'schedule': crontab(minute='*')
     }
 }
 app.autodiscover_tasks()
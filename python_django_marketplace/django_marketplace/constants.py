@@ -6,4 +6,24 @@ TAGS_CACHE_LIFETIME = timedelta(days=1).total_seconds()
 SALES_CACHE_LIFETIME = timedelta(days=1).total_seconds()
 SHOPS_CACHE_LIFETIME = timedelta(days=1).total_seconds()
 PRODUCTS_TOP_CACHE_LIFETIME = timedelta(hours=1).total_seconds()
-ORDER_AMOUNT_WHICH_DELIVERY_FREE = 2000
\ No newline at end of file
+HOME_SNAPSHOT_CACHE_LIFETIME = timedelta(hours=1).total_seconds()
+FACETS_CACHE_LIFETIME = timedelta(hours=1).total_seconds()
+CATALOG_PAGE_CACHE_LIFETIME = timedelta(minutes=15).total_seconds()
+PRODUCT_PAGE_CACHE_LIFETIME = timedelta(hours=1).total_seconds()
+COMPARISON_CACHE_LIFETIME = timedelta(hours=1).total_seconds()
+VIEW_HISTORY_BUFFER_LIFETIME = timedelta(days=1).total_seconds()
+VIEW_HISTORY_FLUSH_BATCH_SIZE = 1000
+RECENTLY_VIEWED_CACHE_LIFETIME = timedelta(days=7).total_seconds()
+STOCK_HOLD_LIFETIME = timedelta(minutes=15).total_seconds()
+PAYMENT_PROCESSING_TIMEOUT = timedelta(minutes=5).total_seconds()
+CART_LIFETIME = timedelta(days=30).total_seconds()
+ORDER_AMOUNT_WHICH_DELIVERY_FREE = 2000
+CART_ITEM_MAX_QUANTITY = 10000
+AUTOCOMPLETE_LIMIT = 8
+AUTOCOMPLETE_VERSION_CHECK_INTERVAL = 5
+PRICE_HISTOGRAM_BUCKETS = 10
+CATALOG_INDEX_VERSION_CHECK_INTERVAL = 5
+FEATURE_INDEX_VERSION_CHECK_INTERVAL = 5
+COMPARISON_LIMIT = 6
+VIEW_HISTORY_LIMIT = 20
+ORDERS_PAGE_SIZE = 10
@@ -1,18 +1,20 @@
 from typing import Dict
 
+from django.conf import settings
 from django.core.cache import cache
 from django.http import HttpRequest
+from django.utils.functional import SimpleLazyObject
 
-from app_shops.models.category import Category
+from app_shops.services.categories import build_category_menu
 from django_marketplace.constants import CATEGORIES_CACHE_LIFETIME
 
-from app_cart.cart import Cart
+from app_cart.cart import get_request_cart
 
 
 def get_categories(request: HttpRequest) -> Dict:
-    categories = cache.get_or_set('categories',
-                                  Category.objects.filter(is_active=True).select_related('parent').prefetch_related(
-                                      'child_category'), timeout=CATEGORIES_CACHE_LIFETIME)
+    menu = cache.get_or_set('category_menu', build_category_menu, timeout=CATEGORIES_CACHE_LIFETIME)
+    language = getattr(request, 'LANGUAGE_CODE', settings.MODELTRANSLATION_DEFAULT_LANGUAGE)
+    categories = menu.get(language, menu.get(settings.MODELTRANSLATION_DEFAULT_LANGUAGE, []))
     query_params = request.GET.copy()
     query_params.pop('price', None)
     redirect_to = f'{request.path}?{query_params.urlencode()}'
@@ -20,4 +22,6 @@ def get_categories(request: HttpRequest) -> Dict:
 
 
 def get_cart(request):
-    return {'cart': Cart(request)}
+    """Корзина и ее итоги вычисляются, только если шаблон к ним обращается"""
+    return {'cart': SimpleLazyObject(lambda: get_request_cart(request)),
+            'cart_summary': SimpleLazyObject(lambda: get_request_cart(request).summary)}
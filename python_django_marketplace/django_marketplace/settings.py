@@ -236,8 +236,19 @@ CELERY_CACHE_BACKEND = 'django-cache'
 CELERY_ACCEPT_CONTENT = ['application/json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
+PAYMENT_TASK_EAGER = config('PAYMENT_TASK_EAGER', default=False, cast=bool)
 
 CART_SESSION_ID = 'cart'
+CART_TOKEN_SESSION_ID = 'cart_token'
+CART_SUMMARY_SESSION_ID = 'cart_summary'
+CART_BACKEND = config('CART_BACKEND', default='app_cart.backends.SessionCartBackend')
+CART_STORE = config('CART_STORE', default='app_cart.backends.RedisHashStore')
+CART_REDIS_URL = config('CART_REDIS_URL', default='redis://localhost:6379/2')
+LEADERBOARD_BACKEND = config('LEADERBOARD_BACKEND', default='app_shops.services.leaderboard.LocalSortedSetStore')
+LEADERBOARD_REDIS_URL = config('LEADERBOARD_REDIS_URL', default='redis://localhost:6379/1')
+PAGE_CACHE_ENABLED = config('PAGE_CACHE_ENABLED', default=True, cast=bool)
+CATALOG_INDEX_ENABLED = config('CATALOG_INDEX_ENABLED', default=False, cast=bool)
+CATALOG_INDEX_SNAPSHOT_DIR = os.path.join(BASE_DIR, 'cache', 'catalog_index')
 CURRENCIES = ('RUB',)
 BASE_CURRENCY = 'RUB'
 EXCHANGE_BACKEND = 'app_shops.services.functions.CBRExchangeBackend'
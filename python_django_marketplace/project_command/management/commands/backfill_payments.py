@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from app_orders.services.payments import backfill_payment_statuses
+
+
+class Command(BaseCommand):
+    help = 'Fill in payment statuses for payments created before the status field'
+
+    def handle(self, *args, **kwargs) -> None:
+        print(f'Payment statuses updated: {backfill_payment_statuses()}')
@@ -3,8 +3,9 @@ from django.core import management
 
 
 class Command(BaseCommand):
-    help = 'Create and apply migrations'
+    help = 'Create and apply migrations, fill in data for new fields'
 
     def handle(self, *args, **kwargs) -> None:
         management.call_command('makemigrations')
         management.call_command('migrate')
+        management.call_command('backfill_payments')
@@ -0,0 +1,45 @@
+const SEARCH_INPUT = document.getElementById('query');
+const SEARCH_SUGGESTIONS = document.getElementById('search-suggestions');
+const SUGGESTIONS_DELAY = 150;
+
+let suggestionsTimer = null;
+let suggestionsUrls = {};
+
+function updateSuggestions() {
+  const query = SEARCH_INPUT.value.trim();
+  if (!query) {
+    SEARCH_SUGGESTIONS.innerHTML = '';
+    return;
+  }
+
+  let xhr = new XMLHttpRequest();
+  xhr.open('GET', SEARCH_INPUT.dataset.url + '?q=' + encodeURIComponent(query), true);
+  xhr.onreadystatechange = function () {
+    if (this.readyState === 4 && this.status === 200) {
+      let data = JSON.parse(this.responseText);
+      suggestionsUrls = {};
+      SEARCH_SUGGESTIONS.innerHTML = '';
+
+      data.results.forEach(function (item) {
+        let option = document.createElement('option');
+        option.value = item.name;
+        suggestionsUrls[item.name] = item.url;
+        SEARCH_SUGGESTIONS.appendChild(option);
+      });
+    }
+  };
+  xhr.send();
+}
+
+if (SEARCH_INPUT && SEARCH_SUGGESTIONS) {
+  SEARCH_INPUT.addEventListener('input', function (event) {
+    if (event.inputType === 'insertReplacementText' || !event.inputType) {
+      if (suggestionsUrls[SEARCH_INPUT.value]) {
+        window.location.href = suggestionsUrls[SEARCH_INPUT.value];
+        return;
+      }
+    }
+    clearTimeout(suggestionsTimer);
+    suggestionsTimer = setTimeout(updateSuggestions, SUGGESTIONS_DELAY);
+  });
+}
@@ -0,0 +1,58 @@
+const CART_FORM = document.querySelector('form.Cart');
+
+function sendCartChange(url, data, onSuccess) {
+  let xhr = new XMLHttpRequest();
+  xhr.open('POST', url, true);
+  xhr.setRequestHeader('Content-Type', 'application/x-www-form-urlencoded');
+  xhr.setRequestHeader('X-CSRFToken', CART_FORM.querySelector('[name=csrfmiddlewaretoken]').value);
+  xhr.onreadystatechange = function () {
+    if (this.readyState === 4 && this.status === 200) {
+      onSuccess(JSON.parse(this.responseText));
+    }
+  };
+  xhr.send(new URLSearchParams(data).toString());
+}
+
+function updateCart(data) {
+  data.items.forEach(function (item) {
+    let row = CART_FORM.querySelector('[data-cart-item="' + item.id + '"]');
+    if (!row) {
+      return;
+    }
+    if (item.quantity === 0) {
+      row.remove();
+    } else {
+      row.querySelector('.Amount-input').value = item.quantity;
+    }
+  });
+  document.querySelectorAll('.CartBlock-amount').forEach(function (element) {
+    element.textContent = data.count;
+  });
+  document.querySelectorAll('.CartBlock-price').forEach(function (element) {
+    element.textContent = data.count ? data.total_price : '0.00';
+  });
+  let total = document.getElementById('cart-total-price');
+  if (total) {
+    total.textContent = data.total_price;
+  }
+  if (!data.count) {
+    window.location.reload();
+  }
+}
+
+if (CART_FORM) {
+  CART_FORM.addEventListener('click', function (event) {
+    let link = event.target.closest('[data-cart-change], [data-cart-remove]');
+    if (!link) {
+      return;
+    }
+    event.preventDefault();
+    if (link.dataset.cartRemove) {
+      sendCartChange(link.dataset.cartRemove, {}, updateCart);
+      return;
+    }
+    let input = link.closest('.Amount').querySelector('.Amount-input');
+    let quantity = Math.max(parseInt(input.value, 10) + parseInt(link.dataset.delta, 10), 0);
+    sendCartChange(link.dataset.cartChange, {quantity: quantity}, updateCart);
+  });
+}